@@ -0,0 +1,3 @@
+"""Offline benchmarks for Petal. Run one with `python -m benchmarks.<name>`
+    from the directory holding `config.yml`.
+"""
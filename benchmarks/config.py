@@ -0,0 +1,66 @@
+"""Benchmark for reading the Config, cold and from its Snapshot.
+
+Times the ways the Config file can be read: The Round-Trip Loader, which is
+    only used now to write changes back; The Safe Loader, used when the file
+    has changed; And the Snapshot, used when it has not. Then times a lookup of
+    a Field read for every Message, by `get` and by an Accessor.
+
+Usage: python -m benchmarks.config [--repeat N]
+"""
+
+import argparse
+import marshal
+from time import perf_counter
+from typing import Callable
+
+
+def best(fn: Callable[[], object], repeat: int, number: int = 1) -> float:
+    """Return the fastest of `repeat` runs of `number` calls, per call, in
+        microseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((perf_counter() - start) / number)
+    return min(times) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    opts = parser.parse_args()
+
+    from ruamel import yaml
+
+    from petal import config
+
+    with open(config.PATH, "rb") as fp:
+        raw = fp.read()
+    text = raw.decode()
+    dates = []
+    doc = config._pack(config._parse(raw), (), dates)
+    snap = marshal.dumps((config.CACHE_VERSION, config._stamp(raw), doc, dates))
+    cfg = config.cfg
+
+    rows = [
+        ("round-trip load", lambda: yaml.load(text, Loader=yaml.RoundTripLoader), 1),
+        ("safe load", lambda: config._parse(raw), 1),
+        ("file stamp", lambda: config._stamp(raw), 100),
+        ("snapshot load", lambda: config._unpack(*marshal.loads(snap)[2:]), 100),
+        ("config.read()", config.read, 100),
+        ('get("roleGrant")', lambda: cfg.get("roleGrant"), 10000),
+        ("accessor", cfg.accessor("roleGrant"), 10000),
+    ]
+    for label, fn, number in rows:
+        us = best(fn, opts.repeat, number)
+        print(f"{label:<20} {us / 1000:10.3f}ms" if us >= 1000 else f"{label:<20} {us:10.2f}us")
+
+    from petal.grasslands import Peacock
+
+    Peacock.flush()
+
+
+if __name__ == "__main__":
+    main()
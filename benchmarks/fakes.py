@@ -0,0 +1,404 @@
+"""Offline stand-ins for Discord and MongoDB, for benchmarking Petal.
+
+Guilds, Channels, Members and Messages are real `discord.py` objects, built from
+    Gateway-style payloads against the Connection State of a real Client, so
+    that `isinstance` checks and Attribute access behave exactly as they do in
+    production. Only the transport is fake: `FakeHTTP` answers every REST call
+    from memory, and `MemoryCollection` answers the queries `DBHandler` makes.
+"""
+
+import asyncio
+from collections import Counter
+from copy import copy
+from datetime import datetime
+from itertools import count
+from typing import Dict, List, Optional
+
+import discord
+
+from petal.dbhandler import DBHandler
+from petal.util.journal import clone
+
+
+_ids = count(1)
+
+
+def snowflake(when: datetime = None) -> int:
+    """Return a new, unique Snowflake, which decodes to the given time."""
+    return discord.utils.time_snowflake(when or datetime.utcnow()) + next(_ids) % 4096
+
+
+def iso(when: datetime = None) -> str:
+    return (when or datetime.utcnow()).isoformat() + "+00:00"
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> dict:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "{:04}".format(user_id % 10000),
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+# ========---
+# Fake Transport
+# ========---
+
+
+class FakeHTTP:
+    """Answer the REST calls of `discord.http.HTTPClient` from memory. Every
+        call is counted; Calls not handled specifically return an empty result.
+    """
+
+    def __init__(self, world: "World" = None, latency: float = 0):
+        self.world: Optional[World] = world
+        self.latency: float = latency
+        self.calls: Counter = Counter()
+
+    async def _call(self, name: str):
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _message(self, channel_id, content=None, embed=None, **_) -> dict:
+        bot = self.world.bot
+        return {
+            "id": str(snowflake()),
+            "channel_id": str(channel_id),
+            "author": bot,
+            "content": content or "",
+            "timestamp": iso(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [embed] if embed else [],
+            "pinned": False,
+            "type": 0,
+        }
+
+    async def send_message(self, channel_id, content, *, embed=None, **kw):
+        await self._call("send_message")
+        return self._message(channel_id, content, embed)
+
+    async def send_files(self, channel_id, *, files, content=None, embed=None, **kw):
+        await self._call("send_files")
+        return self._message(channel_id, content, embed)
+
+    async def edit_message(self, channel_id, message_id, **fields):
+        await self._call("edit_message")
+        data = self._message(channel_id, fields.get("content"), fields.get("embed"))
+        data["id"] = str(message_id)
+        data["edited_timestamp"] = iso()
+        return data
+
+    async def get_audit_logs(self, guild_id, *a, **kw):
+        await self._call("get_audit_logs")
+        return {"audit_log_entries": [], "users": [], "webhooks": []}
+
+    async def logs_from(self, channel_id, *a, **kw):
+        await self._call("logs_from")
+        return []
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        async def call(*a, **kw):
+            await self._call(name)
+            return {}
+
+        return call
+
+
+# ========---
+# Fake Database
+# ========---
+
+
+class InsertResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, want in query.items():
+        have = doc.get(key)
+        if isinstance(want, dict):
+            for op, v in want.items():
+                if op == "$lt" and not (have is not None and have < v):
+                    return False
+                elif op == "$lte" and not (have is not None and have <= v):
+                    return False
+                elif op == "$gt" and not (have is not None and have > v):
+                    return False
+                elif op == "$gte" and not (have is not None and have >= v):
+                    return False
+                elif op == "$ne" and have == v:
+                    return False
+        elif have != want:
+            return False
+    return True
+
+
+class MemoryCollection:
+    """The subset of a PyMongo Collection which DBHandler uses. Documents are
+        copied on the way in and out, as they would be by the Mongo driver.
+        Equality queries on an indexed field are answered by a Hash lookup.
+    """
+
+    def __init__(self, indexes=()):
+        self.docs: Dict[int, dict] = {}
+        self.indexes: Dict[str, Dict[object, set]] = {f: {} for f in indexes}
+        self.ids = count(1)
+
+    def _index(self, oid: int, doc: dict, add: bool):
+        for field, index in self.indexes.items():
+            if field in doc:
+                group = index.setdefault(doc[field], set())
+                if add:
+                    group.add(oid)
+                else:
+                    group.discard(oid)
+
+    def _candidates(self, query: dict):
+        for field, index in self.indexes.items():
+            want = query.get(field)
+            if want is not None and not isinstance(want, dict):
+                return [(oid, self.docs[oid]) for oid in index.get(want, ())]
+        return list(self.docs.items())
+
+    def _find(self, query: dict = None):
+        query = query or {}
+        for oid, doc in self._candidates(query):
+            if _matches(doc, query):
+                yield oid, doc
+
+    def find_one(self, query: dict = None):
+        for _, doc in self._find(query):
+            return clone(doc)
+        return None
+
+    def find(self, query: dict = None):
+        return [clone(doc) for _, doc in self._find(query)]
+
+    def count(self, query: dict = None) -> int:
+        return sum(1 for _ in self._find(query))
+
+    count_documents = count
+
+    def insert_one(self, doc: dict) -> InsertResult:
+        oid = next(self.ids)
+        doc = clone(doc)
+        doc["_id"] = oid
+        self.docs[oid] = doc
+        self._index(oid, doc, True)
+        return InsertResult(oid)
+
+    insert = insert_one
+
+    def replace_one(self, query: dict, doc: dict, upsert: bool = False):
+        for oid, old in self._find(query):
+            self._index(oid, old, False)
+            doc = clone(doc)
+            doc["_id"] = oid
+            self.docs[oid] = doc
+            self._index(oid, doc, True)
+            return
+        if upsert:
+            self.insert_one(doc)
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False):
+        for oid, doc in self._find(query):
+            self._index(oid, doc, False)
+            doc.update(clone(update.get("$set", {})))
+            for key, n in update.get("$inc", {}).items():
+                doc[key] = doc.get(key, 0) + n
+            self._index(oid, doc, True)
+            return
+        if upsert:
+            self.insert_one({**query, **update.get("$set", {})})
+
+    update = update_one
+
+    def delete_one(self, query: dict):
+        for oid, doc in self._find(query):
+            self._index(oid, doc, False)
+            del self.docs[oid]
+            return
+
+
+def memory_db() -> DBHandler:
+    """Return a DBHandler whose Collections are held in memory."""
+    db = DBHandler.__new__(DBHandler)
+    db.useDB = True
+    db.config = None
+    db.db = None
+    db.members = MemoryCollection(indexes=("uid",))
+    db.reminders = MemoryCollection()
+    db.motd = MemoryCollection(indexes=("num",))
+    db.void = MemoryCollection(indexes=("number",))
+    db.ac = MemoryCollection()
+    db.subs = MemoryCollection()
+    db.emoji = MemoryCollection()
+    db.dinos = MemoryCollection()
+    return db
+
+
+# ========---
+# Fake World
+# ========---
+
+
+class World:
+    """One Guild, with Text Channels and Members, attached to a Client. The
+        Client is given the Fake Transport and marked ready, so its Event
+        Handlers can be called directly.
+    """
+
+    def __init__(self, client: discord.Client, members: int = 200, channels: int = 8):
+        self.client = client
+        self.state = client._connection
+        self.http = FakeHTTP(self)
+        client.http = self.state.http = self.http
+
+        bot_id = snowflake()
+        self.bot = user_payload(bot_id, "Petal", bot=True)
+        self.state.user = discord.ClientUser(state=self.state, data=self.bot)
+
+        guild_id = snowflake()
+        self.role_member = {
+            "id": str(snowflake()),
+            "name": "Member",
+            "permissions": "104324673",
+            "position": 1,
+            "color": 0,
+            "hoist": False,
+            "managed": False,
+            "mentionable": False,
+        }
+        everyone = dict(self.role_member, id=str(guild_id), name="@everyone", position=0)
+
+        channel_data = [
+            {
+                "id": str(snowflake()),
+                "type": 0,
+                "name": f"channel-{i}",
+                "position": i,
+                "permission_overwrites": [],
+                "nsfw": False,
+                "parent_id": None,
+                "topic": None,
+                "last_message_id": None,
+            }
+            for i in range(channels + 1)
+        ]
+        self.member_data = [
+            {
+                "user": user_payload(snowflake(), f"member{i}"),
+                "roles": [self.role_member["id"]],
+                "joined_at": iso(),
+                "nick": f"Nick {i}" if i % 3 == 0 else None,
+                "deaf": False,
+                "mute": False,
+            }
+            for i in range(members)
+        ]
+
+        self.guild = discord.Guild(
+            data={
+                "id": str(guild_id),
+                "name": "Benchmark Guild",
+                "roles": [everyone, self.role_member],
+                "channels": channel_data,
+                "members": [],
+                "member_count": members + 1,
+                "owner_id": self.bot["id"],
+            },
+            state=self.state,
+        )
+        self.state._add_guild(self.guild)
+        self.members: List[discord.Member] = []
+        for data in [
+            {"user": self.bot, "roles": [], "joined_at": iso(), "deaf": False, "mute": False}
+        ] + self.member_data:
+            member = discord.Member(data=data, guild=self.guild, state=self.state)
+            self.guild._add_member(member)
+            if not member.bot:
+                self.members.append(member)
+
+        # The last Channel is where Petal posts its logs.
+        self.channels: List[discord.TextChannel] = list(self.guild.text_channels)
+        self.log_channel = self.channels.pop()
+
+        client._ready.set()
+
+    def configure(self, config):
+        """Point the Config of Petal at this World, in memory only."""
+        doc = config.doc
+        doc["mainServer"] = self.guild.id
+        doc["logChannel"] = doc["modChannel"] = self.log_channel.id
+        doc["roleGrant"] = {
+            "role": "Member",
+            "chan": self.channels[-1].id,
+            "response": "Welcome!",
+            "regex": "(I agree)",
+            "ignorecase": True,
+        }
+        doc["ignoreServers"] = []
+        doc["ignoreChannels"] = []
+        doc["wordFilter"] = ["heck", "darn"]
+
+    def message(self, author: int, channel: int, content: str) -> discord.Message:
+        """Build a Message, as if it had arrived over the Gateway."""
+        member = self.members[author % len(self.members)]
+        data = self.member_data[author % len(self.members)]
+        payload = {
+            "id": str(snowflake()),
+            "channel_id": str(self.channels[channel % len(self.channels)].id),
+            "guild_id": str(self.guild.id),
+            "author": data["user"],
+            "member": {k: v for k, v in data.items() if k != "user"},
+            "content": content,
+            "timestamp": iso(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+        msg = discord.Message(
+            state=self.state, channel=self.channels[channel % len(self.channels)], data=payload
+        )
+        self.state._messages.append(msg)
+        return msg
+
+    def edit(self, msg: discord.Message, content: str):
+        """Edit a Message in place, as the Connection State does. Return a copy
+            of it from before the Edit, and the Message itself.
+        """
+        before = copy(msg)
+        msg._update({"content": content, "edited_timestamp": iso()})
+        return before, msg
+
+    def newcomer(self, i: int) -> discord.Member:
+        """Return a Member who has just joined."""
+        data = {
+            "user": user_payload(snowflake(), f"newcomer{i}"),
+            "roles": [],
+            "joined_at": iso(),
+            "nick": None,
+            "deaf": False,
+            "mute": False,
+        }
+        member = discord.Member(data=data, guild=self.guild, state=self.state)
+        self.guild._add_member(member)
+        return member
@@ -0,0 +1,168 @@
+"""Microbenchmarks for the Command parsing primitives.
+
+Every Command passes through `_unquote`, `etc.split`, `find_command`,
+    `parse_from_hinting` and `etc.check_types`, and most replies through
+    `util.fmt.escape`. Each is timed here on its own, against a fixed set of
+    representative inputs, so that the results of two runs can be compared.
+
+Each result is the best of several repeats, in nanoseconds per call. Results
+    can be written as JSON, and an earlier JSON file can be given to compare
+    against, which prints the ratio of each result to the earlier one.
+
+Usage: python -m benchmarks.parsing [--json OUT] [--compare OLD] [--repeat N]
+    [--filter SUBSTRING]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import platform
+import subprocess
+import sys
+from timeit import Timer
+from typing import Callable, Dict, get_type_hints, List, Tuple
+
+
+# Representative Command lines, without the Prefix.
+LINES: Dict[str, str] = {
+    "bare": "help",
+    "args": "choose red green blue yellow",
+    "quoted": "choose 'light red' \"dark green\" `blue` 'pale yellow'",
+    "options": "tempban 123456789012345678 --reason='Spamming links' --purge=3 --days=7",
+    "unicode": "choose “smart quotes” ‘single ones’ «guillemets» „low”",
+    "comment": "history -n 25 --search; @someone, this is how you look it up",
+    "long": "choose " + " ".join(f"'option number {i}'" for i in range(40)),
+}
+
+TEXTS: Dict[str, str] = {
+    "plain": "Just a normal sentence with nothing special in it at all.",
+    "markdown": "**bold** _under_ ~~strike~~ `code` > quote | pipe \\ slash " * 4,
+    "long": "The quick brown fox jumps over the lazy dog. " * 40,
+}
+
+
+def timed(func: Callable[[], object], repeat: int) -> Tuple[float, int]:
+    """Return the best time of `repeat` runs, in nanoseconds per call, and how
+        many calls were in each run.
+    """
+    timer = Timer(func)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat, loops)) / loops
+    return best * 1e9, loops
+
+
+def cases(router, src) -> List[Tuple[str, Callable[[], object]]]:
+    from petal.commands import _unquote
+    from petal.etc import check_types, split
+    from petal.util.fmt import escape
+
+    out = []
+    for name, line in LINES.items():
+        out.append((f"unquote/{name}", lambda line=line: _unquote(line)))
+    for name, line in LINES.items():
+        line = _unquote(line)
+        out.append((f"split/{name}", lambda line=line: split(line)))
+
+    for name, kword, with_src in (
+        ("first", "sudo", False),
+        ("last", "choose", False),
+        ("auth", "choose", True),
+        ("missing", "nosuchcommand", False),
+    ):
+        out.append(
+            (
+                f"find_command/{name}",
+                lambda k=kword, s=src if with_src else None: router.find_command(k, s),
+            )
+        )
+
+    for name in ("bare", "options", "comment"):
+        cline, _ = split(_unquote(LINES[name]))
+        cword = cline.pop(0)
+        _, func = router.find_command(cword)
+        out.append(
+            (
+                f"parse_from_hinting/{name}",
+                lambda c=cline, f=func: router.parse_from_hinting(list(c), f),
+            )
+        )
+
+    _, tempban = router.find_command("tempban")
+    hints = get_type_hints(tempban)
+    for name, opts in (
+        ("none", {}),
+        ("str", {"--reason": "Spamming links"}),
+        ("mixed", {"--reason": "Spamming links", "--purge": "3", "--days": "7"}),
+    ):
+        out.append(
+            (f"check_types/{name}", lambda o=opts: check_types(o, hints))
+        )
+
+    for name, text in TEXTS.items():
+        out.append((f"escape/{name}", lambda t=text: escape(t)))
+    return out
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Compare against an earlier JSON file")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", default="", help="Only run matching benchmarks")
+    opts = parser.parse_args()
+
+    # Build a Client in the Fake World, for its Router and a Source Message.
+    from benchmarks.replay import FastForwardLoop, Replay
+
+    asyncio.set_event_loop(FastForwardLoop())
+    replay = Replay()
+    router = replay.client.commands
+    src = replay.world.message(0, 0, "")
+
+    old = {}
+    if opts.compare:
+        with open(opts.compare) as fh:
+            old = json.load(fh)["results"]
+
+    results = {}
+    for name, func in cases(router, src):
+        if opts.filter not in name:
+            continue
+        ns, loops = timed(func, opts.repeat)
+        results[name] = {"ns": round(ns, 1), "loops": loops}
+        line = f"{name:<30} {ns:12.1f} ns"
+        if name in old:
+            line += f"  {ns / old[name]['ns']:6.2f}x"
+        print(line)
+
+    if opts.json:
+        with open(opts.json, "w") as fh:
+            json.dump(
+                {
+                    "revision": revision(),
+                    "date": datetime.utcnow().isoformat(timespec="seconds"),
+                    "python": sys.version.split()[0],
+                    "machine": platform.platform(),
+                    "repeat": opts.repeat,
+                    "results": results,
+                },
+                fh,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
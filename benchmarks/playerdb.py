@@ -0,0 +1,98 @@
+"""Benchmark for PlayerDB storage: Plain JSON against the Journal.
+
+Measures the startup cost of reading the PlayerDB, the cost of reading it again
+    when nothing has changed, and the cost of saving one changed player, for
+    several PlayerDB sizes.
+
+Usage: python -m benchmarks.playerdb [players ...]
+"""
+
+from collections import OrderedDict
+import json
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import uuid4
+
+from petal.util.journal import Journal, write_atomic
+
+
+def make_db(n: int):
+    return [
+        OrderedDict(
+            name="Player{}".format(i),
+            uuid=str(uuid4()),
+            altname=["Player{}".format(i)],
+            discord=str(100000000000000000 + i),
+            approved=["100000000000000000"],
+            submitted="2019-01-01_00:00",
+            suspended=0,
+            operator=0,
+            notes=[],
+        )
+        for i in range(n)
+    ]
+
+
+def timed(func, repeat: int = 5) -> float:
+    """Return the best of `repeat` runs, in milliseconds."""
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        took = (perf_counter() - start) * 1000
+        best = took if best is None else min(best, took)
+    return best
+
+
+def run(n: int):
+    with TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "playerdb.json")
+        db = make_db(n)
+        write_atomic(path, db, indent=2)
+
+        journal = Journal(path)
+        journal.load()
+        # Leave a Log half as long as the Snapshot, as it would be on average.
+        for entry in db[: max(1, n // 2)]:
+            entry["notes"].append("Bench")
+        journal.save(db)
+
+        def read_json():
+            with open(path) as fh:
+                json.load(fh, object_pairs_hook=OrderedDict)
+
+        def replay():
+            Journal(path).replay()
+
+        counter = iter(range(1 << 30))
+
+        def save_json():
+            db[-1]["suspended"] = next(counter)
+            write_atomic(path, db, indent=2)
+
+        def save_journal():
+            db[-1]["suspended"] = next(counter)
+            journal.save(db)
+
+        print(
+            "{:>7} players | read: json {:8.2f}ms  replay {:8.2f}ms"
+            " cached {:8.2f}ms | save one: json {:8.2f}ms  journal {:8.2f}ms".format(
+                n,
+                timed(read_json),
+                timed(replay),
+                timed(journal.load),
+                timed(save_json),
+                timed(save_journal),
+            )
+        )
+
+
+def main(argv):
+    for n in [int(a) for a in argv] or [100, 1000, 10000]:
+        run(n)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,324 @@
+"""Replay benchmark for the Message pipeline.
+
+A stream of Events is fed through the Event Handlers of a real Client, one at
+    a time, in a Fake World (see `benchmarks.fakes`) where every call to Discord
+    or to the Database is answered from memory. Command lines are also timed
+    through `CommandRouter.route` on its own, which leaves out the Message
+    handling around it.
+
+Event kinds:
+    chat     A plain Message, through `on_message`.
+    command  A Command Message, through `on_message`.
+    route    The same Command lines, through `route` and `print_response`.
+    edit     An edit to an earlier Message, through `on_message_edit`.
+    delete   A deletion of an earlier Message, through `on_message_delete`.
+    join     A new Member, through `on_member_join`.
+
+The Loop fast-forwards over any sleep, so that time spent waiting on purpose,
+    such as the short pause before a Command runs, is not counted; Latencies
+    are wall time spent working.
+
+Allocations are measured in a separate pass with `tracemalloc`, since tracing
+    slows everything else down: "Peak" is the most memory in use above the
+    baseline while one Event was handled, and "Retained" is how much more is
+    still in use after it, such as Messages kept in the Cache.
+
+Usage: python -m benchmarks.replay [-n EVENTS] [--mix KIND=WEIGHT,...]
+    [--stream FILE] [--save FILE] [--seed N] [--no-alloc]
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+import json
+import random
+import selectors
+import sys
+from time import perf_counter, time
+import tracemalloc
+from typing import Dict, List
+
+import discord
+
+
+KINDS = ("chat", "command", "route", "edit", "delete", "join")
+DEFAULT_MIX = {
+    "chat": 60,
+    "command": 15,
+    "route": 10,
+    "edit": 8,
+    "delete": 5,
+    "join": 2,
+}
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog and then some more words about"
+    " minecraft servers dinosaurs tunnels petals flowers gardens heck I agree"
+).split()
+COMMANDS = (
+    "choose red green blue",
+    "roll 4d6",
+    "bytes hello",
+    "utc",
+    "help",
+    "help choose",
+    "spell",
+    "nosuchcommand at all",
+)
+
+
+class FastForwardLoop(asyncio.SelectorEventLoop):
+    """An Event Loop which never waits for a Timer. Whenever it would sleep, it
+        moves its own clock forward instead, so Timers fire at once but in
+        their proper order.
+    """
+
+    def __init__(self):
+        super().__init__(selectors.DefaultSelector())
+        self.skipped: float = 0.0
+        select = self._selector.select
+
+        def fast(timeout=None):
+            if timeout is not None and timeout > 0:
+                self.skipped += timeout
+            return select(0)
+
+        self._selector.select = fast
+
+    def time(self) -> float:
+        return super().time() + self.skipped
+
+
+# ========---
+# Event Streams
+# ========---
+
+
+def synthetic(n: int, mix: Dict[str, int], seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[k] for k in kinds]
+    events = []
+    for _ in range(n):
+        kind = rng.choices(kinds, weights)[0]
+        event = {
+            "kind": kind,
+            "author": rng.randrange(1 << 16),
+            "channel": rng.randrange(1 << 8),
+        }
+        if kind in ("chat", "edit"):
+            event["content"] = " ".join(rng.choices(WORDS, k=rng.randint(1, 24)))
+        elif kind in ("command", "route"):
+            event["content"] = rng.choice(COMMANDS)
+        events.append(event)
+    return events
+
+
+def load(path: str) -> List[dict]:
+    """Load a Stream saved as JSON Lines, one Event per line."""
+    with open(path) as fh:
+        events = [json.loads(line) for line in fh if line.strip()]
+    for event in events:
+        if event.get("kind") not in KINDS:
+            raise ValueError(f"Unknown Event kind: {event.get('kind')!r}")
+    return events
+
+
+def save(path: str, events: List[dict]):
+    with open(path, "w") as fh:
+        for event in events:
+            fh.write(json.dumps(event) + "\n")
+
+
+# ========---
+# Replay
+# ========---
+
+
+class Replay:
+    def __init__(self, members: int = 200, channels: int = 8):
+        # Importing Petal reads `config.yml`, so it happens only once needed.
+        from petal import Petal, grasslands
+        from benchmarks.fakes import World, memory_db
+
+        self.client = Petal()
+        # Logging every Event would cost more than handling it.
+        grasslands.Peacock.configure({"level": "error"})
+        self.world = World(self.client, members, channels)
+        self.world.configure(self.client.config)
+        self.client.db = memory_db()
+        for engine in self.client.commands.engines:
+            engine.db = self.client.db
+
+        self.recent: List[discord.Message] = []
+        self.joined: int = 0
+
+    def earlier(self, event: dict) -> discord.Message:
+        """Return an earlier Message, or make one if there are none."""
+        if not self.recent:
+            self.recent.append(
+                self.world.message(event["author"], event["channel"], "placeholder")
+            )
+        return self.recent[event["author"] % len(self.recent)]
+
+    async def handle(self, event: dict):
+        kind = event["kind"]
+        client = self.client
+        world = self.world
+
+        if kind == "chat":
+            msg = world.message(event["author"], event["channel"], event["content"])
+            self.recent.append(msg)
+            if len(self.recent) > 500:
+                del self.recent[:250]
+            await client.on_message(msg)
+
+        elif kind == "command":
+            msg = world.message(
+                event["author"], event["channel"], client.config.prefix + event["content"]
+            )
+            await client.on_message(msg)
+
+        elif kind == "route":
+            msg = world.message(
+                event["author"], event["channel"], client.config.prefix + event["content"]
+            )
+            try:
+                response = await client.commands.route(event["content"], msg)
+            except Exception as e:
+                response = f"{type(e).__name__}: {e}"
+            if response is not None:
+                await client.print_response(msg, response)
+
+        elif kind == "edit":
+            msg = self.earlier(event)
+            before, after = world.edit(msg, event.get("content", msg.content + "!"))
+            await client.on_message_edit(before, after)
+
+        elif kind == "delete":
+            msg = self.earlier(event)
+            self.recent.remove(msg)
+            await client.on_message_delete(msg)
+
+        elif kind == "join":
+            self.joined += 1
+            await client.on_member_join(world.newcomer(self.joined))
+
+    async def timed(self, events: List[dict]) -> Dict[str, List[float]]:
+        out: Dict[str, List[float]] = defaultdict(list)
+        for event in events:
+            start = perf_counter()
+            await self.handle(event)
+            out[event["kind"]].append(perf_counter() - start)
+        return out
+
+    async def traced(self, events: List[dict]) -> Dict[str, List[tuple]]:
+        out: Dict[str, List[tuple]] = defaultdict(list)
+        tracemalloc.start()
+        try:
+            for event in events:
+                before, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                blocks = sys.getallocatedblocks()
+                await self.handle(event)
+                after, peak = tracemalloc.get_traced_memory()
+                out[event["kind"]].append(
+                    (peak - before, after - before, sys.getallocatedblocks() - blocks)
+                )
+        finally:
+            tracemalloc.stop()
+        return out
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def report(times: Dict[str, List[float]], allocs: Dict[str, List[tuple]], wall: float):
+    total = sum(len(v) for v in times.values())
+    print(
+        "{:>8} {:>7} {:>10} {:>9} {:>9} {:>11} {:>11} {:>9}".format(
+            "kind", "events", "events/s", "p50 ms", "p99 ms", "peak KiB", "kept B", "blocks"
+        )
+    )
+    for kind in KINDS + ("all",):
+        if kind == "all":
+            took = [t for v in times.values() for t in v]
+            traced = [a for v in allocs.values() for a in v]
+        else:
+            took = times.get(kind)
+            traced = allocs.get(kind, [])
+            if not took:
+                continue
+        if traced:
+            n = len(traced)
+            peak = sum(a[0] for a in traced) / n / 1024
+            kept = "{:11.0f}".format(sum(a[1] for a in traced) / n)
+            blocks = "{:9.1f}".format(sum(a[2] for a in traced) / n)
+            peak = "{:11.1f}".format(peak)
+        else:
+            peak = kept = "{:>11}".format("-")
+            blocks = "{:>9}".format("-")
+        print(
+            "{:>8} {:7} {:10.0f} {:9.3f} {:9.3f} {} {} {}".format(
+                kind,
+                len(took),
+                len(took) / sum(took),
+                percentile(took, 0.5) * 1000,
+                percentile(took, 0.99) * 1000,
+                peak,
+                kept,
+                blocks,
+            )
+        )
+    print(f"\n{total} events in {wall:.2f}s of wall time.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", type=int, default=5000, help="Synthetic Events to replay")
+    parser.add_argument(
+        "--mix", default="", help="Weights of Event kinds, as KIND=WEIGHT,..."
+    )
+    parser.add_argument("--stream", help="Replay a Stream saved as JSON Lines instead")
+    parser.add_argument("--save", help="Save the Stream as JSON Lines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--no-alloc", action="store_true", help="Skip the traced pass")
+    opts = parser.parse_args()
+
+    if opts.stream:
+        events = load(opts.stream)
+    else:
+        mix = dict(DEFAULT_MIX)
+        for pair in filter(None, opts.mix.split(",")):
+            kind, _, weight = pair.partition("=")
+            if kind not in KINDS:
+                parser.error(f"Unknown Event kind: {kind!r}")
+            mix[kind] = int(weight)
+        events = synthetic(opts.n, {k: w for k, w in mix.items() if w > 0}, opts.seed)
+    if opts.save:
+        save(opts.save, events)
+
+    loop = FastForwardLoop()
+    asyncio.set_event_loop(loop)
+    replay = Replay()
+
+    loop.run_until_complete(replay.timed(synthetic(opts.warmup, DEFAULT_MIX, -1)))
+    start = time()
+    times = loop.run_until_complete(replay.timed(events))
+    wall = time() - start
+    allocs = {} if opts.no_alloc else loop.run_until_complete(replay.traced(events))
+
+    # Keep the Log out of the middle of the Report.
+    from petal.grasslands import Peacock
+
+    Peacock.flush()
+    report(times, allocs, wall)
+    calls = replay.world.http.calls
+    print("API calls:", ", ".join(f"{k} {v}" for k, v in calls.most_common()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark for the Slotted classes, against the same classes with a __dict__.
+
+For each class, many instances are built, first of the class as it is, and then
+    of a copy of it without `__slots__`, which is how it was before. The memory
+    each instance holds and the time to build one are compared. Then a stream of
+    Commands is replayed through the Fake World, once with each kind of
+    CommandPending, to compare the memory held while they wait for edits.
+
+Usage: python -m benchmarks.slots [-n INSTANCES] [--commands N]
+"""
+
+import argparse
+import asyncio
+import gc
+from time import perf_counter
+import tracemalloc
+from typing import Callable, List, Tuple
+
+
+def unslotted(cls: type) -> type:
+    """Return a copy of a class with a __dict__ in place of its Slots."""
+    slots = set(getattr(cls, "__slots__", ()))
+    body = {
+        k: v
+        for k, v in vars(cls).items()
+        if k not in slots and k not in ("__slots__", "__dict__", "__weakref__")
+    }
+    return type(cls.__name__, cls.__bases__, body)
+
+
+def measure(make: Callable[[], object], n: int) -> Tuple[float, float]:
+    """Build `n` objects. Return the bytes held per object, and the time to
+        build one, in microseconds.
+    """
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    held = [make() for _ in range(n)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+
+    start = perf_counter()
+    held = [make() for _ in range(n)]
+    took = perf_counter() - start
+    del held
+    return (after - before) / n, took / n * 1e6
+
+
+def cases(replay) -> List[Tuple[str, type, Callable[[type], object]]]:
+    from petal.commands.core import CommandPending
+    from petal.grasslands import Giraffe, Octopus
+    from petal.menu import Menu
+    from petal.tunnel import Tunnel
+    from petal.util.dice import Dice, DieRoll
+    from petal.util.messages import Pair
+
+    client = replay.client
+    world = replay.world
+    src = world.message(0, 0, "!help")
+    channel = world.channels[0]
+    dice = Dice(6, 3)
+    user = {
+        "user_id": "1",
+        "username": "someone",
+        "count300": "1",
+        "count100": "1",
+        "count50": "1",
+        "playcount": "3",
+        "ranked_score": "1",
+        "total_score": "1",
+        "pp_rank": "1",
+        "level": "1.5",
+        "pp_raw": "1",
+        "accuracy": "99.5",
+        "count_rank_ss": "0",
+        "count_rank_s": "0",
+        "count_rank_a": "0",
+        "country": "AU",
+        "pp_country_rank": "1",
+    }
+    image = {
+        "id": "a",
+        "title": "A",
+        "description": "",
+        "datetime": 0,
+        "nsfw": False,
+        "link": "https://i.imgur.com/a.png",
+    }
+
+    def pending(cls):
+        # The Timeout Task is made by __init__, so it is counted here too, but
+        #   it is cancelled before it can run.
+        cmd = cls({}, client.print_response, client.commands, src)
+        cmd.waiting.cancel()
+        cmd.waiting = None
+        return cmd
+
+    return [
+        ("CommandPending", CommandPending, pending),
+        ("Tunnel", Tunnel, lambda cls: cls(client, channel, 1, 2)),
+        ("Menu", Menu, lambda cls: cls(client, channel, "Title", "Desc")),
+        ("Dice", Dice, lambda cls: cls(6, 3, 1, 2)),
+        ("DieRoll", DieRoll, lambda cls: cls((1, 2, 3), 1, 2, dice)),
+        ("Pair", Pair, lambda cls: cls(None, None)),
+        ("Octopus.Tentacle_user", Octopus.Tentacle_user, lambda cls: cls(user)),
+        ("Giraffe.Imgur_Image", Giraffe.Imgur_Image, lambda cls: cls(image)),
+    ]
+
+
+async def hold_commands(replay, cls: type, n: int) -> float:
+    """Make `n` Commands waiting for edits, as the Client does when one fails,
+        and return the bytes held per Command, counting its Timeout Task.
+    """
+    client = replay.client
+    msgs = [replay.world.message(i, i, "!nosuchcommand here") for i in range(n)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for msg in msgs:
+        cls(client.potential_typo, client.print_response, client.commands, msg)
+    # Let the Timeout Tasks start, which is when they add themselves.
+    await asyncio.sleep(0)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    held = len(client.potential_typo)
+    for cmd in list(client.potential_typo.values()):
+        cmd.waiting.cancel()
+    client.potential_typo.clear()
+    await asyncio.sleep(0)
+    return (after - before) / max(held, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", type=int, default=20000, help="Instances of each class")
+    parser.add_argument("--commands", type=int, default=2000)
+    opts = parser.parse_args()
+
+    from benchmarks.replay import FastForwardLoop, Replay
+
+    loop = FastForwardLoop()
+    asyncio.set_event_loop(loop)
+    replay = Replay()
+
+    async def table():
+        print(
+            "{:<24} {:>10} {:>10} {:>8} {:>10} {:>10}".format(
+                "class", "dict B", "slots B", "saved", "dict us", "slots us"
+            )
+        )
+        for name, cls, make in cases(replay):
+            old = unslotted(cls)
+            dict_b, dict_t = measure(lambda: make(old), opts.n)
+            slot_b, slot_t = measure(lambda: make(cls), opts.n)
+            print(
+                "{:<24} {:10.0f} {:10.0f} {:8.0%} {:10.2f} {:10.2f}".format(
+                    name, dict_b, slot_b, 1 - slot_b / dict_b, dict_t, slot_t
+                )
+            )
+
+    loop.run_until_complete(table())
+
+    # Now the same, but held the way the Client holds them.
+    from petal.commands.core import CommandPending
+
+    dict_b = loop.run_until_complete(
+        hold_commands(replay, unslotted(CommandPending), opts.commands)
+    )
+    slot_b = loop.run_until_complete(
+        hold_commands(replay, CommandPending, opts.commands)
+    )
+    print(
+        f"\nWaiting Commands, as held by the Client (with their Tasks):"
+        f" {dict_b:.0f}B each with a dict, {slot_b:.0f}B with Slots"
+        f" ({1 - slot_b / dict_b:.0%} saved)."
+    )
+
+    from petal.grasslands import Peacock
+
+    Peacock.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark for the cold start of Petal, up to the point of connecting.
+
+Each run is a fresh interpreter, so nothing is already imported or cached in
+    memory. Two things are timed: Importing `petal`, and importing it and then
+    building the Client, which is everything that happens before it connects
+    to Discord. The import of one run is also profiled with `-X importtime`,
+    and the Packages and Modules which took the longest are listed.
+
+Usage: python -m benchmarks.startup [--runs N] [--top N]
+"""
+
+import argparse
+from collections import Counter
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# The time is written to Standard Error, since the Log goes to Standard Output
+#   from its own Thread, and could come after it.
+IMPORT = (
+    "import sys, time; t = time.perf_counter(); import petal;"
+    " sys.stderr.write(f'{time.perf_counter() - t}\\n')"
+)
+CLIENT = (
+    "import sys, time; t = time.perf_counter(); import petal; petal.Petal();"
+    " sys.stderr.write(f'{time.perf_counter() - t}\\n')"
+)
+
+
+def run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def seconds(code: str, runs: int) -> List[float]:
+    return [float(run(code).stderr.strip().splitlines()[-1]) for _ in range(runs)]
+
+
+def importtime() -> List[Tuple[str, int, int]]:
+    """Return the Module, own time and cumulative time, in microseconds, of
+        every Module imported by `import petal`.
+    """
+    out = []
+    for line in run("import petal", "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, total, name = line[len("import time:") :].split("|")
+        if own.strip().isdigit():
+            out.append((name.strip(), int(own), int(total)))
+    return out
+
+
+def by_package(modules: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    packages = Counter()
+    for name, own, _ in modules:
+        top = name.split(".")[0]
+        # Show Petal by Module, since it is what can be changed.
+        if top == "petal":
+            top = ".".join(name.split(".")[:2])
+        packages[top] += own
+    return packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    opts = parser.parse_args()
+
+    for label, code in (("import petal", IMPORT), ("import + Petal()", CLIENT)):
+        times = seconds(code, opts.runs)
+        print(
+            f"{label:<18} median {statistics.median(times) * 1000:7.1f}ms"
+            f"  min {min(times) * 1000:7.1f}ms  ({opts.runs} runs)"
+        )
+
+    modules = importtime()
+    total = sum(own for _, own, _ in modules)
+    print(f"\nImport profile: {len(modules)} modules, {total / 1000:.1f}ms in all.")
+
+    print("\nSlowest packages (own time of all their modules):")
+    for name, own in by_package(modules).most_common(opts.top):
+        print(f"{own / 1000:8.1f}ms {own / total:6.1%}  {name}")
+
+    print("\nSlowest modules (own time):")
+    for name, own, _ in sorted(modules, key=lambda m: m[1], reverse=True)[: opts.top]:
+        print(f"{own / 1000:8.1f}ms {own / total:6.1%}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ from typing import (
     AsyncIterator,
     Callable,
     Coroutine,
+    Dict,
     Generator,
     Iterator,
     List,
@@ -23,20 +24,24 @@ from typing import (
 
 import discord
 
-from petal import grasslands
+from petal import grasslands, metrics
 from petal.commands import CommandRouter as Commands
 from petal.commands.core import CommandPending
 from petal.config import cfg
 from petal.dbhandler import DBHandler
 from petal.etc import mash
 from petal.exceptions import TunnelHobbled, TunnelSetupError
+from petal.menu import Menu
+from petal.reactions import ReactionRouter
 from petal.tunnel import Tunnel
 from petal.types import PetalClientABC, Src
 from petal.util.cdn import get_avatar
 from petal.util.embeds import membership_card
 from petal.util.fmt import escape, mono_block, userline
+from petal.util.msgindex import MessageIndex
 from petal.util.grammar import pluralize
 from petal.util.numbers import word_number
+from petal.watchdog import Watchdog
 
 
 short_time: timedelta = timedelta(seconds=10)
@@ -50,6 +55,11 @@ with open("version_info.sh", "r") as f:
 
 grasslands.version = version
 
+# Config Fields read for every Message.
+read_autoreplies = cfg.accessor("autoreplies")
+read_ignored_channels = cfg.accessor("ignoreChannels")
+read_role_grant = cfg.accessor("roleGrant")
+
 
 def first_role_named(name: str, guild: discord.Guild):
     for role in guild.roles:
@@ -72,19 +82,38 @@ class Petal(PetalClientABC):
         self.startup = datetime.utcnow()
 
         self.config = cfg
+        # Optional, and commented out by default; Not worth an error if missing.
+        grasslands.Peacock.configure(self.config.doc.get("logging"))
         self.db = DBHandler(self.config)
         self.startup = datetime.utcnow()
         self.commands = Commands(self)
         self.commands.version = version
         self.loop_tasks: List[asyncio.Future] = []
+        self.metrics_runner = None
+        self.watchdog: Optional[Watchdog] = Watchdog.from_config(self.config)
+        self.msgindex: Optional[MessageIndex] = MessageIndex.from_config(self.config)
         self.potential_typo = {}
+        self.reactions = ReactionRouter(self)
         self.session_id = hex(mash(datetime.utcnow(), digits=5, base=16)).upper()
         self.tempBanFlag = False
-        self.tunnels = []
+        self.tunnels: List[Tunnel] = []
+        # Channel ID -> The Tunnel which that Channel is connected to.
+        self.tunnel_routes: Dict[int, Tunnel] = {}
 
         self.dev_mode = devmode
         log.info("Configuration object initalized")
 
+        metrics.instrument_http(self.http)
+        metrics.gauge("petal_tunnels", "Open Tunnels.", func=lambda: len(self.tunnels))
+        metrics.gauge(
+            "petal_menu_listeners",
+            "Messages being watched for Reactions.",
+            func=lambda: len(self.reactions.listeners),
+        )
+        metrics.gauge(
+            "petal_latency_seconds", "Gateway heartbeat latency.", func=lambda: self.latency
+        )
+
     def run(self):
         try:
             super().run(self.config.token, bot=not self.config.get("selfbot"))
@@ -102,6 +131,17 @@ class Petal(PetalClientABC):
         else:
             return 0
 
+    async def close(self):
+        """Write out whatever the Message Index is still holding, and then
+            disconnect. Discord.py calls this on the way out of `run`, however
+            it ends.
+        """
+        try:
+            if self.msgindex:
+                await self.msgindex.close()
+        finally:
+            await super().close()
+
     @property
     def uptime(self):
         return datetime.utcnow() - self.startup
@@ -212,11 +252,11 @@ class Petal(PetalClientABC):
         #     return
         mainguild: discord.Guild = self.get_guild(self.config.get("mainServer"))
         interval = self.config.get("unbanInterval")
-        log.f("BANS", f"Checking for temp unbans (Interval: {interval})")
+        log.f("BANS", "Checking for temp unbans (Interval: {})", interval)
         await asyncio.sleep(interval)
         while True:
             epoch = int(time.time())
-            log.f("BANS", "Now Timestamp: " + str(epoch))
+            log.f("BANS", "Now Timestamp: {}", epoch)
 
             for entry in await mainguild.bans():
                 user = entry["user"]
@@ -225,30 +265,55 @@ class Petal(PetalClientABC):
                 if ban_expiry is None or not self.db.get_attribute(user, "tempBanned"):
                     continue
                 elif int(ban_expiry) <= int(epoch):
-                    log.f(f"{ban_expiry} compared to {epoch}")
-                    print(flush=True)
+                    log.f("BANS", "{} compared to {}", ban_expiry, epoch)
                     try:
                         await mainguild.unban(user, reason="Tempban Expired")
                     except discord.Forbidden:
-                        log.f("BANS", f"Lacking permission to unban {user.id}.")
+                        log.f("BANS", "Lacking permission to unban {}.", user.id)
                     except discord.HTTPException as e:
-                        log.f("BANS", f"FAILED to unban {user.id}: {e}")
+                        log.f("BANS", "FAILED to unban {}: {}", user.id, e)
                     else:
                         self.db.update_member(user, {"banned": False})
-                        log.f("BANS", f"Unbanned {user.name} ({user.id}) ")
+                        log.f("BANS", "Unbanned {} ({}) ", user.name, user.id)
                 else:
                     log.f(
                         "BANS",
-                        user.name
-                        + f" ({user.id}) has {int(ban_expiry) - int(epoch)} seconds left",
+                        "{} ({}) has {} seconds left",
+                        user.name,
+                        user.id,
+                        int(ban_expiry) - int(epoch),
                     )
                 await asyncio.sleep(0.5)
 
             await asyncio.sleep(interval)
 
+    async def tunnel_loop(self):
+        """Close Tunnels which have gone unused for too long. One timer serves
+            every Tunnel, so open Tunnels cost nothing while they are idle.
+        """
+        interval = 10
+        while True:
+            now = self.loop.time()
+            wait = interval
+            for t in list(self.tunnels):
+                if not t.active:
+                    continue
+                remaining = t.last_active + t.timeout - now
+                if remaining <= 0:
+                    # Closing waits for the notice to reach every Gate, which
+                    #   may be rate limited; Do not hold up the others for it.
+                    t.active = False
+                    self.loop.create_task(
+                        t.kill("Connection closed due to inactivity.")
+                    )
+                else:
+                    wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
     async def close_tunnels_to(self, channel):
         """Given a Channel, remove it from any/all Tunnels connecting to it."""
-        for t in self.tunnels:
+        t = self.get_tunnel(channel)
+        if t:
             await t.drop(channel)
 
     async def dig_tunnel(self, origin, *channels: List[int], anon=False):
@@ -257,20 +322,17 @@ class Petal(PetalClientABC):
             which to report back in case of problems. All subsequent Positional
             Arguments are Integer IDs.
         """
-        new = Tunnel(self, origin, *channels, anon)
+        new = Tunnel(self, origin, *channels, anonymous=anon)
         try:
-            tunnel_coro = new.activate()
+            await new.activate()
         except TunnelSetupError:
             return False
         else:
             self.tunnels.append(new)
-            await tunnel_coro
 
     def get_tunnel(self, channel):
-        """Given a Channel, return the first Tunnel connected to it, if any."""
-        for t in self.tunnels:
-            if channel in t.connected:
-                return t
+        """Given a Channel, return the Tunnel connected to it, if any."""
+        return self.tunnel_routes.get(channel.id)
 
     async def kill_tunnel(self, t: Tunnel):
         """Given a Tunnel, kill it. Duh."""
@@ -284,6 +346,40 @@ class Petal(PetalClientABC):
         while t in self.tunnels:
             self.tunnels.remove(t)
 
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        self.reactions.dispatch(payload, True)
+
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        self.reactions.dispatch(payload, False)
+
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        self.reactions.dispatch_clear(payload.message_id)
+
+    async def on_raw_reaction_clear_emoji(self, payload):
+        self.reactions.dispatch_clear(payload.message_id, str(payload.emoji))
+
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if self.msgindex and "content" in payload.data:
+            self.msgindex.edit(payload.message_id, payload.data["content"])
+
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not self.msgindex:
+            return
+        self.msgindex.delete(payload.message_id)
+        if payload.cached_message is None:
+            # The Message is not in the Cache, so on_message_delete will not be
+            #   called; The Index may still know what it said.
+            indexed = await self.msgindex.get(payload.message_id)
+            if indexed:
+                await self.log_indexed_delete(indexed)
+
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.RawBulkMessageDeleteEvent
+    ):
+        if self.msgindex:
+            for message_id in payload.message_ids:
+                self.msgindex.delete(message_id)
+
     async def on_member_ban(self, member):
         print("Giving database a chance to sync...")
         await asyncio.sleep(1)
@@ -313,6 +409,20 @@ class Petal(PetalClientABC):
         self.register_loop(self.status_loop, "Gamestatus", restart=True)
         self.register_loop(self.save_loop, "Autosave", restart=True)
         self.register_loop(self.ban_loop, "Auto-unban", restart=True)
+        self.register_loop(self.tunnel_loop, "Tunnel timeout", restart=True)
+        self.loop.create_task(Menu.resume_polls(self))
+        self.loop.create_task(self.commands.start_integrations())
+        if self.watchdog:
+            self.watchdog.start(self.loop)
+
+        port = self.config.get("metrics/port")
+        if port and self.metrics_runner is None:
+            try:
+                self.metrics_runner = await metrics.serve(
+                    self.config.get("metrics/host", "127.0.0.1"), port
+                )
+            except OSError as e:
+                log.warn(f"Could not serve Metrics on port {port}: {e}")
 
         if self.config.get("dbconf") is not None:
             self.register_loop(self.ask_patch_loop, "MOTD", restart=True)
@@ -736,6 +846,54 @@ class Petal(PetalClientABC):
         except discord.errors.HTTPException:
             return
 
+    async def log_indexed_delete(self, indexed):
+        """Log the deletion of a Message which is no longer in the Cache, from
+            what the Message Index remembers of it.
+        """
+        channel = self.get_channel(indexed.channel)
+        if (
+            not isinstance(channel, discord.TextChannel)
+            or channel.id in self.config.get("ignoreChannels", [])
+        ):
+            return
+
+        author = channel.guild.get_member(indexed.author)
+        mention = author.mention if author else f"<@{indexed.author}>"
+        em = discord.Embed(
+            title="Message Deleted",
+            description=f"An uncached Message by {mention} was deleted."
+            f"\nMessage ID: `{indexed.id}`",
+            colour=0xFC00A2,
+        )
+        if author:
+            em.set_author(name=author.display_name, icon_url=get_avatar(author))
+            em.set_footer(text=f"{userline(author)}")
+
+        if indexed.content:
+            em.add_field(name="Content", value=escape(indexed.content), inline=False)
+        if indexed.attachments:
+            n = indexed.attachments
+            em.add_field(
+                name="Attachments",
+                value=f"Message had {word_number(n)} ({n})"
+                f" {pluralize(n, 'Attachment')}.",
+                inline=False,
+            )
+
+        em.add_field(name="Guild", value=channel.guild.name)
+        em.add_field(
+            name="Channel", value=f"`#{channel.name}`\n{channel.mention}",
+        )
+        em.add_field(
+            name="Time of Creation", value=str(indexed.created_at)[:-7]
+        )
+        em.add_field(name="Time of Deletion", value=str(datetime.utcnow())[:-7])
+
+        try:
+            await self.log_moderation(embed=em)
+        except discord.errors.HTTPException:
+            return
+
     async def on_message_edit(self, before: Src, after: Src):
         if (
             Petal.logLock
@@ -924,8 +1082,19 @@ class Petal(PetalClientABC):
 
     async def on_message(self, message: Src):
         await self.wait_until_ready()
+        metrics.MESSAGES.inc()
+        with metrics.MESSAGE_SECONDS.time():
+            await self.process_message(message)
+
+    async def process_message(self, message: Src):
+        tunnel = self.tunnel_routes.get(message.channel.id)
+        if tunnel:
+            tunnel.post(message)
+
         content = message.content.strip()
         if isinstance(message.channel, discord.TextChannel):
+            if self.msgindex:
+                self.msgindex.add(message)
             self.db.update_member(
                 message.author,
                 {
@@ -959,8 +1128,9 @@ class Petal(PetalClientABC):
             # Potential here to autoban tag spammers.
             pass
 
+        ignored = read_ignored_channels()
         for word in message.content.split():
-            if message.channel.id in self.config.get("ignoreChannels"):
+            if message.channel.id in ignored:
                 break
             if word in self.config.wordFilter:
                 embed = discord.Embed(
@@ -982,25 +1152,22 @@ class Petal(PetalClientABC):
                 await self.log_moderation(embed=embed)
                 break
 
-        role_member = first_role_named(
-            self.config.get("roleGrant")["role"], self.main_guild
-        )
+        grant = read_role_grant()
+        role_member = first_role_named(grant["role"], self.main_guild)
         if (
             role_member
-            and message.channel.id == self.config.get("roleGrant")["chan"]
+            and message.channel.id == grant["chan"]
             and role_member not in message.author.roles
         ):
             try:
-                if self.config.get("roleGrant")["ignorecase"]:
-                    check = re.compile(
-                        self.config.get("roleGrant")["regex"], re.IGNORECASE
-                    )
+                if grant["ignorecase"]:
+                    check = re.compile(grant["regex"], re.IGNORECASE)
                 else:
-                    check = re.compile(self.config.get("roleGrant")["regex"])
+                    check = re.compile(grant["regex"])
 
                 if check.match(message.content):
                     await self.send_message(
-                        None, message.channel, self.config.get("roleGrant")["response"]
+                        None, message.channel, grant["response"]
                     )
                     await message.author.add_roles(
                         role_member, reason="Message matched the Agreement regex."
@@ -1036,7 +1203,7 @@ class Petal(PetalClientABC):
                 )
             return
 
-        replies = self.config.get("autoreplies") or {}
+        replies = read_autoreplies() or {}
         if content in replies:
             if not message.author == self.user:
                 reply = replies.get(content, "").format(
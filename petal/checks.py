@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
 import discord
 
@@ -90,6 +90,21 @@ class Reactions:
     It will be passed two params of types `discord.Reaction` and `discord.User`.
     """
 
+    @staticmethod
+    def listen(
+        client,
+        message: discord.Message,
+        user: discord.User = None,
+        emoji: Sequence[str] = None,
+    ):
+        """Watch the Reactions on one Message through the Client Reaction
+            Router. Unlike `waitfor`, this costs nothing for Reactions made on
+            any other Message.
+        """
+        return client.reactions.listen(
+            message, users=None if user is None else [user.id], emoji=emoji
+        )
+
     @staticmethod
     async def waitfor(
         client,
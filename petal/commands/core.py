@@ -1,10 +1,12 @@
 from asyncio import ensure_future as create_task, Future, sleep
+import time
 from traceback import print_exc
 from typing import Optional
 from urllib.parse import urlencode, quote_plus
 
 import discord
 
+from petal import metrics
 from petal.dbhandler import m2id
 from petal.exceptions import (
     CommandArgsError,
@@ -22,6 +24,18 @@ class CommandPending:
         period, if the message is edited, the Command will attempt to rerun.
     """
 
+    __slots__ = (
+        "dict_",
+        "output",
+        "router",
+        "src",
+        "channel",
+        "invoker",
+        "active",
+        "reply",
+        "waiting",
+    )
+
     def __init__(self, dict_, output, router, src: Src):
         self.dict_ = dict_
         self.output: Printer = output
@@ -44,10 +58,13 @@ class CommandPending:
 
         d = "No details specified."
         executed = False
+        outcome = None
+        start = time.perf_counter()
 
         try:
             # Run the Command through the Router.
             response = await self.router.run(self.src)
+            outcome = "ok" if response is not None else None
 
             # If we are still in the Try, the Command routed without errors.
             if response is not None:
@@ -64,30 +81,36 @@ class CommandPending:
                 #   must still be ready to catch it.
 
         except CommandArgsError as e:
+            outcome = "args"
             # Arguments not valid. Cease, but do not necessarily desist.
             await self.post_or_edit(f"Problem with Arguments: {str(e) or d}")
 
         except CommandAuthError as e:
+            outcome = "auth"
             # Access denied. Cease and desist.
             self.unlink()
             await self.post_or_edit(f"Sorry, not permitted; {str(e) or d}")
 
         except CommandExit as e:
+            outcome = "exit"
             # Command cancelled itself. Cease and desist.
             self.unlink()
             await self.post_or_edit(f"Command exited; {str(e) or d}")
             executed = True  # This Exit was intentional. Count it as Executed.
 
         except CommandInputError as e:
+            outcome = "input"
             # Input not valid. Cease, but do not necessarily desist.
             await self.post_or_edit(f"Bad input: {str(e) or d}")
 
         except CommandOperationError as e:
+            outcome = "failed"
             # Command could not finish, but was accepted. Cease and desist.
             self.unlink()
             await self.post_or_edit(f"Command failed; {str(e) or d}")
 
         except NotImplementedError as e:
+            outcome = "unfinished"
             # Command ran into something that is not done. Cease and desist.
             self.unlink()
             await self.post_or_edit(
@@ -95,6 +118,7 @@ class CommandPending:
             )
 
         except Exception as e:
+            outcome = "error"
             # Command could not finish. We do not know why, so play it safe.
             self.unlink()
             await self.post_or_edit(
@@ -115,6 +139,9 @@ class CommandPending:
         finally:
             if executed:
                 self.router.config.get("stats")["comCount"] += 1
+            if outcome:
+                metrics.COMMANDS.labels(outcome).inc()
+                metrics.COMMAND_SECONDS.observe(time.perf_counter() - start)
 
         return executed
 
@@ -2,10 +2,16 @@
 Access: Config Whitelist
 """
 
+import tracemalloc
+
+import discord
+
+from petal import memory, metrics, watchdog
 from petal.commands import core
 from petal.checks import all_checks, Messages
-from petal.exceptions import CommandInputError
+from petal.exceptions import CommandInputError, CommandOperationError
 from petal.menu import Menu
+from petal.profiler import SamplingProfiler
 from petal.util.grammar import pluralize, sequence_words
 
 
@@ -24,7 +30,7 @@ class CommandsMaintenance(core.Commands):
 
     async def cmd_forcesave(self, **_):
         """Force configuration file save."""
-        self.config.save(vb=1)
+        self.config.save(vb=1, force=True)
         return "Saved."
 
     async def cmd_forceload(self, **_):
@@ -171,37 +177,260 @@ class CommandsMaintenance(core.Commands):
             self.config.save()
             # return "\n".join(report)
 
-    async def cmd_menu(self, src, **_):
-        m = Menu(self.client, src.channel, "Choice", "Test Function", user=src.author)
+    async def cmd_reindex(self, args, src, _limit: int = 0, **_):
+        """Import Channel History into the Message Index.
 
-        m.add_section(
-            await m.get_one(["asdf", "qwert", "asdfqwert", "qwertyuiop"]) or "(None)"
-        )
-        await m.post()
-        m.add_section(
-            await m.get_one(["zxcv", "qazwsx", "yuiop", "poiuytrewq"]) or "(None)",
-            # overwrite=0,
+        Each Channel is read from its newest Message backwards, until the
+            retention limit of the Index or the beginning of the Channel. The
+            position is saved after every page, so running this again picks up
+            where an interrupted import stopped, and skips finished Channels.
+
+        Syntax: `{p}reindex [--limit=<number>] [<channel>...]`
+        """
+        index = self.client.msgindex
+        if not index:
+            raise CommandOperationError("The Message Index is not enabled.")
+
+        if args:
+            channels = [self.client.get_channel(int(c.strip("<#>"))) for c in args]
+            if None in channels:
+                raise CommandInputError("Could not find one of those Channels.")
+        else:
+            channels = [
+                c
+                for c in src.guild.text_channels
+                if c.permissions_for(src.guild.me).read_message_history
+            ]
+
+        for channel in channels:
+            try:
+                n = await index.backfill(channel, limit=_limit)
+            except discord.HTTPException as e:
+                yield f"Could not read {channel.mention}: {e}"
+            else:
+                yield f"Read {n} {pluralize(n, 'Message')} from {channel.mention}."
+
+    async def cmd_metrics(self, args, **_):
+        """Show the runtime Metrics of Petal.
+
+        Counters and Gauges are shown with their values, and Histograms with
+            their count, mean, and estimated 50th and 99th percentiles. Only
+            Metrics whose names contain one of the given words are shown.
+
+        Syntax: `{p}metrics [<filter>...]`
+        """
+        lines = []
+        for name, metric in metrics.REGISTRY.metrics.items():
+            if args and not any(word in name for word in args):
+                continue
+            for values, child in metric.series():
+                label = name + ("{" + ",".join(values) + "}" if values else "")
+                if isinstance(child, metrics.Histogram):
+                    totals = child.totals()
+                    count = sum(totals[:-1])
+                    if count:
+                        lines.append(
+                            f"{label}: n={count}"
+                            f" mean={totals[-1] / count:.4f}"
+                            f" p50<={child.quantile(0.5):g}"
+                            f" p99<={child.quantile(0.99):g}"
+                        )
+                else:
+                    lines.append(f"{label}: {child.value:g}")
+
+        if not lines:
+            return "No Metrics recorded yet."
+        return "```\n{}\n```".format("\n".join(lines)[-1900:])
+
+    async def cmd_blocking(self, _n: int = 5, _reset: bool = False, **_):
+        """Show where the Event Loop has been blocked.
+
+        Every time a Callback holds up the Event Loop for longer than the
+            threshold of the Watchdog, the Stack is taken, and the Stall is
+            counted against the innermost Petal function on it. The Sites which
+            have cost the most time are listed, with the Stack of the worst
+            Stall at the top one.
+
+        Syntax: `{p}blocking [--n=<number>] [--reset]`
+        """
+        dog = self.client.watchdog
+        if not dog:
+            raise CommandOperationError("The Watchdog is not enabled.")
+        lag = watchdog.LOOP_LAG
+        yield (
+            f"Loop Lag: p50 <= {lag.quantile(0.5):g}s, p99 <= {lag.quantile(0.99):g}s"
+            f"; {watchdog.LOOP_STALLS.value:g} Stalls over {dog.threshold}s."
         )
-        await m.post()
-        m.add_section(
-            await m.get_one(["aaaaaaaaa", "wysiwyg", "zzz"])
-            or "(None)"  # , overwrite=0,
+
+        sites = dog.top(_n)
+        if sites:
+            yield "```\n{}\n```".format(
+                "\n".join(
+                    f"{s.total:8.3f}s {s.count:5}x worst {s.worst:.3f}s  {s.where}"
+                    for s in sites
+                )
+            )
+            yield "Worst Stall at the top Site:```\n{}\n```".format(
+                "\n".join(sites[0].stack[-12:])[-1800:]
+            )
+        if _reset:
+            dog.reset()
+            yield "Forgot all recorded Sites."
+
+    async def cmd_profile(
+        self, src, _seconds: float = 10, _interval: float = 0.01, _top: int = 10, **_
+    ):
+        """Profile the running bot, without restarting it.
+
+        Every Thread, the Event Loop included, is sampled for a number of
+            seconds. The Stacks are saved in the collapsed format used by flame
+            graph tools, and a summary of the hottest functions, grouped by
+            Petal module, is saved beside them and posted here.
+
+        Syntax: `{p}profile [--seconds=<1-300>] [--interval=<seconds>] [--top=<number>]`
+        """
+        if not 1 <= _seconds <= 300:
+            raise CommandInputError("Profile for between 1 and 300 seconds.")
+        if not 0.001 <= _interval <= 1:
+            raise CommandInputError("Sample between every 0.001 and 1 seconds.")
+
+        prof = SamplingProfiler(_interval)
+        if prof.lock.locked():
+            raise CommandOperationError("A Profile is already being taken.")
+        yield f"Profiling for {_seconds:g} seconds..."
+
+        loop = self.client.loop
+        try:
+            profile = await loop.run_in_executor(None, prof.run, _seconds)
+        except RuntimeError as e:
+            # Another Profile started between the check above and now.
+            raise CommandOperationError(str(e)) from e
+        folded, text = await loop.run_in_executor(
+            None, profile.save, self.config.get("profileDir", "profiles")
         )
-        await m.post()
+
+        yield "```\n{}\n```".format(profile.summary(_top)[:1900])
+        try:
+            await src.channel.send(
+                f"Collapsed Stacks, saved at `{folded}`:", file=discord.File(folded)
+            )
+        except discord.HTTPException:
+            yield f"Collapsed Stacks saved at `{folded}`, summary at `{text}`."
+
+    async def cmd_memory(
+        self,
+        _start: bool = False,
+        _frames: int = 1,
+        _snapshot: bool = False,
+        _baseline: bool = False,
+        _stop: bool = False,
+        _top: int = 10,
+        **_,
+    ):
+        """Show where memory is going, without restarting.
+
+        With no options, report how much each long-lived Cache and Registry
+            holds. To find out what is growing, start tracing, then take a
+            Snapshot now and another later; Each new Snapshot lists the lines
+            of code whose allocations grew the most since the one before, or
+            since the first one, with `--baseline`. Tracing slows the bot down,
+            so stop it when finished.
+
+        Syntax: `{p}memory [--start [--frames=<1-25>]] [--snapshot [--baseline]] [--top=<number>] [--stop]`
+        """
+        tracker = memory.TRACKER
+        loop = self.client.loop
+
+        if _start:
+            if not 1 <= _frames <= 25:
+                raise CommandInputError("Keep between 1 and 25 Frames per allocation.")
+            tracker.start(_frames)
+            await loop.run_in_executor(None, tracker.snapshot)
+            yield (
+                "Memory tracing started, and a Baseline taken. Take a `--snapshot`"
+                " later to see what has grown."
+            )
+
+        elif _snapshot:
+            if not tracker.tracing:
+                raise CommandOperationError("Memory tracing is not running.")
+            await loop.run_in_executor(None, tracker.snapshot)
+            diffs = await loop.run_in_executor(None, tracker.growth, _baseline)
+            if _baseline or len(tracker.snapshots) < 2:
+                since = "the Baseline"
+            else:
+                since = "the last Snapshot"
+            yield "Top growth since {}:```\n{}\n```".format(
+                since, memory.describe_growth(diffs, _top)[:1900]
+            )
+
+        elif _stop:
+            if not tracker.tracing:
+                raise CommandOperationError("Memory tracing is not running.")
+            tracker.stop()
+            yield "Memory tracing stopped."
+
+        else:
+            sizes = await memory.report(self.client)
+            lines = [
+                f"{memory.fmt_bytes(s.bytes):>10} {s.count:7}  {s.name}"
+                + ("+" if s.truncated else "")
+                + (f" ({s.note})" if s.note else "")
+                for s in sorted(sizes, key=lambda s: s.bytes, reverse=True)
+            ]
+            rss = memory.rss()
+            if rss:
+                lines.append(f"\nProcess RSS: {memory.fmt_bytes(rss)}")
+            if tracker.tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                lines.append(
+                    f"Traced: {memory.fmt_bytes(current)} (peak {memory.fmt_bytes(peak)})"
+                )
+            yield "```\n{}\n```".format("\n".join(lines)[:1900])
+
+    async def cmd_menu(self, src, **_):
+        m = Menu(self.client, src.channel, "Choice", "Test Function", user=src.author)
+
+        try:
+            m.add_section(
+                await m.get_one(["asdf", "qwert", "asdfqwert", "qwertyuiop"])
+                or "(None)"
+            )
+            await m.post()
+            m.add_section(
+                await m.get_one(["zxcv", "qazwsx", "yuiop", "poiuytrewq"]) or "(None)",
+                # overwrite=0,
+            )
+            await m.post()
+            m.add_section(
+                await m.get_one(["aaaaaaaaa", "wysiwyg", "zzz"])
+                or "(None)"  # , overwrite=0,
+            )
+            await m.post()
+        finally:
+            await m.close()
 
     async def cmd_menu2(self, src, **_):
         m = Menu(self.client, src.channel, "Choice", "Test Function", user=src.author)
 
-        m.add_section(
-            "\n".join(await m.get_multi(["asdf", "qwert", "asdfqwert", "qwertyuiop"]))
-            or "(None)"
-        )
-        await m.post()
+        try:
+            m.add_section(
+                "\n".join(
+                    await m.get_multi(["asdf", "qwert", "asdfqwert", "qwertyuiop"])
+                )
+                or "(None)"
+            )
+            await m.post()
+        finally:
+            await m.close()
 
     async def cmd_bool(self, src, **_):
         m = Menu(self.client, src.channel, "Choice", "Test Function", user=src.author)
-        m.add_section(repr(await m.get_bool()))
-        await m.post()
+        try:
+            m.add_section(repr(await m.get_bool()))
+            await m.post()
+        finally:
+            await m.close()
 
     async def cmd_poll(
         self, args, src, _question: str = "", _channel: int = None, _time: int = 0, **_
@@ -49,136 +49,146 @@ class CommandsEvent(core.Commands):
                 )
 
         # Get channels to send to.
-        if _nomenu:
-            # Do it only conversationally.
-            menu = None
-            while True:
-                await self.client.send_message(
-                    src.author,
-                    src.channel,
-                    "Hi there, "
-                    + src.author.name
-                    + "! Please select the number of "
-                    + "each guild you want to post "
-                    + "to. (dont separate the numbers)",
-                )
-
-                await self.client.send_message(src.author, src.channel, msg)
-
-                chans = await Messages.waitfor(
-                    self.client,
-                    all_checks(
-                        Messages.by_user(src.author), Messages.in_channel(src.channel)
-                    ),
-                    timeout=20,
-                )
-
-                if chans is None:
-                    return (
-                        "Sorry, the request timed out. Please make sure you"
-                        " type a valid sequence of numbers."
-                    )
-                if self.validate_channel(channels_list, chans.content):
-                    break
-                else:
+        menu = None
+        try:
+            if _nomenu:
+                # Do it only conversationally.
+                while True:
                     await self.client.send_message(
                         src.author,
                         src.channel,
-                        "Invalid channel choices. You may try again immediately.",
+                        "Hi there, "
+                        + src.author.name
+                        + "! Please select the number of "
+                        + "each guild you want to post "
+                        + "to. (dont separate the numbers)",
                     )
-            post_to = []
-            for i in chans.content:
-                print(channels_list[int(i)])
-                post_to.append(channels_list[int(i)])
-        else:
-            # Use the Reaction-based GUI.
-            menu = Menu(
-                self.client,
-                src.channel,
-                "Event Announcement Post (by {})".format(src.author.display_name),
-                "Use the Reaction Buttons to fill out the Announcement.",
-                user=src.author,
-            )
-            if _image:
-                menu.em.set_thumbnail(url=_image)
-            selection = await menu.get_multi(
-                list(channels_dict), title="Target Channels"
-            )
-            post_to = [channels_dict[c] for c in selection if c in channels_dict]
-            if not post_to:
-                # menu.add_section(
-                #     "No valid target channels selected; Post canceled.", "Verdict"
-                # )
-                # await menu.close("No valid target channels selected; Post canceled.")
-                menu.add_section(
-                    "No Channels selected; Cancelled.", "Target Channels", overwrite=-1
-                )
-                await menu.post()
-                return
-            menu.add_section(
-                "\n".join([c.mention for c in post_to]), "Target Channels", overwrite=-1
-            )
-            await menu.post()
 
-        try:
-            msgstr = (
-                _message
-                or (
-                    await Messages.waitfor(
+                    await self.client.send_message(src.author, src.channel, msg)
+
+                    chans = await Messages.waitfor(
                         self.client,
                         all_checks(
                             Messages.by_user(src.author),
                             Messages.in_channel(src.channel),
                         ),
-                        timeout=120,
-                        channel=src.channel,
-                        prompt="What do you want to send?"
-                        " (remember: {e} = `@ev` and {h} = `@here`)",
+                        timeout=20,
                     )
-                ).content
-            ).format(e="@everyone", h="@here")
 
-        except AttributeError:
-            # Likely tried to get `None.content`.
-            raise CommandOperationError("Text Input timed out.")
+                    if chans is None:
+                        return (
+                            "Sorry, the request timed out. Please make sure you"
+                            " type a valid sequence of numbers."
+                        )
+                    if self.validate_channel(channels_list, chans.content):
+                        break
+                    else:
+                        await self.client.send_message(
+                            src.author,
+                            src.channel,
+                            "Invalid channel choices. You may try again immediately.",
+                        )
+                post_to = []
+                for i in chans.content:
+                    print(channels_list[int(i)])
+                    post_to.append(channels_list[int(i)])
+            else:
+                # Use the Reaction-based GUI.
+                menu = Menu(
+                    self.client,
+                    src.channel,
+                    "Event Announcement Post (by {})".format(src.author.display_name),
+                    "Use the Reaction Buttons to fill out the Announcement.",
+                    user=src.author,
+                )
+                if _image:
+                    menu.em.set_thumbnail(url=_image)
+                selection = await menu.get_multi(
+                    list(channels_dict), title="Target Channels"
+                )
+                post_to = [channels_dict[c] for c in selection if c in channels_dict]
+                if not post_to:
+                    # menu.add_section(
+                    #     "No valid target channels selected; Post canceled.", "Verdict"
+                    # )
+                    # await menu.close("No valid target channels selected; Post canceled.")
+                    menu.add_section(
+                        "No Channels selected; Cancelled.",
+                        "Target Channels",
+                        overwrite=-1,
+                    )
+                    await menu.post()
+                    return
+                menu.add_section(
+                    "\n".join([c.mention for c in post_to]),
+                    "Target Channels",
+                    overwrite=-1,
+                )
+                await menu.post()
 
-        if _nomenu:
-            embed = discord.Embed(
-                title="Message to post", description=msgstr, colour=0x0ACDFF
-            )
-            embed.add_field(
-                name="Channels", value="\n".join([c.mention for c in post_to])
-            )
-            await self.client.embed(src.channel, embed)
-
-            msg2 = await Messages.waitfor(
-                self.client,
-                all_checks(
-                    Messages.by_user(src.author), Messages.in_channel(src.channel)
-                ),
-                timeout=20,
-                channel=src.channel,
-                prompt="If this is correct, type `confirm`.",
-            )
+            try:
+                msgstr = (
+                    _message
+                    or (
+                        await Messages.waitfor(
+                            self.client,
+                            all_checks(
+                                Messages.by_user(src.author),
+                                Messages.in_channel(src.channel),
+                            ),
+                            timeout=120,
+                            channel=src.channel,
+                            prompt="What do you want to send?"
+                            " (remember: {e} = `@ev` and {h} = `@here`)",
+                        )
+                    ).content
+                ).format(e="@everyone", h="@here")
 
-            if msg2 is None:
-                return "Event post timed out."
-            elif msg2.content.lower() != "confirm":
-                return "Event post cancelled."
-        else:
-            # confirmer = Menu(self.client, src.channel, "Confirm Post", user=src.author)
-            menu.add_section(msgstr, "Message Preview")
-            proceed = await menu.get_bool(
-                prompt="Send this Event Announcement?", title="Confirmation"
-            )
-            if proceed is None:
-                # menu.em.description = "[ Closed ]"
-                menu.add_section("Posting timed out.", "Confirmation", overwrite=-1)
-                return
-            elif proceed is not True:
-                # menu.em.description = "[ Closed ]"
-                menu.add_section("Posting cancelled.", "Confirmation", overwrite=-1)
-                return
+            except AttributeError:
+                # Likely tried to get `None.content`.
+                raise CommandOperationError("Text Input timed out.")
+
+            if _nomenu:
+                embed = discord.Embed(
+                    title="Message to post", description=msgstr, colour=0x0ACDFF
+                )
+                embed.add_field(
+                    name="Channels", value="\n".join([c.mention for c in post_to])
+                )
+                await self.client.embed(src.channel, embed)
+
+                msg2 = await Messages.waitfor(
+                    self.client,
+                    all_checks(
+                        Messages.by_user(src.author), Messages.in_channel(src.channel)
+                    ),
+                    timeout=20,
+                    channel=src.channel,
+                    prompt="If this is correct, type `confirm`.",
+                )
+
+                if msg2 is None:
+                    return "Event post timed out."
+                elif msg2.content.lower() != "confirm":
+                    return "Event post cancelled."
+            else:
+                # confirmer = Menu(self.client, src.channel, "Confirm Post", user=src.author)
+                menu.add_section(msgstr, "Message Preview")
+                proceed = await menu.get_bool(
+                    prompt="Send this Event Announcement?", title="Confirmation"
+                )
+                if proceed is None:
+                    # menu.em.description = "[ Closed ]"
+                    menu.add_section("Posting timed out.", "Confirmation", overwrite=-1)
+                    return
+                elif proceed is not True:
+                    # menu.em.description = "[ Closed ]"
+                    menu.add_section("Posting cancelled.", "Confirmation", overwrite=-1)
+                    return
+        finally:
+            # Every return and error above leaves the Buttons on the Menu.
+            if menu:
+                await menu.close()
 
         posted: List[discord.Message] = []
         # TODO
@@ -1,6 +1,8 @@
 """Commands module for MINECRAFT-RELATED UTILITIES.
 Access: Server Operators"""
 
+import time
+
 import discord
 
 from petal.commands.minecraft import auth
@@ -155,13 +157,30 @@ class CommandsMCMod(auth.CommandsMCAuth):
     async def cmd_wlrefresh(self, src: Src, **_):
         """Force an immediate rebuild of both the PlayerDB and the whitelist itself.
 
+        Username histories are fetched from Mojang in the background; Progress is shown as they come in.
+
         Syntax: `{p}wlrefresh`
         """
-        async with src.channel.typing():
-            if self.minecraft.etc.EXPORT_WHITELIST(True, True):
-                return "Whitelist fully refreshed."
-            else:
-                return "Whitelist failed to refresh."
+        status = await src.channel.send("`<refresh starting...>`")
+        last = 0.0
+
+        async def progress(done: int, total: int):
+            nonlocal last
+            now = time.monotonic()
+            # Edits are rate limited too; Only show progress every few seconds.
+            if now - last >= 3 or done == total:
+                last = now
+                await status.edit(
+                    content="Refreshing username history: `{}/{}`".format(done, total)
+                )
+
+        if await self.minecraft.etc.WLRefresh(progress):
+            delta = self.minecraft.etc.lastExport
+            return "Whitelist fully refreshed: {} added, {} removed.".format(
+                len(delta["added"]), len(delta["removed"])
+            )
+        else:
+            return "Whitelist failed to refresh."
 
     async def cmd_wlgone(self, **_):
         """Check the WL database for any users whose Discord ID is that of someone who has left the server.
@@ -21,7 +21,7 @@ class CommandsMCPublic(auth.CommandsMCAuth):
             )
 
         submission = args[0]
-        reply, uuid = self.minecraft.WLRequest(submission, str(src.author.id))
+        reply, uuid = await self.minecraft.WLRequest(submission, str(src.author.id))
 
         if reply == 0:
             self.log.f(
@@ -68,6 +68,8 @@ class CommandsMCPublic(auth.CommandsMCAuth):
             )
         elif reply == -9:
             return "Sorry, iso and/or dav left in an unfinished function >:l"
+        elif reply == 429:
+            return "Mojang is too busy to look up that username right now D: Please try again in a minute."
         else:
             return "Nondescript Error ({})".format(reply)
 
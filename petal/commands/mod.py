@@ -22,6 +22,11 @@ from petal.menu import confirm_action, Menu
 from petal.types import Src
 from petal.util.embeds import membership_card
 from petal.util.fmt import bold, escape, mono, underline, userline
+from petal.util.messages import MessageCache
+
+
+# Messages recently quoted, so that quoting one again does not fetch it again.
+quote_cache = MessageCache()
 
 
 class CommandsMod(core.Commands):
@@ -614,7 +619,10 @@ class CommandsMod(core.Commands):
             f"(This Menu and your Invocation will also be deleted.)",
             src.author,
         )
-        confirmed = await confirm_menu.get_bool()
+        try:
+            confirmed = await confirm_menu.get_bool()
+        finally:
+            await confirm_menu.close()
 
         if confirmed is True:
             try:
@@ -676,22 +684,43 @@ class CommandsMod(core.Commands):
         if not args:
             return "Must provide at least one URL or ID pair."
 
+        # Resolve every argument first, so that all of the Messages can be
+        #   fetched at once, rather than one round trip after another.
+        targets = []
         for arg in args:
             id_c = _channel or _c or src.channel.id
             p = arg.split("/")
             id_m = p.pop(-1)
-            if p:
-                id_c = int(p[-1])
+            try:
+                if p:
+                    id_c = int(p[-1])
+                id_m = int(id_m)
+            except ValueError:
+                targets.append((arg, id_m, False))
+                continue
+            targets.append((id_c, id_m, self.client.get_channel(id_c)))
+
+        fetches = iter(
+            quote_cache.fetch_all(
+                self.client, [(c, m) for _, m, c in targets if c], concurrency=5
+            )
+        )
 
-            channel: discord.TextChannel = self.client.get_channel(id_c)
-            if not channel:
+        for id_c, id_m, channel in targets:
+            if channel is False:
+                await self.client.send_message(
+                    channel=src.channel,
+                    message="Cannot read a Message reference from `{}`.".format(id_c),
+                )
+                continue
+            elif not channel:
                 await self.client.send_message(
                     channel=src.channel,
                     message="Cannot find Channel with id `{}`.".format(id_c),
                 )
                 continue
             try:
-                message: discord.Message = await channel.fetch_message(id_m)
+                message: discord.Message = await next(fetches)
             except discord.NotFound:
                 await self.client.send_message(
                     channel=src.channel,
@@ -700,6 +729,12 @@ class CommandsMod(core.Commands):
                     ),
                 )
                 continue
+            except discord.HTTPException as e:
+                await self.client.send_message(
+                    channel=src.channel,
+                    message="Cannot fetch Message with id `{}`: {}".format(id_m, e),
+                )
+                continue
             member: discord.Member = message.author
 
             ct = escape(message.content if _preserve or _p else message.clean_content)
@@ -5,9 +5,6 @@ import asyncio
 import requests
 
 import discord
-import facebook
-from twitter import error as twitterror
-from praw.exceptions import APIException
 
 from petal.commands import core
 from petal.menu import Menu
@@ -95,18 +92,19 @@ class CommandsSocial(core.Commands):
             )
             await ui.post()
 
-            platforms = await ui.get_multi(using)
-            platforms.sort()
-            ui.em.description += "\nSelection: " + sequence_words(
-                [x.capitalize() for x in platforms]
-            )
-            await ui.post()
+            try:
+                platforms = sorted(await ui.get_multi(using))
+                ui.em.description += "\nSelection: " + sequence_words(
+                    [x.capitalize() for x in platforms]
+                )
+                await ui.post()
+            finally:
+                await ui.close()
 
             for i, name in enumerate(using):
                 if name in platforms:
                     sendto += str(i)
             if not sendto:
-                await ui.close()
                 return "Cancelled"
         else:
             sendto = flagged + _platform
@@ -170,6 +168,8 @@ class CommandsSocial(core.Commands):
 
         # Post to Reddit
         if "0" in sendto:
+            from praw.exceptions import APIException
+
             sub1 = self.router.reddit.subreddit(self.config.get("reddit")["targetSR"])
             try:
                 response = sub1.submit(
@@ -212,6 +212,8 @@ class CommandsSocial(core.Commands):
             for page in resp["data"]:
                 if page["id"] == self.config.get("facebook")["pageID"]:
                     page_access_token = page["access_token"]
+            import facebook
+
             postpage = facebook.GraphAPI(page_access_token)
 
             # if postpage is None:
@@ -261,6 +263,8 @@ class CommandsSocial(core.Commands):
         if not args[0].isnumeric():
             return "Retweet ID must only be numbers"
 
+        from twitter import error as twitterror
+
         try:
             response = self.router.twit.PostRetweet(int(args[0]), trim_user=True)
 
@@ -8,7 +8,6 @@ from re import compile
 from string import punctuation
 from typing import get_type_hints, List, Tuple
 
-import dateparser
 import discord
 import pytz
 
@@ -527,6 +526,10 @@ class CommandsUtil(core.Commands):
         else:
             tz_to = pytz.UTC
 
+        # Importing Dateparser takes longer than everything else at startup, so
+        #   it waits until someone wants it.
+        import dateparser
+
         when: dt = dateparser.parse(
             source_time,
             settings={"TIMEZONE": str(tz_from), "RETURN_AS_TIMEZONE_AWARE": True},
@@ -660,25 +663,49 @@ class CommandsUtil(core.Commands):
 
         yield f"MSG: {msg}"
 
-    async def cmd_history(self, src, _n: int = 10, **_):
+    async def cmd_history(self, args, src, _n: int = 10, _search: bool = False, **_):
         """Print your Message History.
 
         Useful for Debugging and not much else. Can tell you whether Petal is
-            able to see a certain Message.
+            able to see a certain Message. If the Message Index is enabled, it
+            is used instead of asking Discord, and your Messages can be searched.
+
+        Syntax: `{p}history [--n=<number>] [--search <words>...]`
         """
-        history = member_message_history(src.author, limit=_n)
+        index = self.client.msgindex
         now = dt.utcnow()
         s = 0
 
-        async for m in history:
-            if s > 30:
-                break
-            else:
+        if _search:
+            if not index:
+                raise CommandOperationError("The Message Index is not enabled.")
+            if not args:
+                raise CommandArgsError("Provide some words to search for.")
+            found = await index.search(
+                " ".join(args), min(_n, 30), author=src.author.id
+            )
+        elif index:
+            found = await index.by_member(src.author.id, min(_n, 30))
+        else:
+            found = None
+
+        if found is not None:
+            for m in found:
                 s += 1
                 yield (
-                    f"{m.channel.mention}, `{str(now - m.created_at)[:-7]}` ago:"
+                    f"<#{m.channel}>, `{str(now - m.created_at)[:-7]}` ago:"
                     f"{fmt.mono_block(fmt.escape(m.content))}"
                 )
+        else:
+            async for m in member_message_history(src.author, limit=_n):
+                if s > 30:
+                    break
+                else:
+                    s += 1
+                    yield (
+                        f"{m.channel.mention}, `{str(now - m.created_at)[:-7]}` ago:"
+                        f"{fmt.mono_block(fmt.escape(m.content))}"
+                    )
 
         yield f"Showing last __{s}__ Messages."
 
@@ -3633,7 +3633,7 @@ class Commands:
         if submission == "":
             return "You need to include your Minecraft username, or I will not be able to find you! Like this: `!wlme Notch` :D"
 
-        reply, uuid = self.minecraft.WLRequest(
+        reply, uuid = await self.minecraft.WLRequest(
             submission, message.author.id
         )  # Send the submission through the new function
 
@@ -3897,7 +3897,7 @@ class Commands:
             return "You have insufficient security clearance to do that D:"
 
         await self.client.send_typing(message.channel)
-        refreshReturn = self.minecraft.etc.EXPORT_WHITELIST(True, True)
+        refreshReturn = await self.minecraft.etc.WLRefresh()
         refstat = ["Whitelist failed to refresh.", "Whitelist Fully Refreshed."]
 
         return refstat[refreshReturn]
@@ -1,18 +1,189 @@
-from typing import Union
+"""Configuration module for Petal.
 
-from ruamel import yaml
+`config.yml` is read into plain Python data. Parsing YAML is slow, so the data
+    is also saved in a binary Snapshot, `.config.cache`, along with the time
+    the file was changed and a hash of its contents. At startup or reload, if
+    the YAML still matches, the Snapshot is read instead.
+
+The Snapshot is written with `marshal`, which can hold only plain data, and
+    never with `pickle`, which could run code. It is still only trusted if it
+    belongs to the owner of the YAML and nobody else may write to it.
+
+The YAML is only loaded in Round-Trip mode, which keeps its comments and
+    layout, when something has changed and must be written back. The changes
+    are then copied into that document, rather than dumping the plain data,
+    so that no comments are lost.
+"""
+
+from datetime import date, datetime
+from hashlib import sha256
+import marshal
+import os
+import pickle
+import stat
+from typing import Any, Callable, Dict, Tuple, Union
 
 from .exceptions import ConfigError
 from .grasslands import Peacock
 
 log = Peacock()
 
+PATH = "config.yml"
+CACHE = ".config.cache"
+# Change this whenever the layout of the Snapshot changes.
+CACHE_VERSION = 2
+
+
+def _stamp(raw: bytes) -> Tuple[int, str]:
+    return os.stat(PATH).st_mtime_ns, sha256(raw).hexdigest()
+
+
+def _parse(raw: bytes) -> dict:
+    from ruamel import yaml
+
+    # The C Loader is many times faster than the Round-Trip Loader, and reads
+    #   the same values; It only loses the comments, which are not needed here.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(raw, Loader=loader)
+
+
+def read() -> dict:
+    """Return the contents of the Config file as plain data, from the Snapshot
+        if it is still current.
+    """
+    with open(PATH, "rb") as fp:
+        raw = fp.read()
+    stamp = _stamp(raw)
+
+    try:
+        with open(CACHE, "rb") as fp:
+            if trusted(os.fstat(fp.fileno())):
+                version, cached, doc, dates = marshal.loads(fp.read())
+                if version == CACHE_VERSION and tuple(cached) == stamp:
+                    return _unpack(doc, dates)
+    except Exception:
+        # Missing, stale or damaged; Any of these means parsing the YAML.
+        pass
+
+    doc = _parse(raw)
+    snapshot(doc, stamp)
+    return doc
+
+
+def _pack(obj, path: tuple = (), dates: list = None):
+    """Make a document fit for `marshal`, which knows no dates. Each date is
+        replaced with None, and its Path and fields are added to `dates`, to
+        be put back by `_unpack`.
+    """
+    if isinstance(obj, dict):
+        if any(isinstance(k, date) for k in obj):
+            raise ValueError("cannot snapshot a date used as a key")
+        return {k: _pack(v, path + (k,), dates) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [_pack(v, path + (i,), dates) for i, v in enumerate(obj)]
+    elif isinstance(obj, datetime):
+        if obj.tzinfo is not None:
+            raise ValueError("cannot snapshot a datetime with a timezone")
+        dates.append((path, obj.timetuple()[:6] + (obj.microsecond,)))
+        return None
+    elif isinstance(obj, date):
+        dates.append((path, (obj.year, obj.month, obj.day)))
+        return None
+    else:
+        return obj
+
+
+def _unpack(doc, dates: list):
+    for path, fields in dates:
+        here = doc
+        for step in path[:-1]:
+            here = here[step]
+        here[path[-1]] = (datetime if len(fields) > 3 else date)(*fields)
+    return doc
+
+
+def trusted(st: os.stat_result) -> bool:
+    """Return whether a Snapshot may be read: It must be owned by whoever owns
+        the YAML, and writable by nobody else.
+    """
+    return (
+        stat.S_ISREG(st.st_mode)
+        and st.st_uid == os.stat(PATH).st_uid
+        and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+    )
+
+
+def snapshot(doc: dict, stamp: Tuple[int, str]):
+    tmp = "{}.{}.tmp".format(CACHE, os.getpid())
+    try:
+        dates = []
+        data = marshal.dumps((CACHE_VERSION, stamp, _pack(doc, (), dates), dates))
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp, CACHE)
+    except Exception as e:
+        log.warn(f"Could not save the Config Snapshot: {e}")
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def merge(into, new):
+    """Copy plain data into a Round-Trip document, in place where possible, so
+        that the comments on whatever is kept stay where they are. Return the
+        value to store in place of `into`.
+    """
+    if isinstance(into, dict) and isinstance(new, dict):
+        for key in [k for k in into if k not in new]:
+            del into[key]
+        for key, value in new.items():
+            if key in into:
+                merged = merge(into[key], value)
+                if merged is not into[key]:
+                    into[key] = merged
+            else:
+                into[key] = value
+        return into
+
+    elif isinstance(into, list) and isinstance(new, list):
+        del into[len(new) :]
+        for i, value in enumerate(new):
+            if i < len(into):
+                merged = merge(into[i], value)
+                if merged is not into[i]:
+                    into[i] = merged
+            else:
+                into.append(value)
+        return into
+
+    elif isinstance(into, type(new)) and into == new:
+        # Unchanged; Keep the original, which remembers its quoting and style.
+        return into
+
+    else:
+        return new
+
+
+# Field -> Path. Splitting the same few Fields on every read adds up.
+_paths: Dict[str, Tuple[str, ...]] = {}
+
+
+def _path(field: str) -> Tuple[str, ...]:
+    path = _paths.get(field)
+    if path is None:
+        path = _paths[field] = tuple(field.split("/"))
+    return path
+
 
 class Config(object):
     def __init__(self):
         try:
-            with open("config.yml", "r") as fp:
-                self.doc = yaml.load(fp, Loader=yaml.RoundTripLoader)
+            self.doc = read()
+            # What was last read or written, to tell whether a save is needed.
+            #   This is only ever compared, and never loaded.
+            self.saved: bytes = pickle.dumps(self.doc)
         except IOError as e:
             log.err("Could not open config.yml: " + str(e))
             exit()
@@ -95,7 +266,7 @@ class Config(object):
         """
         here = self.doc
 
-        for step in field.split("/"):
+        for step in _paths.get(field) or _path(field):
             if step in here:
                 here = here[step]
             else:
@@ -110,6 +281,24 @@ class Config(object):
 
         return here
 
+    def accessor(self, field: str, default=None) -> Callable[[], Any]:
+        """Return a Function which reads one Field, for Fields read so often
+            that even looking up their Path adds up. It reads the current
+            document every time, so it stays correct across reloads.
+        """
+        path = _path(field)
+
+        def access():
+            here = self.doc
+            for step in path:
+                if step in here:
+                    here = here[step]
+                else:
+                    return self.get(field, default)
+            return here
+
+        return access
+
     def __getitem__(self, key: Union[slice, str, tuple]):
         """Retrieve a Configuration Value by way of Object Indexing.
 
@@ -128,12 +317,25 @@ class Config(object):
             # config["field"]
             return self.get(key)
 
-    def save(self, vb=False):
+    def save(self, vb=False, force=False):
+        """Write any changes back to the Config file. Nothing is written if
+            nothing has changed since it was read or last saved, unless
+            `force` is set.
+        """
+        state = pickle.dumps(self.doc)
+        if state == self.saved and not force:
+            return
         if vb:
             log.info("Saving...")
         try:
-            with open("config.yml", "w") as fp:
-                yaml.dump(self.doc, fp, Dumper=yaml.RoundTripDumper)
+            from ruamel import yaml
+
+            with open(PATH, "r") as fp:
+                original = yaml.load(fp, Loader=yaml.RoundTripLoader)
+            with open(PATH, "w") as fp:
+                yaml.dump(merge(original, self.doc), fp, Dumper=yaml.RoundTripDumper)
+            with open(PATH, "rb") as fp:
+                snapshot(self.doc, _stamp(fp.read()))
         except PermissionError:
             log.err("No write access to config.yml")
         except IOError as e:
@@ -146,14 +348,15 @@ class Config(object):
                 + str(e)
             )
         else:
+            self.saved = state
             if vb:
                 log.info("Save complete")
         return
 
     def load(self, vb=False):
         try:
-            with open("config.yml", "r") as fp:
-                self.doc = yaml.load(fp, Loader=yaml.RoundTripLoader)
+            self.doc = read()
+            self.saved = pickle.dumps(self.doc)
         except IOError as e:
             log.err("Could not open config.yml: " + str(e))
         except Exception as e:
@@ -5,6 +5,7 @@ from random import randint as rand
 import pytz
 
 from .grasslands import Peacock
+from .metrics import DB_SECONDS, timed
 
 log = Peacock()
 
@@ -84,6 +85,7 @@ class DBHandler(object):
         self.dinos = self.db["dinos"]
         log.f("DBHandler", "Database system ready")
 
+    @timed(DB_SECONDS.labels("member_exists"))
     def member_exists(self, member):
         """
         :param member: id of member to look up
@@ -95,6 +97,7 @@ class DBHandler(object):
             return True
         return False
 
+    @timed(DB_SECONDS.labels("add_member"))
     def add_member(self, member, verbose=False):
         if not self.useDB:
             return False
@@ -111,7 +114,7 @@ class DBHandler(object):
 
             data = {
                 "name": member.name,
-                "uid": member.id,
+                "uid": m2id(member),
                 "discord_date": ts(member.created_at),
                 "local_date": ts(datetime.utcnow()),
                 "aliases": [],
@@ -147,6 +150,7 @@ class DBHandler(object):
                 log.f("DBhandler", "New member added to DB! (_id: " + str(pid) + ")")
             return True
 
+    @timed(DB_SECONDS.labels("get_member"))
     def get_member(self, member):
         """
         Retrieves a Dictionary representation of a member
@@ -160,6 +164,7 @@ class DBHandler(object):
             return r
         return None
 
+    @timed(DB_SECONDS.labels("get_attribute"))
     def get_attribute(self, member, key, verbose=True):
         """
         Retrieves a specific field from a stored member object
@@ -173,16 +178,17 @@ class DBHandler(object):
         mem = self.get_member(member)
         if mem is None:
             if verbose:
-                log.f("DBHandler", member.name + m2id(member) + " not found in db")
+                log.f("DBHandler", "{}{} not found in db", member.name, m2id(member))
             return None
 
         if key in mem:
             return mem[key]
         else:
             if verbose:
-                log.f("DBHandler", m2id(member) + " has no field: " + key)
+                log.f("DBHandler", "{} has no field: {}", m2id(member), key)
             return None
 
+    @timed(DB_SECONDS.labels("update_member"))
     def update_member(self, member, data=None, type=0, subdict=""):
         """
         Updates a the database with keys and values provided in the data field
@@ -225,9 +231,9 @@ class DBHandler(object):
                 # mem[key]:  CURRENT VALUE
                 # data[key]: NEW VALUE
                 if isinstance(data[key], dict):
-                    print(str(key) + "\n" + str(data) + "\n")
+                    log.debug("{}\n{}\n", key, data)
                     mem[key] = data[key]
-                    print(str(mem[key]))
+                    log.debug("{}", mem[key])
                     for vk in mem[key]:
                         mem[key][vk] = ts(mem[key][vk])
 
@@ -243,7 +249,7 @@ class DBHandler(object):
                         else:
                             if data[key] not in mem[key]:
                                 mem[key].append(data[key])
-                                log.f("DBHandler", "added " + data[key] + " to " + key)
+                                log.f("DBHandler", "added {} to {}", data[key], key)
                                 count += 1
 
                     else:
@@ -264,7 +270,7 @@ class DBHandler(object):
             mem["commands_count"] += 1
 
         if count > 0:
-            log.f("DBHandler", "Added " + str(count) + " fields to " + mem["name"])
+            log.f("DBHandler", "Added {} fields to {}", count, mem["name"])
 
         self.members.replace_one({"uid": m2id(member)}, mem, upsert=False)
 
@@ -44,7 +44,6 @@ def check_types(opts: Dict[str, kwopt], hints: Dict[str, T1]) -> Dict[str, T1]:
         )
 
         if want == bool or want == Opt[bool]:
-            print(repr(val))
             val = True
 
         elif want == int or want == Opt[int]:
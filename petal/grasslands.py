@@ -2,131 +2,331 @@
 Grasslands is a semi-public module for colored logging and misc APIs
 """
 
+import atexit
 from datetime import datetime as dt
+import json
+import os
+from queue import Empty, SimpleQueue
 from random import randint
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
 import requests
 
 from colorama import init, Fore
-from wiktionaryparser import WiktionaryParser as WP
 
 
 version = "0.0.0"
 
-Wikt = WP()
+Wikt = None
 def_cache = {}
 
 
+def wiktionary():
+    """Return the Wiktionary Parser, importing and creating it on first use."""
+    global Wikt
+    if Wikt is None:
+        from wiktionaryparser import WiktionaryParser
+
+        Wikt = WiktionaryParser()
+    return Wikt
+
+
+# Severity of each kind of Log Record. Records below the Level set for their
+#   Subsystem are dropped before they are even formatted.
+LEVELS: Dict[str, int] = {
+    "debug": 10,
+    "func": 15,
+    "log": 20,
+    "info": 20,
+    "command": 20,
+    "member": 20,
+    "ready": 20,
+    "warn": 30,
+    "error": 40,
+}
+
+# A Record, as passed to the Writer Thread: The time it was made, its Kind,
+#   the Colour and Tag for the terminal, the Subsystem it came from, and the
+#   Message with any Arguments to be formatted into it.
+Record = Tuple[float, str, str, str, str, str, tuple]
+
+# Arguments of these Types cannot change before the Writer gets to them, so they
+#   can be formatted later. Anything else is formatted before it is queued.
+IMMUTABLE = (str, bytes, int, float, complex, type(None))
+
+
+def render(message: str, args: tuple) -> str:
+    if not args:
+        return str(message)
+    try:
+        return str(message).format(*args)
+    except Exception as e:
+        # A bad Format, or an Argument which cannot be formatted. Whatever it
+        #   was, the Record should still say something.
+        try:
+            shown = repr(args)
+        except Exception:
+            shown = "(unprintable)"
+        return f"{message} {shown} (Bad Log Arguments: {type(e).__name__}: {e})"
+
+
+class FileSink:
+    """Write Records to a file as JSON Lines, rotating it to `<path>.1`,
+        `<path>.2` and so on once it grows past `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10485760, backups: int = 3):
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.backups: int = backups
+        self.fh = open(path, "a", encoding="utf-8")
+
+    def rotate(self):
+        self.fh.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self.fh = open(self.path, "a", encoding="utf-8")
+
+    def write(self, lines: List[str]):
+        self.fh.write("".join(lines))
+        self.fh.flush()
+        if self.max_bytes and self.fh.tell() >= self.max_bytes:
+            self.rotate()
+
+    def close(self):
+        self.fh.close()
+
+
+class Writer(threading.Thread):
+    """Take Records off a Queue and write them out in batches, so that a slow
+        terminal or journal never holds up the Event Loop.
+    """
+
+    batch = 512
+
+    def __init__(self):
+        super().__init__(name="Peacock", daemon=True)
+        self.queue: SimpleQueue = SimpleQueue()
+        self.sink: Optional[FileSink] = None
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception:
+                # Lose this batch rather than the Thread, and every Record after
+                #   it. Nobody should be left waiting on a flush, either.
+                for record in batch:
+                    if isinstance(record, threading.Event):
+                        record.set()
+
+    def write(self, batch: list):
+        lines = []
+        records = []
+        waiting = []
+
+        for record in batch:
+            if isinstance(record, threading.Event):
+                waiting.append(record)
+                continue
+
+            stamp, kind, colour, tag, sub, message, args = record
+            text = render(message, args)
+            when = dt.utcfromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S")
+            lines.append(f"{colour}{tag} [{when}] {text}{Fore.RESET}\n")
+            if self.sink:
+                records.append(
+                    json.dumps(
+                        {"ts": stamp, "level": kind, "sub": sub, "msg": text},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+
+        try:
+            if lines:
+                out = "".join(lines).encode("ascii", "ignore").decode("ascii")
+                sys.stdout.write(out)
+                sys.stdout.flush()
+            if records:
+                self.sink.write(records)
+        except (OSError, ValueError):
+            # Nowhere left to complain to.
+            pass
+
+        for event in waiting:
+            event.set()
+
+
 class Peacock(object):
-    def __init__(self, painter=None):
-        init()
+    """Logger. Every method puts a Record on a Queue and returns immediately;
+        The Writer Thread formats and prints it. Positional Arguments after the
+        Message are only formatted into it, with `str.format`, if the Record
+        is not filtered out, so hot paths should prefer them to f-Strings.
+
+    Strings and numbers are formatted later, by the Writer. Any other Argument
+        could change before then, so a Record with one is formatted at once,
+        on the calling Thread, once it is known to pass the filter.
+    """
+
+    writer: Optional[Writer] = None
+    level: int = LEVELS["debug"]
+    # Subsystem (Module name or prefix) -> Minimum Level.
+    levels: Dict[str, int] = {}
+    generation: int = 0
+
+    def __init__(self, painter=None, subsystem: str = None):
+        if subsystem is None:
+            subsystem = sys._getframe(1).f_globals.get("__name__", "")
+        self.subsystem: str = subsystem
+        self._threshold: int = 0
+        self._generation: int = -1
+
+    @classmethod
+    def configure(cls, conf: dict = None):
+        """Apply the `logging` section of the Config."""
+        conf = conf or {}
+        cls.level = LEVELS.get(str(conf.get("level", "debug")).lower(), 10)
+        cls.levels = {
+            name: LEVELS.get(str(lvl).lower(), 10)
+            for name, lvl in (conf.get("levels") or {}).items()
+        }
+        cls.generation += 1
+
+        writer = cls.start()
+        old, writer.sink = writer.sink, None
+        if old:
+            old.close()
+        if conf.get("file"):
+            try:
+                writer.sink = FileSink(
+                    conf["file"],
+                    conf.get("fileMaxBytes", 10485760),
+                    conf.get("fileBackups", 3),
+                )
+            except OSError as e:
+                Peacock().err("Cannot open Log File: {}", e)
+
+    @classmethod
+    def start(cls) -> Writer:
+        if cls.writer is None or not cls.writer.is_alive():
+            init()
+            old, cls.writer = cls.writer, Writer()
+            if old is not None:
+                # Replacing one which died; Keep writing where it was.
+                cls.writer.sink = old.sink
+            cls.writer.start()
+        return cls.writer
+
+    @classmethod
+    def flush(cls, timeout: float = 5):
+        """Block until everything logged so far has been written."""
+        if cls.writer is not None and cls.writer.is_alive():
+            done = threading.Event()
+            cls.writer.queue.put(done)
+            done.wait(timeout)
+
+    @property
+    def threshold(self) -> int:
+        if self._generation != Peacock.generation:
+            # Use the most specific Subsystem configured.
+            best = ""
+            self._threshold = Peacock.level
+            for name, lvl in Peacock.levels.items():
+                if len(name) > len(best) and (
+                    self.subsystem == name or self.subsystem.startswith(name + ".")
+                ):
+                    best = name
+                    self._threshold = lvl
+            self._generation = Peacock.generation
+        return self._threshold
+
+    def enabled(self, kind: str) -> bool:
+        return LEVELS[kind] >= self.threshold
+
+    def emit(self, kind: str, colour: str, tag: str, message, args: tuple):
+        if LEVELS[kind] < self.threshold:
+            return
+        if args and not all(isinstance(a, IMMUTABLE) for a in args):
+            message, args = render(message, args), ()
+        writer = self.writer
+        if writer is None or not writer.is_alive():
+            writer = self.start()
+        writer.queue.put(
+            (time.time(), kind, colour, tag, self.subsystem, message, args)
+        )
 
     def timestamp(self):
         return "[{}]".format(str(dt.utcnow())[:-7])
 
-    def log(self, message):
-        print(
-            Fore.WHITE
-            + "[LOG] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
-        return
-
-    def warn(self, message):
-        print(
-            Fore.YELLOW
-            + "[WARN] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
-        return
-
-    def err(self, message):
-        print(
-            Fore.RED
-            + "[ERROR] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def log(self, message, *args):
+        self.emit("log", Fore.WHITE, "[LOG]", message, args)
 
-    def info(self, message):
-        print(
-            Fore.CYAN
-            + "[INFO] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def warn(self, message, *args):
+        self.emit("warn", Fore.YELLOW, "[WARN]", message, args)
 
-    def com(self, message):
-        print(
-            Fore.BLUE
-            + "[COMMAND] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def err(self, message, *args):
+        self.emit("error", Fore.RED, "[ERROR]", message, args)
 
-    def member(self, message):
-        print(
-            Fore.CYAN
-            + "[MEMBER] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def info(self, message, *args):
+        self.emit("info", Fore.CYAN, "[INFO]", message, args)
 
-    def debug(self, message):
-        print(
-            Fore.MAGENTA
-            + "[DEBUG] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def com(self, message, *args):
+        self.emit("command", Fore.BLUE, "[COMMAND]", message, args)
 
-    def ready(self, message):
-        print(
-            Fore.GREEN
-            + "[READY] "
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def member(self, message, *args):
+        self.emit("member", Fore.CYAN, "[MEMBER]", message, args)
 
-    def f(self, func="basic", message=""):
-        print(
-            Fore.MAGENTA
-            + "[FUNC/{}] ".format(func.upper())
-            + self.timestamp()
-            + " "
-            + message.encode("ascii", "ignore").decode("ascii")
-            + Fore.RESET,
-            flush=True,
-        )
+    def debug(self, message, *args):
+        self.emit("debug", Fore.MAGENTA, "[DEBUG]", message, args)
+
+    def ready(self, message, *args):
+        self.emit("ready", Fore.GREEN, "[READY]", message, args)
+
+    def f(self, func="basic", message="", *args):
+        if LEVELS["func"] >= self.threshold:
+            self.emit("func", Fore.MAGENTA, f"[FUNC/{func.upper()}]", message, args)
+
+
+atexit.register(Peacock.flush)
 
 
 class Octopus(object):
     class Tentacle_user:
+        __slots__ = (
+            "id",
+            "name",
+            "count300",
+            "count100",
+            "count50",
+            "playcount",
+            "ranked_score",
+            "total_score",
+            "rank",
+            "level",
+            "pp_raw",
+            "accuracy",
+            "rank_ss",
+            "rank_s",
+            "rank_a",
+            "country",
+            "country_rank",
+        )
+
         def __init__(self, response):
             try:
                 self.id = response["user_id"]
@@ -151,6 +351,8 @@ class Octopus(object):
                 return None
 
     class Tentacle_beatmap:
+        __slots__ = ()
+
         def __init__(self, response):
             return
 
@@ -245,6 +447,8 @@ class Giraffe(object):
         return self.Imgur_Image(response["data"][randint(0, len(response["data"]) - 1)])
 
     class Imgur_Image:
+        __slots__ = ("id", "title", "description", "datetime", "nsfw", "link")
+
         def __init__(self, data):
             self.id = data["id"]
             self.title = data["title"]
@@ -295,7 +499,7 @@ class Define:
         if cachename in def_cache:
             result = def_cache[cachename]
         else:
-            result = Wikt.fetch(query, lang)
+            result = wiktionary().fetch(query, lang)
             def_cache[cachename] = result
         self.alts = len(result)
         if 0 <= which < self.alts:
@@ -1,11 +1,13 @@
 import json
 import datetime
+import os
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
 from uuid import UUID
 
-import requests
-
 from collections import OrderedDict
 from .grasslands import Peacock
+from .util import mojang
+from .util.journal import Journal, write_atomic
 
 __all__ = ["Minecraft"]
 log = Peacock()
@@ -69,16 +71,10 @@ def break_uid(uuid: str):
 
 
 # User gave us a username? Text is worthless. Hey Mojang, what UUID is this name?
-def id_from_name(uname_raw):
-    uname_low = uname_raw.lower()
-    response = requests.get(
-        "https://api.mojang.com/users/profiles/minecraft/{}".format(uname_low)
-    )
+async def id_from_name(uname_raw):
+    response = await mojang.resolver.id_from_name(uname_raw)
     log.f("WLME_RESP", str(response))
-    if response.status_code == 200:
-        return {"code": response.status_code, "udat": response.json()}
-    else:
-        return {"code": response.status_code}
+    return response
 
 
 # The lower level tools that actually get stuff done; Called by the main Minecraft class
@@ -87,6 +83,21 @@ class WLStuff:
         self.client = client
         self.config = client.config
 
+        # Discord ID -> {Mojang UUID: Operator Level}, mirroring the PlayerDB as
+        #   of the file stamp recorded alongside it.
+        self.opCache: Dict[str, Dict[str, int]] = {}
+        self.opCacheStamp: Optional[tuple] = None
+
+        # UUIDs changed by the most recent EXPORT_WHITELIST.
+        self.lastExport: Dict[str, List[str]] = {}
+
+        # Commented out by default, so it is read without logging its absence.
+        api = self.config.doc.get("mojangAPI")
+        if api:
+            mojang.resolver.api = api
+
+        self._journal: Optional[Journal] = None
+
     def cget(self, prop):
         v = self.config.get(prop)
         if v == "<poof>":
@@ -105,8 +116,63 @@ class WLStuff:
     def OpFile(self):
         return self.cget("minecraftOP")
 
+    @property
+    def journal(self) -> Optional[Journal]:
+        """The Journal holding the PlayerDB, if it is configured to use one."""
+        if not self.cget("minecraftJournal"):
+            return None
+        if self._journal is None or self._journal.path != self.dbName:
+            self._journal = Journal(self.dbName)
+        return self._journal
+
+    def dbStamp(self) -> Optional[tuple]:
+        """Return the modification time and size of the PlayerDB file."""
+        if self.journal:
+            return self.journal.stat()
+        try:
+            st = os.stat(self.dbName)
+        except (OSError, TypeError):
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def opTrack(self, entries: Iterable[dict]):
+        """Update the Operator cache for the given PlayerDB entries only."""
+        for entry in entries:
+            try:
+                level = int(entry.get("operator", 0))
+            except (TypeError, ValueError):
+                continue
+            self.opCache.setdefault(str(entry["discord"]), {})[entry["uuid"]] = level
+
+    def opRebuild(self, dbRead):
+        """Rebuild the Operator cache from a full PlayerDB."""
+        self.opCache = {}
+        self.opTrack(dbRead)
+        self.opCacheStamp = self.dbStamp()
+
+    def opLevel(self, discord_id: str) -> Optional[int]:
+        """Return the highest Operator Level of any PlayerDB entry belonging to
+            a Discord ID, or None if there is no such entry. The PlayerDB is
+            only read again if its file has changed since the last lookup.
+        """
+        stamp = self.dbStamp()
+        if stamp is None:
+            return None
+        if stamp != self.opCacheStamp:
+            dbRead = self.WLDump()
+            if dbRead == -7:
+                return None
+            self.opCache = {}
+            self.opTrack(dbRead)
+            self.opCacheStamp = stamp
+
+        levels = self.opCache.get(str(discord_id))
+        return max(levels.values()) if levels else None
+
     def WLDump(self):
         try:
+            if self.journal:
+                return self.journal.load()
             with open(self.dbName) as fh:
                 dbRead = json.load(fh, object_pairs_hook=OrderedDict)
         except OSError as e:
@@ -115,33 +181,54 @@ class WLStuff:
             return -7
         return dbRead
 
-    def WLSave(self, dbRead):
+    def WLSave(self, dbRead, changed: Iterable[dict] = ()):
+        """Write the PlayerDB. Entries listed in `changed` are applied to the
+            Operator cache, which stays valid only if it was already current
+            before this write.
+        """
+        fresh = self.opCacheStamp is not None and self.opCacheStamp == self.dbStamp()
         try:
-            with open(self.dbName, "w") as fh:
-                json.dump(dbRead, fh, indent=2)
-                # Save all the things
+            if self.journal:
+                # Only the entries which changed are written
+                self.journal.save(dbRead)
+            else:
+                with open(self.dbName, "w") as fh:
+                    json.dump(dbRead, fh, indent=2)
+                    # Save all the things
             ret = 0
         except OSError as e:
             # Cannot write file: Well this was all rather pointless
             log.err("OSError on DB save: " + str(e))
             ret = -7
+
+        if fresh and ret == 0:
+            self.opTrack(changed)
+            self.opCacheStamp = self.dbStamp()
+        else:
+            self.opCacheStamp = None
         return ret
 
-    def EXPORT_WHITELIST(self, refreshall=False, refreshnet=False):
+    def EXPORT_WHITELIST(self, refreshall=False):
         """Export the local database into the whitelist file itself\n\nIf Mojang ever changes the format of the server whitelist file, this is the function that will need to be updated"""
         try:
             # Stage 0: Load the full database as ordered dicts, and the whitelist as dicts
             strict = self.cget("minecraftStrictWL")
-            with open(self.dbName, "r") as fh, open(self.WhitelistFile, "r") as WLF:
-                dbRead = json.load(fh, object_pairs_hook=OrderedDict)
-                if strict:
-                    wlFile = []
-                else:
-                    wlFile = json.load(WLF)
+            with open(self.WhitelistFile, "r") as WLF:
+                wlFile = json.load(WLF)
         except OSError:
             # File does not exist: Pointless to continue
             return 0
-        opFile = []  # Op list is always strict
+        except ValueError:
+            # File is empty or broken: Treat it as empty, and it will be rewritten
+            wlFile = []
+        dbRead = self.WLDump()
+        if dbRead == -7:
+            return 0
+        try:
+            with open(self.OpFile, "r") as OPF:
+                opFile = json.load(OPF)
+        except (OSError, ValueError):
+            opFile = []
 
         if refreshall:
             # Rebuild Index
@@ -152,63 +239,132 @@ class WLStuff:
                 appNew = PLAYERDEFAULT.copy()
                 appNew.update(applicant)
 
-                if refreshnet:
-                    # Stage 3, optional: Rebuild username history
-                    namehist = requests.get(
-                        "https://api.mojang.com/user/profiles/{}/names".format(
-                            applicant["uuid"].replace("-", "")
-                        )
-                    )
-
-                    if namehist.status_code == 200:
-                        # Spy on their dark and shadowy past
-                        appNew.update(altname=[])
-                        for name in namehist.json():
-                            appNew["altname"].append(name["name"])
-                            # Ensure the name is up to date
-                            appNew["name"] = name["name"]
-
                 dbNew.append(appNew)
-            with open(self.dbName, "w") as fh:
-                json.dump(dbNew, fh, indent=2)
+            if self.WLSave(dbNew) != 0:
+                return 0
+            self.opRebuild(dbNew)
             dbRead = dbNew
 
+        # Index the current files by UUID, so that each applicant is one lookup.
+        #   Entries without one (edited by hand, perhaps) are dropped.
+        wlHave = OrderedDict(
+            (item["uuid"], item)
+            for item in wlFile
+            if isinstance(item, dict) and item.get("uuid")
+        )
+        opHave = OrderedDict(
+            (item["uuid"], item)
+            for item in opFile
+            if isinstance(item, dict) and item.get("uuid")
+        )
+        wlWant = OrderedDict() if strict else wlHave.copy()
+        opWant = OrderedDict()  # Op list is always strict
+
         for applicant in dbRead:  # Check everyone who has applied
-            app = next(
-                (item for item in wlFile if item["uuid"] == applicant["uuid"]), False
-            )
+            uuid = applicant["uuid"]
             # Is the applicant already whitelisted?
             if (
-                app == False
+                uuid not in wlWant
                 and len(applicant["approved"]) > 0
                 and not applicant["suspended"]
             ):
                 # Applicant is not whitelisted AND is approved AND is not suspended, add them
-                wlFile.append({"uuid": applicant["uuid"], "name": applicant["name"]})
-            elif app != False and applicant["suspended"] and app in wlFile:
+                wlWant[uuid] = {"uuid": uuid, "name": applicant["name"]}
+            elif applicant["suspended"]:
                 # BadPersonAlert, remove them
-                wlFile.remove(app)
+                wlWant.pop(uuid, None)
 
             # Is the applicant supposed to be an op?
             level = applicant.get("operator", 0)
             applicant["operator"] = level
             if level > 0:
-                opFile.append(
-                    {
-                        "uuid": applicant["uuid"],
-                        "name": applicant["name"],
-                        "level": level,
-                        "bypassesPlayerLimit": False,
-                    }
-                )
-
-        log.f("wl+", "Refreshing Whitelist")
-        with open(self.OpFile, "w") as OPF:
-            json.dump(opFile, OPF, indent=2)
-        with open(self.WhitelistFile, "w") as WLF:
-            json.dump(wlFile, WLF, indent=2)
+                opWant[uuid] = {
+                    "uuid": uuid,
+                    "name": applicant["name"],
+                    "level": level,
+                    "bypassesPlayerLimit": False,
+                }
+
+        self.lastExport = delta = {
+            "added": [uuid for uuid in wlWant if uuid not in wlHave],
+            "removed": [uuid for uuid in wlHave if uuid not in wlWant],
+            "opped": [uuid for uuid in opWant if opHave.get(uuid) != opWant[uuid]],
+            "deopped": [uuid for uuid in opHave if uuid not in opWant],
+        }
+
+        if list(opWant.values()) != opFile:
+            log.f(
+                "wl+",
+                "Refreshing Ops: +{} -{}".format(
+                    delta["opped"] or "[]", delta["deopped"] or "[]"
+                ),
+            )
+            write_atomic(self.OpFile, list(opWant.values()), indent=2)
+        if list(wlWant.values()) != wlFile:
+            log.f(
+                "wl+",
+                "Refreshing Whitelist: +{} -{}".format(
+                    delta["added"] or "[]", delta["removed"] or "[]"
+                ),
+            )
+            write_atomic(self.WhitelistFile, list(wlWant.values()), indent=2)
         return 1
 
+    def WLMerge(self, histories: Dict[str, List[str]]) -> int:
+        """Apply fetched username histories to the PlayerDB as it is NOW, so
+            that changes made while they were being fetched are kept.
+        """
+        if not histories:
+            return 0
+        dbRead = self.WLDump()
+        if dbRead == -7:
+            return -7
+        for applicant in dbRead:
+            names = histories.get(applicant["uuid"])
+            if names:
+                # Spy on their dark and shadowy past
+                applicant["altname"] = names
+                # Ensure the name is up to date
+                applicant["name"] = names[-1]
+        return self.WLSave(dbRead)
+
+    async def WLRefresh(
+        self, progress: Callable[[int, int], Awaitable] = None, batch: int = 25
+    ) -> int:
+        """Rebuild the username history of every player without blocking the
+            bot, then rebuild the PlayerDB and export the whitelist. Fetched
+            histories are written back every `batch` players.
+
+        If provided, `progress` is awaited with the number of players done and
+            the total after every response.
+        """
+        dbRead = self.WLDump()
+        if dbRead == -7:
+            return 0
+        uuids = [applicant["uuid"] for applicant in dbRead]
+        found: Dict[str, List[str]] = {}
+        done = 0
+
+        async for uuid, names in mojang.name_histories(
+            uuids,
+            api=self.config.doc.get("mojangAPI") or mojang.API_MOJANG,
+            concurrency=self.cget("mojangConcurrency") or 4,
+            interval=self.cget("mojangInterval") or 0.2,
+        ):
+            done += 1
+            if names:
+                found[uuid] = names
+            if len(found) >= batch:
+                if self.WLMerge(found) != 0:
+                    return 0
+                found = {}
+            if progress:
+                await progress(done, len(uuids))
+
+        if self.WLMerge(found) != 0:
+            return 0
+        return self.EXPORT_WHITELIST(refreshall=True)
+
     # update db from ephemeral player; write db to file
     def writeLocalDB(self, player):
         dbRead = self.WLDump()
@@ -223,16 +379,10 @@ class WLStuff:
         if not pIndex:
             # Player is not in the database -- Create entry
 
-            # Fetch username history
-            namehist = requests.get(
-                "https://api.mojang.com/user/profiles/{}/names".format(
-                    player["uuid"].replace("-", "")
-                )
-            )
-            if namehist.status_code == 200:
-                player["altname"] = []
-                for name in namehist.json():
-                    player["altname"].append(name["name"])
+            # The name history is not fetched here: WLRequest has already asked
+            #   the Resolver for it, and if Mojang could not answer then, it will
+            #   not answer now. WLRefresh fills it in later.
+            player["altname"] = list(player.get("altname") or [])
 
             # Set up a new profile with all the right fields
             dbRead.append(player)
@@ -245,12 +395,12 @@ class WLStuff:
                 ret = -1
             else:
                 ret = -2
-        if self.WLSave(dbRead) != 0:
+        if self.WLSave(dbRead, [player] if ret == 0 else ()) != 0:
             ret = -7
         return ret
 
     # User wants to be whitelisted? Add to the database for approval
-    def addToLocalDB(self, userdat, submitter):
+    def addToLocalDB(self, userdat, submitter, altname=None):
         uid = userdat["id"]
         uidF = break_uid(uid)
         uname = userdat["name"]
@@ -263,6 +413,7 @@ class WLStuff:
         # Apply the values to a blank slate
         pNew = PLAYERDEFAULT.copy()  # Get the slate
         pNew.update(eph)  # Imprint anything new from the player
+        pNew["altname"] = list(altname or [])
         return self.writeLocalDB(pNew), uidF
 
 
@@ -280,18 +431,20 @@ class Minecraft:
         self.suspend_table = SUSPENSION
 
     # !wlme <username>
-    def WLRequest(self, nameGiven, discord_id):
-        udict = id_from_name(nameGiven)  # Get the id from the name, or an error
+    async def WLRequest(self, nameGiven, discord_id):
+        udict = await id_from_name(nameGiven)  # Get the id from the name, or an error
         if udict["code"] == 200:
             # If this is 200, the second part will contain json data; Try to add it
-            verdict, uid = self.etc.addToLocalDB(udict["udat"], discord_id)
+            history = await mojang.resolver.history(udict["udat"]["id"])
+            verdict, uid = self.etc.addToLocalDB(udict["udat"], discord_id, history)
             return verdict, uid
         # Map response codes to function errors
         elif udict["code"] == 204:
             log.err("wlrequest failed with 204")
             return -8, "x"
         else:
-            return "Nondescript API Error ({})".format(udict["code"])
+            log.err("wlrequest failed with {}".format(udict["code"]))
+            return udict["code"], "x"
 
     # !wl <ticket>
     def WLAdd(self, idTarget, idSponsor):
@@ -394,8 +547,9 @@ class Minecraft:
                 found["suspended"] = sus
             actions.append({"name": target["name"], "change": act})
         try:
-            with open(self.etc.dbName, "w") as fh:
-                json.dump(dbRead, fh, indent=2)  # Save all the things
+            # Suspension leaves Operator Levels alone, so nothing is tracked.
+            if self.etc.WLSave(dbRead) != 0:
+                raise OSError("Failed to save PlayerDB.")
             wlwin = self.etc.EXPORT_WHITELIST()
         except OSError:  # oh no
             for revise in actions:
@@ -444,7 +598,7 @@ class Minecraft:
             )
             ret = 0
 
-        if self.etc.WLSave(dbRead) != 0:
+        if self.etc.WLSave(dbRead, [pIndex] if pIndex else ()) != 0:
             ret = -6
         return ret, doSend, targetid, targetname, self.etc.EXPORT_WHITELIST()
 
@@ -488,11 +642,7 @@ class Minecraft:
         return ret
 
     def WLAuthenticate(self, msg, clearance=3):
-        entries = self.WLQuery(str(msg.author.id))
-        for e in entries:
-            try:
-                if e["discord"] == str(msg.author.id) and e["operator"] >= clearance:
-                    return True, None
-            except:
-                continue
+        level = self.etc.opLevel(str(msg.author.id))
+        if level is not None and level >= clearance:
+            return True, None
         return False, "denied"
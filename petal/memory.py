@@ -0,0 +1,261 @@
+"""Memory Accounting module for Petal.
+
+Two tools for finding out where memory goes in a long-running session:
+
+The Size Report walks the long-lived Caches and Registries of Petal, and adds
+    up what each of them holds. Objects shared with the rest of the Client,
+    such as Guilds, Members and the Client itself, are not counted, so a Cache
+    of Messages counts the Messages, but not everything they refer to.
+
+The Tracker keeps `tracemalloc` Snapshots, taken on demand, and compares them
+    to show which lines of code have allocated the memory still in use. It
+    costs nothing until started, but slows allocation noticeably while on.
+"""
+
+from asyncio import get_event_loop
+from copy import copy
+import gc
+import os
+import sys
+import tracemalloc
+from types import BuiltinFunctionType, CodeType, FrameType, FunctionType, ModuleType
+from typing import List, Optional, Tuple
+
+import discord
+
+from . import grasslands, menu
+from .util import messages
+
+__all__ = ["Size", "deep_size", "report", "Tracker", "TRACKER"]
+
+
+# Objects of these Types belong to the Client as a whole, or to Python, and are
+#   never counted as part of a Cache.
+SHARED = (
+    type,
+    ModuleType,
+    FunctionType,
+    BuiltinFunctionType,
+    CodeType,
+    FrameType,
+    discord.Client,
+    discord.Guild,
+    discord.abc.GuildChannel,
+    discord.abc.PrivateChannel,
+    discord.abc.User,
+    discord.Role,
+    discord.Emoji,
+)
+
+# Stop walking after this many Objects, to bound the time a Report takes.
+LIMIT = 200000
+
+
+class Size:
+    __slots__ = ("name", "count", "bytes", "objects", "note", "truncated")
+
+    def __init__(self, name: str, count: int, size: int, objects: int, note: str = ""):
+        self.name: str = name
+        self.count: int = count
+        self.bytes: int = size
+        self.objects: int = objects
+        self.note: str = note
+        self.truncated: bool = objects >= LIMIT
+
+
+def deep_size(root, shared: set = None) -> Tuple[int, int]:
+    """Return the total size of an Object and everything it refers to, in
+        bytes, and the number of Objects counted.
+    """
+    skip = set(shared or ())
+    skip.update(id(m.__dict__) for m in list(sys.modules.values()) if m)
+    seen = set()
+    todo = [root]
+    total = 0
+
+    while todo and len(seen) < LIMIT:
+        obj = todo.pop()
+        if id(obj) in seen or id(obj) in skip or isinstance(obj, SHARED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj, 0)
+        todo.extend(gc.get_referents(obj))
+
+    return total, len(seen)
+
+
+def attributes(obj) -> List[object]:
+    """Return the values of all Attributes of an Object, Slots included."""
+    values = list(getattr(obj, "__dict__", {}).values())
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if hasattr(obj, name):
+                values.append(getattr(obj, name))
+    return values
+
+
+def structures(client) -> List[Tuple[str, object, int, str]]:
+    """List the long-lived Structures which are known to grow, with their
+        lengths and a note on anything about them that looks wrong.
+    """
+    out = []
+
+    out.append(("grasslands.def_cache", grasslands.def_cache, len(grasslands.def_cache), ""))
+
+    typo = client.potential_typo
+    out.append(("client.potential_typo", typo, len(typo), ""))
+
+    tunnels = client.tunnels
+    dead = sum(1 for t in tunnels if not t.active)
+    out.append(("client.tunnels", tunnels, len(tunnels), f"{dead} inactive" if dead else ""))
+
+    done = sum(1 for t in menu.live if t.done())
+    out.append(("menu.live", menu.live, len(menu.live), f"{done} finished" if done else ""))
+
+    util = getattr(client.commands, "util", None)
+    if util is not None:
+        out.append(("util.help_cache", util.help_cache, len(util.help_cache), ""))
+
+    listeners = client.reactions.listeners
+    out.append(("client.reactions", listeners, len(listeners), ""))
+
+    state = getattr(client, "_connection", None)
+    cached = getattr(state, "_messages", None)
+    if cached is not None:
+        note = f"of {cached.maxlen}" if cached.maxlen else ""
+        out.append(("discord messages", cached, len(cached), note))
+
+    for name, mod in sorted(sys.modules.items()):
+        for attr, value in list(vars(mod).items()) if name.startswith("petal.") else ():
+            if isinstance(value, messages.MessageCache):
+                out.append((f"{name[6:]}.{attr}", value.entries, len(value.entries), ""))
+
+    return out
+
+
+async def report(client) -> List[Size]:
+    """Measure each of the Structures. They are copied on the Event Loop, so
+        that none of them changes size partway through, and then walked in an
+        Executor, which can take seconds when the Caches are large.
+    """
+    # Everything the Client holds directly, such as its Config, Router and
+    #   Connection State, is shared by the Structures held within it.
+    shared = {id(v) for v in attributes(client)}
+    found = [
+        (name, copy(obj), count, note) for name, obj, count, note in structures(client)
+    ]
+
+    def measure() -> List[Size]:
+        return [
+            Size(name, count, *deep_size(obj, shared), note=note)
+            for name, obj, count, note in found
+        ]
+
+    return await get_event_loop().run_in_executor(None, measure)
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(n) < 1024:
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+    return f"{n:.1f}GiB"
+
+
+# Allocations made by the machinery of measuring are not interesting.
+FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class Tracker:
+    """Take `tracemalloc` Snapshots, and keep a few to compare. The first one
+        taken after starting is kept as the Baseline.
+    """
+
+    def __init__(self, keep: int = 4):
+        self.keep: int = keep
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.snapshots: List[tracemalloc.Snapshot] = []
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = None
+        self.snapshots.clear()
+
+    def stop(self):
+        tracemalloc.stop()
+        self.baseline = None
+        self.snapshots.clear()
+
+    def snapshot(self) -> tracemalloc.Snapshot:
+        """Take a Snapshot. Blocks for as long as it takes to copy out every
+            traced Allocation, so run it in an Executor.
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory tracing is not running.")
+        snap = tracemalloc.take_snapshot().filter_traces(FILTERS)
+        if self.baseline is None:
+            self.baseline = snap
+        else:
+            self.snapshots.append(snap)
+            del self.snapshots[: -self.keep]
+        return snap
+
+    def growth(
+        self, since_baseline: bool = False, key: str = "lineno"
+    ) -> List[tracemalloc.StatisticDiff]:
+        """Compare the latest Snapshot to the one before it, or to the Baseline,
+            and return the Sites whose memory grew the most first.
+        """
+        if not self.snapshots:
+            return []
+        new = self.snapshots[-1]
+        if since_baseline or len(self.snapshots) < 2:
+            old = self.baseline
+        else:
+            old = self.snapshots[-2]
+        return new.compare_to(old, key)
+
+    def top(self, key: str = "lineno") -> List[tracemalloc.Statistic]:
+        latest = (self.snapshots or [self.baseline])[-1]
+        return latest.statistics(key) if latest else []
+
+
+TRACKER = Tracker()
+
+
+def site(frame: tracemalloc.Frame) -> str:
+    name = frame.filename
+    for path in sorted(sys.path, key=len, reverse=True):
+        if path and name.startswith(path):
+            name = os.path.relpath(name, path)
+            break
+    return f"{name}:{frame.lineno}"
+
+
+def describe_growth(diffs: List[tracemalloc.StatisticDiff], top: int) -> str:
+    lines = [
+        f"{fmt_bytes(d.size_diff):>10} {d.count_diff:+8}  {site(d.traceback[0])}"
+        f"  (now {fmt_bytes(d.size)})"
+        for d in sorted(diffs, key=lambda d: d.size_diff, reverse=True)[:top]
+        if d.size_diff > 0
+    ]
+    return "\n".join(lines) or "No growth."
+
+
+def rss() -> Optional[int]:
+    """Return the Resident Set Size of this Process, in bytes, if known."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
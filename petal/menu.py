@@ -1,10 +1,22 @@
-from asyncio import create_task, Task  # , sleep
+from asyncio import create_task, gather, CancelledError, Task  # , sleep
 from collections import Counter
-from typing import List, Optional, Sequence, Tuple, TypeVar
+from typing import List, Optional, Sequence, Set, Tuple, TypeVar
 
-from discord import abc, Embed, TextChannel, Message, Reaction, User
+from discord import (
+    abc,
+    Embed,
+    HTTPException,
+    Message,
+    Object,
+    Reaction,
+    TextChannel,
+    User,
+)
 
-from petal.checks import all_checks, Reactions
+from petal.checks import Reactions
+from petal.metrics import MENU_WAIT_SECONDS
+from petal.poll import discard, Poll, running, store
+from petal.reactions import ReactionListener
 
 
 # Assemble all the emoji we need via hexadecimal values.
@@ -41,6 +53,17 @@ def count_votes(allowed: list, votes: Sequence[Reaction]) -> Counter:
 
 
 class Menu:
+    __slots__ = (
+        "client",
+        "channel",
+        "em",
+        "msg",
+        "master",
+        "buttons",
+        "placer",
+        "placing",
+    )
+
     def __init__(
         self,
         client,
@@ -56,6 +79,12 @@ class Menu:
         self.msg: Optional[Message] = None
         self.master: User = user
 
+        # Reaction Buttons which are on the Message, in order, and the Tasks
+        #   adding the ones which are not there yet.
+        self.buttons: List[str] = []
+        self.placer: Optional[Task] = None
+        self.placing: List[Task] = []
+
     def add_section(self, result: str, title: str = "Results", overwrite: int = None):
         if overwrite is not None:
             self.em.set_field_at(overwrite, name=title, value=str(result), inline=False)
@@ -63,8 +92,25 @@ class Menu:
             self.em.add_field(name=title, value=str(result), inline=False)
 
     async def clear(self):
+        await self.halt()
+        self.buttons.clear()
         await self.msg.clear_reactions()
 
+    async def release(self, sel: ReactionListener):
+        """End a prompt. Stop adding Buttons, and take away the Reactions the
+            user made, but leave the Buttons themselves for the next prompt to
+            reuse. They are only removed when the Menu is closed.
+        """
+        await self.halt()
+        await gather(
+            *(
+                self.msg.remove_reaction(emoji, Object(uid))
+                for emoji, users in sel.selected.items()
+                for uid in users
+            ),
+            return_exceptions=True,
+        )
+
     async def close(self, text=""):
         if text:
             self.em.description = text
@@ -77,15 +123,65 @@ class Menu:
         else:
             self.msg: Message = await self.channel.send(embed=self.em)
 
+    async def halt(self):
+        """Stop adding Buttons. The add already in flight, if any, is allowed to
+            finish, so that it cannot land after a later clear.
+        """
+        placer, self.placer = self.placer, None
+        if placer and not placer.done() and not self.placing:
+            # Has not started adding yet.
+            placer.cancel()
+
+        pending = [t for t in self.placing if not t.done()]
+        self.placing = []
+        for t in pending[1:]:
+            t.cancel()
+        await gather(*pending, *filter(None, [placer]), return_exceptions=True)
+
+    async def _place(self, emoji: str):
+        await self.msg.add_reaction(emoji)
+        self.buttons.append(emoji)
+
     async def _add_buttons(self, selection: Sequence):
-        await self.msg.clear_reactions()
-        for opt in selection:
-            await self.msg.add_reaction(opt)
+        """Make the Buttons on the Message match the selection, touching only
+            the difference between them.
+        """
+        want = [str(opt) for opt in selection]
+        keep = 0
+        for have, opt in zip(self.buttons, want):
+            if have != opt:
+                break
+            keep += 1
+
+        stale = self.buttons[keep:]
+        if stale:
+            if len(stale) > keep + 1:
+                # Cheaper to start over than to remove them one at a time.
+                await self.msg.clear_reactions()
+                keep = 0
+            else:
+                await gather(*(self.msg.clear_reaction(opt) for opt in stale))
+            del self.buttons[keep:]
+
+        # Queue every add at once. Discord.py sends requests in a Rate Limit
+        #   Bucket one after another, in the order they were made, so each goes
+        #   out as soon as the last is answered and the order is kept.
+        self.placing = [create_task(self._place(opt)) for opt in want[keep:]]
+        try:
+            await gather(*self.placing)
+        except CancelledError:
+            pass
 
     async def add_buttons(self, selection: Sequence) -> Task:
+        """Begin placing Buttons on the Message, posting it first if needed.
+            Input is accepted as soon as the Buttons land; The returned Task
+            need not be awaited.
+        """
         if not self.msg:
             await self.post()
-        return create_task(self._add_buttons(selection))
+        await self.halt()
+        self.placer = create_task(self._add_buttons(selection))
+        return self.placer
 
     # ========---
     # Begin methods for actually running the interface
@@ -104,26 +200,18 @@ class Menu:
         self.add_section(
             "\n".join(f"{letters[i]}: `{opts[i]}`" for i in range(onum)), title
         )
-        buttons: Task = await self.add_buttons(selection)
-        await self.post()
-
-        choice = (
-            await Reactions.waitfor(
-                self.client,
-                all_checks(
-                    Reactions.by_user(self.master), Reactions.on_message(self.msg)
-                ),
-                timeout=time,
-            )
-        )[0]
+        await self.add_buttons(selection)
+        with Reactions.listen(self.client, self.msg, self.master, selection) as sel:
+            await self.post()
+            with MENU_WAIT_SECONDS.labels("one").time():
+                choice = await sel.wait(time)
 
-        if not choice or choice.emoji == cancel:
+        if not choice or choice[1] == cancel:
             result = None
         else:
-            result = opts[letters.index(choice.emoji)]
+            result = opts[letters.index(choice[1])]
 
-        await buttons
-        await self.clear()
+        await self.release(sel)
         return result
 
     async def get_multi(
@@ -142,40 +230,39 @@ class Menu:
             "\n".join([prompt] + [f"{letters[i]}: `{opts[i]}`" for i in range(onum)]),
             title,
         )
-        buttons: Task = await self.add_buttons(selection)
-        await self.post()
-
-        ok = (str(cancel), str(confirm))
-        pre = all_checks(Reactions.by_user(self.master), Reactions.on_message(self.msg))
-
-        def check(react_: Reaction, user: User) -> bool:
-            return pre(react_, user) and str(react_.emoji) in ok
-
-        choice = (await Reactions.waitfor(self.client, check, timeout=time))[0]
-
-        if not choice or choice.emoji == cancel:
-            await self.clear()
-            return ()
+        await self.add_buttons(selection)
+        choice: Optional[str] = None
+        # Selections are tracked as they are made, rather than by fetching the
+        #   Message afterwards and asking who reacted with each option. Events
+        #   are replayed in order, so this is the selection at the moment of
+        #   confirmation, even if more Reactions arrive after it.
+        chosen: Set[str] = set()
+        with Reactions.listen(self.client, self.msg, self.master, selection) as sel:
+            await self.post()
+            deadline = self.client.loop.time() + time
+            while choice is None:
+                event = await sel.next(deadline - self.client.loop.time())
+                if event is None:
+                    break
+                added, emoji, _ = event
+                if emoji in (cancel, confirm):
+                    if added:
+                        choice = emoji
+                elif added:
+                    chosen.add(emoji)
+                else:
+                    chosen.discard(emoji)
+            MENU_WAIT_SECONDS.labels("multi").observe(
+                self.client.loop.time() - deadline + time
+            )
 
-        try:
-            vm: Message = await self.channel.fetch_message(self.msg.id)
-        except:
-            await self.clear()
+        await self.release(sel)
+        if not choice or choice == cancel:
             return ()
 
         results: Tuple[T_, ...] = tuple(
-            [
-                opts[letters.index(react.emoji)]
-                for react in vm.reactions
-                if (
-                    react.emoji in selection[1:-1]
-                    and self.master in await react.users().flatten()
-                )
-            ]
+            opts[i] for i in range(onum) if letters[i] in chosen
         )
-
-        await buttons
-        await self.clear()
         return results
 
     async def get_bool(
@@ -188,89 +275,68 @@ class Menu:
         # await self.post()
         # adding = create_task(self.add_buttons(selection))
         self.add_section(prompt, title)
-        adding: Task = await self.add_buttons(selection)
-        await self.post()
-
-        choice = (
-            await Reactions.waitfor(
-                self.client,
-                all_checks(
-                    Reactions.by_user(self.master), Reactions.on_message(self.msg)
-                ),
-                timeout=time,
-            )
-        )[0]
+        await self.add_buttons(selection)
+        with Reactions.listen(self.client, self.msg, self.master, selection) as sel:
+            await self.post()
+            with MENU_WAIT_SECONDS.labels("bool").time():
+                choice = await sel.wait(time)
 
-        await adding
-        await self.clear()
+        await self.release(sel)
 
         if not choice:
             return None
-        elif choice.emoji == confirm:
+        elif choice[1] == confirm:
             return True
-        elif choice.emoji == cancel:
+        elif choice[1] == cancel:
             return False
         else:
             return None
 
     ### PUBLIC interfaces; ANYONE may respond.
 
-    # async def get_poll(self, opts: list, time=3600) -> dict:
-    #     """Run a MULTIPLE CHOICE open poll that anyone can answer."""
-    #     onum = len(opts)
-    #     if not 1 <= onum <= len(letters):
-    #         return {}
-    #     selection = letters[:onum]
-    #
-    #     buttons = await self.add_buttons(
-    #         "**Poll:** Multiple Choice:\n"
-    #         + "\n".join((f"{letters[i]}: `{opts[i]}`" for i in range(onum))),
-    #         selection,
-    #     )
-    #
-    #     await buttons
-    #     await sleep(time)
-    #
-    #     try:
-    #         vm = await self.channel.fetch_message(self.msg.id)
-    #     except:
-    #         return {}
-    #
-    #     outcome = count_votes(selection, vm.reactions)
-    #     await self.clear()
-    #
-    #     self.em.description += "\n\n**__RESULTS:__**"
-    #     for k, v in outcome.items():
-    #         self.em.description += "\n**`{}`**: __`{}`__".format(
-    #             opts[letters.index(k)], v
-    #         )
-    #     await self.post()
-    #
-    #     return outcome
-
-    # async def get_vote(self, time=3600) -> dict:
-    #     """Run a YES OR NO open vote that anyone can answer."""
-    #     selection = [cancel, confirm]
-    #
-    #     buttons = await self.add_buttons("**Vote:** Yes or No", selection)
-    #
-    #     await buttons
-    #     await sleep(time)
-    #
-    #     try:
-    #         vm = await self.channel.fetch_message(self.msg.id)
-    #     except:
-    #         return {}
-    #
-    #     outcome = count_votes(selection, vm.reactions)
-    #     await self.clear()
-    #
-    #     self.em.description += "\n\n**__RESULTS:__**"
-    #     for k, v in outcome.items():
-    #         self.em.description += "\n**`{}`**: __`{}`__".format(k, v)
-    #     await self.post()
-    #
-    #     return outcome
+    async def get_poll(self, opts: Sequence[str], time: int = 3600) -> Counter:
+        """Run a MULTIPLE CHOICE open poll that anyone can answer."""
+        onum = len(opts)
+        if not 1 <= onum <= len(letters):
+            return Counter()
+        return await self._run_poll([str(o) for o in opts], letters[:onum], time)
+
+    async def get_vote(self, time: int = 3600) -> Counter:
+        """Run a YES OR NO open vote that anyone can answer."""
+        return await self._run_poll(["No", "Yes"], [cancel, confirm], time)
+
+    async def _run_poll(
+        self, opts: List[str], selection: Sequence[str], time: int
+    ) -> Counter:
+        poll = Poll.lasting(self, opts, list(selection), time)
+        self.add_section(poll.render(), "Votes")
+        await self.post()
+        await self.add_buttons(selection)
+        return await poll.run()
+
+    @classmethod
+    async def resume_polls(cls, client):
+        """Pick up the Polls which were running when Petal last stopped, with
+            the Votes they had counted by then.
+        """
+        for record in store(client).load():
+            if record["id"] in running:
+                # Already resumed, before a reconnection.
+                continue
+            channel = client.get_channel(record["channel"])
+            try:
+                msg: Message = await channel.fetch_message(int(record["id"]))
+            except (AttributeError, HTTPException):
+                # The Poll is gone, and so is the need to keep it.
+                discard(client, record["id"])
+                continue
+
+            menu = cls(client, channel, record["title"], record["description"])
+            menu.msg = msg
+            if msg.embeds:
+                menu.em = msg.embeds[0]
+            menu.buttons = list(record["buttons"])
+            create_task(Poll.from_record(menu, record).run())
 
 
 async def confirm_action(
@@ -286,4 +352,7 @@ async def confirm_action(
     channel: TextChannel = src.channel
 
     m = Menu(client, channel, title, desc, author)
-    return await m.get_bool(timeout, prompt, section_title)
+    try:
+        return await m.get_bool(timeout, prompt, section_title)
+    finally:
+        await m.close()
@@ -0,0 +1,372 @@
+"""Metrics module for Petal.
+
+An in-process Registry of Counters, Gauges and Histograms, which can be shown
+    with the `metrics` command, or served in the Prometheus text format on a
+    local HTTP port, so that throughput and latency can be graphed.
+
+Updates never take a Lock. Every Thread adds into its own Cell, and the Cells
+    are only summed when the Metrics are read, which is rare by comparison.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from threading import get_ident
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .grasslands import Peacock
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "counter",
+    "gauge",
+    "histogram",
+    "serve",
+]
+
+log = Peacock()
+
+
+# Default Histogram Buckets, in seconds; Suited to Network and Database calls.
+BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labelset(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str = "", labels: Sequence[str] = ()):
+        self.name: str = name
+        self.doc: str = doc
+        self.label_names: Tuple[str, ...] = tuple(labels)
+        self.children: Dict[Tuple[str, ...], "Metric"] = {}
+
+    def labels(self, *values) -> "Metric":
+        """Return the Child of this Metric for one set of Label values."""
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}")
+            child = self.children.setdefault(key, self._child())
+        return child
+
+    def _child(self) -> "Metric":
+        # The Child keeps the Label names, to render its samples with.
+        return type(self)(self.name, self.doc, self.label_names)
+
+    def series(self) -> Iterator[Tuple[Tuple[str, ...], "Metric"]]:
+        if self.label_names:
+            # Only the Children of a labelled Metric hold values.
+            yield from list(self.children.items())
+        else:
+            yield (), self
+
+    def samples(self, values: Tuple[str, ...]) -> Iterator[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.series():
+            for suffix, labels, value in child.samples(values):
+                lines.append(f"{self.name}{suffix}{labels} {value:g}")
+        return lines
+
+
+class Counter(Metric):
+    """A value which only ever goes up."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str = "", labels: Sequence[str] = ()):
+        super().__init__(name, doc, labels)
+        # Thread ID -> Cell. A Thread only ever writes its own Cell.
+        self.cells: Dict[int, List[float]] = {}
+
+    def inc(self, n: float = 1):
+        cell = self.cells.get(get_ident())
+        if cell is None:
+            cell = self.cells[get_ident()] = [0]
+        cell[0] += n
+
+    @property
+    def value(self) -> float:
+        return sum(cell[0] for cell in list(self.cells.values()))
+
+    def samples(self, values):
+        yield "_total", _labelset(self.label_names, values), self.value
+
+
+class Gauge(Metric):
+    """A value which goes up and down, or which is read from a Function when
+        it is collected.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str = "",
+        labels: Sequence[str] = (),
+        func: Callable[[], float] = None,
+    ):
+        super().__init__(name, doc, labels)
+        self.func: Optional[Callable[[], float]] = func
+        self.current: float = 0
+
+    def set(self, value: float):
+        self.current = value
+
+    def inc(self, n: float = 1):
+        self.current += n
+
+    def dec(self, n: float = 1):
+        self.current -= n
+
+    @property
+    def value(self) -> float:
+        if self.func is not None:
+            try:
+                return self.func()
+            except Exception:
+                return float("nan")
+        return self.current
+
+    def samples(self, values):
+        yield "", _labelset(self.label_names, values), self.value
+
+
+class Histogram(Metric):
+    """Count Observations into fixed Buckets, and keep their sum."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str = "",
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS,
+    ):
+        super().__init__(name, doc, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Thread ID -> [Count per Bucket..., Count over the last, Sum].
+        self.cells: Dict[int, List[float]] = {}
+
+    def _child(self) -> "Histogram":
+        return Histogram(self.name, self.doc, self.label_names, self.buckets)
+
+    def observe(self, value: float):
+        cell = self.cells.get(get_ident())
+        if cell is None:
+            cell = self.cells[get_ident()] = [0] * (len(self.buckets) + 2)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def totals(self) -> List[float]:
+        out = [0] * (len(self.buckets) + 2)
+        for cell in list(self.cells.values()):
+            for i, v in enumerate(cell):
+                out[i] += v
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Estimate a Quantile, as the upper bound of the Bucket it falls in."""
+        totals = self.totals()
+        count = sum(totals[:-1])
+        if not count:
+            return 0.0
+        running = 0
+        for bound, n in zip(self.buckets, totals):
+            running += n
+            if running >= q * count:
+                return bound
+        return float("inf")
+
+    def samples(self, values):
+        totals = self.totals()
+        running = 0
+        for bound, n in zip(self.buckets, totals):
+            running += n
+            yield "_bucket", _labelset(
+                self.label_names, values, f'le="{bound:g}"'
+            ), running
+        running += totals[-2]
+        yield "_bucket", _labelset(self.label_names, values, 'le="+Inf"'), running
+        yield "_count", _labelset(self.label_names, values), running
+        yield "_sum", _labelset(self.label_names, values), totals[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Asking again for the same name returns the existing Metric, so that
+        #   reloading a Module does not split its Metrics in two.
+        return self.metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        return "\n".join(
+            line for metric in self.metrics.values() for line in metric.render()
+        ) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, doc: str = "", labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, doc, labels))
+
+
+def gauge(
+    name: str, doc: str = "", labels: Sequence[str] = (), func: Callable = None
+) -> Gauge:
+    return REGISTRY.register(Gauge(name, doc, labels, func))
+
+
+def histogram(
+    name: str, doc: str = "", labels: Sequence[str] = (), buckets=BUCKETS
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, doc, labels, buckets))
+
+
+def timed(metric: Histogram):
+    """Decorate a Function to observe how long each call takes."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*a, **kw):
+            start = time.perf_counter()
+            try:
+                return func(*a, **kw)
+            finally:
+                metric.observe(time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+# ========---
+# Metrics used across Petal.
+# ========---
+
+MESSAGES = counter("petal_messages", "Messages received.")
+MESSAGE_SECONDS = histogram(
+    "petal_message_seconds", "Time spent handling each received Message."
+)
+COMMANDS = counter("petal_commands", "Commands run, by outcome.", ["outcome"])
+COMMAND_SECONDS = histogram(
+    "petal_command_seconds", "Time from invocation to the end of each Command."
+)
+DB_SECONDS = histogram("petal_db_seconds", "Time spent in Database calls.", ["op"])
+HTTP_REQUESTS = counter(
+    "petal_http_requests", "Requests made to the Discord API.", ["method", "status"]
+)
+HTTP_SECONDS = histogram(
+    "petal_http_seconds",
+    "Latency of requests to the Discord API.",
+    ["method", "route"],
+)
+TUNNEL_RELAYS = counter(
+    "petal_tunnel_relays", "Messages relayed through Tunnels, by result.", ["result"]
+)
+TUNNEL_SECONDS = histogram(
+    "petal_tunnel_send_seconds", "Time to deliver one relayed Message to one Gate."
+)
+MENU_WAIT_SECONDS = histogram(
+    "petal_menu_wait_seconds",
+    "Time spent waiting for an answer to a Menu.",
+    ["kind"],
+    buckets=(0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 120, 300, 600),
+)
+
+
+def instrument_http(http):
+    """Wrap the `request` method of a `discord.http.HTTPClient`, so that every
+        API call is counted and timed. Calls are labelled with the Route
+        template, such as `/channels/{channel_id}/messages`, rather than the
+        full path, to keep the number of series small.
+    """
+    request = http.request
+
+    @wraps(request)
+    async def wrapper(route, **kw):
+        start = time.perf_counter()
+        status = "error"
+        try:
+            result = await request(route, **kw)
+            status = "2xx"
+            return result
+        except Exception as e:
+            code = getattr(e, "status", None)
+            if code:
+                status = f"{code // 100}xx"
+            raise
+        finally:
+            HTTP_SECONDS.labels(route.method, route.path).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(route.method, status).inc()
+
+    http.request = wrapper
+
+
+async def serve(host: str = "127.0.0.1", port: int = 9464):
+    """Serve the Registry over HTTP, at `/metrics`. Return the Runner, which
+        should be cleaned up to stop serving.
+    """
+    # Only needed when serving, and slow to import.
+    from aiohttp import web
+
+    async def handle(_request):
+        return web.Response(
+            text=REGISTRY.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.ready(f"Serving Metrics on http://{host}:{port}/metrics")
+    return runner
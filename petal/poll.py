@@ -0,0 +1,186 @@
+"""Poll module for Petal.
+
+Votes are counted as Reactions arrive, rather than by sleeping for the whole
+    Poll and then fetching the Message to count them. Every User has at most one
+    Vote; Choosing another option moves their Vote, and their old Reaction is
+    removed. Running totals are shown on the Poll, and saved to disk, no more
+    often than once per `interval` seconds, so that a Poll can pick up where it
+    left off after a restart.
+"""
+
+from asyncio import ensure_future as create_task, get_event_loop
+from collections import Counter
+import time
+from typing import Dict, List, Optional
+
+import discord
+
+from .grasslands import Peacock
+from .util.journal import Journal
+
+__all__ = ["Poll", "discard", "running", "store"]
+
+log = Peacock()
+
+_store: Optional[Journal] = None
+
+
+def store(client) -> Journal:
+    """Return the Journal in which running Polls are kept."""
+    global _store
+    path = client.config.get("pollStore", "polls.json")
+    if _store is None or _store.path != path:
+        _store = Journal(path, key="id")
+    return _store
+
+
+# Polls currently running, by the ID of their Message, as a String.
+running: Dict[str, "Poll"] = {}
+
+
+def discard(client, key: str):
+    """Stop keeping a Poll, whether or not it is running."""
+    running.pop(key, None)
+    try:
+        store(client).save([p.record() for p in running.values()])
+    except OSError as e:
+        log.warn(f"Could not save Polls: {e}")
+
+
+class Poll:
+    def __init__(
+        self,
+        menu,
+        options: List[str],
+        buttons: List[str],
+        ends: float,
+        votes: Dict[int, str] = None,
+        interval: float = 5,
+    ):
+        self.menu = menu
+        self.options: List[str] = options
+        self.buttons: List[str] = [str(b) for b in buttons]
+        self.ends: float = ends
+        self.interval: float = interval
+
+        # User ID -> Emoji; Emoji -> Number of Votes.
+        self.votes: Dict[int, str] = dict(votes or {})
+        self.counts: Counter = Counter(self.votes.values())
+        self.dirty: bool = True
+
+    @property
+    def key(self) -> str:
+        return str(self.menu.msg.id)
+
+    def record(self) -> dict:
+        return {
+            "id": self.key,
+            "channel": self.menu.channel.id,
+            "title": self.menu.em.title,
+            "description": self.menu.em.description,
+            "options": self.options,
+            "buttons": self.buttons,
+            "ends": self.ends,
+            "votes": {str(user): emoji for user, emoji in self.votes.items()},
+        }
+
+    @classmethod
+    def lasting(cls, menu, options: List[str], buttons: List[str], duration: float):
+        return cls(menu, options, buttons, time.time() + duration)
+
+    @classmethod
+    def from_record(cls, menu, record: dict) -> "Poll":
+        return cls(
+            menu,
+            record["options"],
+            record["buttons"],
+            record["ends"],
+            {int(user): emoji for user, emoji in record["votes"].items()},
+        )
+
+    def vote(self, added: bool, emoji: str, user_id: int) -> Optional[str]:
+        """Apply one Reaction Event. If it moved a Vote, return the Emoji which
+            the User had voted with before.
+        """
+        previous = self.votes.get(user_id)
+        if added:
+            if previous == emoji:
+                return None
+            if previous is not None:
+                self.counts[previous] -= 1
+            self.votes[user_id] = emoji
+            self.counts[emoji] += 1
+            self.dirty = True
+            return previous
+
+        elif previous == emoji:
+            # Only withdraw the Vote if this was the Reaction it was cast with.
+            #   The removal of a Reaction we took away ourselves is ignored.
+            del self.votes[user_id]
+            self.counts[emoji] -= 1
+            self.dirty = True
+
+        return None
+
+    def tally(self) -> Counter:
+        return Counter({b: self.counts[b] for b in self.buttons})
+
+    def render(self) -> str:
+        return "\n".join(
+            f"{button}: `{option}` - **{self.counts[button]}**"
+            for button, option in zip(self.buttons, self.options)
+        )
+
+    async def show(self, title: str = "Votes"):
+        self.menu.add_section(self.render(), title, overwrite=0)
+        try:
+            await self.menu.post()
+        except discord.HTTPException as e:
+            log.warn(f"Could not update Poll {self.key}: {e}")
+
+    def save(self):
+        running[self.key] = self
+        try:
+            store(self.menu.client).save([p.record() for p in running.values()])
+        except OSError as e:
+            log.warn(f"Could not save Poll {self.key}: {e}")
+        self.dirty = False
+
+    async def unvote(self, emoji: str, user_id: int):
+        try:
+            await self.menu.msg.remove_reaction(emoji, discord.Object(user_id))
+        except discord.HTTPException:
+            # Without Manage Messages, the old Reaction stays, but the Vote has
+            #   still been moved.
+            pass
+
+    async def run(self) -> Counter:
+        """Count Votes until the Poll ends, and then show the results."""
+        if not self.menu.em.fields:
+            self.menu.add_section(self.render(), "Votes")
+        self.save()
+
+        loop = get_event_loop()
+        shown = 0.0
+        with self.menu.client.reactions.listen(
+            self.menu.msg, emoji=self.buttons
+        ) as sel:
+            while True:
+                remaining = self.ends - time.time()
+                if remaining <= 0:
+                    break
+                event = await sel.next(min(remaining, self.interval))
+                if event is not None:
+                    previous = self.vote(*event)
+                    if previous is not None:
+                        create_task(self.unvote(previous, event[2]))
+
+                if self.dirty and loop.time() - shown >= self.interval:
+                    await self.show()
+                    self.save()
+                    shown = loop.time()
+
+        await self.menu.clear()
+        await self.show("Results")
+        discard(self.menu.client, self.key)
+        return self.tally()
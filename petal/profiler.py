@@ -0,0 +1,195 @@
+"""Sampling Profiler module for Petal.
+
+A Thread looks at the Stack of every other Thread, the Event Loop included,
+    every `interval` seconds, and counts each Stack it sees. Nothing is hooked
+    into the code being profiled, so it runs at full speed, and the Profiler
+    can safely be started and stopped in the live process.
+
+The Stacks are written out in the "collapsed" format, one Stack per line with
+    its Frames separated by semicolons and followed by its count, which is what
+    flame graph tools such as `flamegraph.pl` and speedscope read.
+"""
+
+from collections import Counter
+from datetime import datetime
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+__all__ = ["Profile", "SamplingProfiler"]
+
+
+class Profile:
+    """The Samples taken by one run of the Profiler."""
+
+    def __init__(self, interval: float):
+        self.interval: float = interval
+        self.stacks: Counter = Counter()
+        self.samples: int = 0
+        self.started: float = time.time()
+        self.elapsed: float = 0.0
+        # The Thread running the Event Loop.
+        self.main: str = threading.main_thread().name
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {n}\n" for stack, n in self.stacks.most_common()
+        )
+
+    def by_thread(self) -> Counter:
+        """Return how many Samples were taken of each Thread. Every Thread is
+            sampled once per round, so these add up to more than `samples`.
+        """
+        out: Counter = Counter()
+        for stack, n in self.stacks.items():
+            out[stack.split(";", 1)[0]] += n
+        return out
+
+    def of_thread(self, thread: str = None) -> Dict[str, int]:
+        """Return the Stacks of one Thread, or of all of them."""
+        if thread is None:
+            return self.stacks
+        head = thread + ";"
+        return {
+            stack: n
+            for stack, n in self.stacks.items()
+            if stack == thread or stack.startswith(head)
+        }
+
+    def by_function(self, thread: str = None) -> Tuple[Counter, Counter]:
+        """Return how many Samples each Function was running in itself, and how
+            many it was anywhere on the Stack for.
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, n in self.of_thread(thread).items():
+            frames = stack.split(";")[1:]
+            if frames:
+                own[frames[-1]] += n
+            for frame in set(frames):
+                total[frame] += n
+        return own, total
+
+    def by_module(self, prefix: str = "petal", thread: str = None) -> Counter:
+        """Return how many Samples were spent under each Module of a Package,
+            counting each Sample against the innermost such Module on its Stack.
+            Samples with none of the Package on the Stack are counted as Idle
+            or Library time.
+        """
+        out: Counter = Counter()
+        for stack, n in self.of_thread(thread).items():
+            frames = stack.split(";")[1:]
+            for frame in reversed(frames):
+                module = frame.split(":", 1)[0]
+                if module == prefix or module.startswith(prefix + "."):
+                    out[module] += n
+                    break
+            else:
+                out["(idle or library)"] += n
+        return out
+
+    def summary(self, top: int = 15) -> str:
+        """Summarize the Event Loop Thread, where a hot spot holds up the whole
+            bot, and then every Thread together. Each share is of the Samples
+            of the Threads it covers, so no section adds up to more than 100%.
+        """
+        threads = self.by_thread()
+        everything = sum(threads.values()) or 1
+
+        lines = [
+            f"{self.samples} samples of {len(threads)} threads over"
+            f" {self.elapsed:.1f}s (every {self.interval * 1000:g}ms)",
+            "",
+            "By thread:",
+        ]
+        lines.extend(
+            f"{n / everything:7.1%}  {name}" for name, n in threads.most_common(top)
+        )
+
+        loop = threads[self.main]
+        if loop:
+            own, total = self.by_function(self.main)
+            lines.extend(["", f"By Petal module ({self.main}, the Event Loop):"])
+            lines.extend(
+                f"{n / loop:7.1%}  {module}"
+                for module, n in self.by_module(thread=self.main).most_common(top)
+            )
+            lines.extend(["", "Hottest functions on the Event Loop (self / total):"])
+            lines.extend(
+                f"{n / loop:7.1%} {total[func] / loop:7.1%}  {func}"
+                for func, n in own.most_common(top)
+            )
+
+        lines.extend(["", "By Petal module (all threads):"])
+        lines.extend(
+            f"{n / everything:7.1%}  {module}"
+            for module, n in self.by_module().most_common(top)
+        )
+        return "\n".join(lines)
+
+    def save(self, directory: str) -> Tuple[str, str]:
+        """Write the collapsed Stacks and the Summary. Return their paths."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.utcfromtimestamp(self.started).strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(directory, f"profile-{stamp}")
+        with open(base + ".folded", "w") as fh:
+            fh.write(self.collapsed())
+        with open(base + ".txt", "w") as fh:
+            fh.write(self.summary(50) + "\n")
+        return base + ".folded", base + ".txt"
+
+
+def frame_name(frame) -> str:
+    return "{}:{}".format(frame.f_globals.get("__name__", "?"), frame.f_code.co_name)
+
+
+class SamplingProfiler:
+    """Sample all Threads from a Thread of its own. Only one may run at once."""
+
+    lock = threading.Lock()
+
+    def __init__(self, interval: float = 0.01):
+        self.interval: float = interval
+
+    def sample(self, profile: Profile, names: Dict[int, str], me: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(ident) or f"thread-{ident}")
+            profile.stacks[";".join(reversed(stack))] += 1
+        profile.samples += 1
+
+    def run(self, duration: float, stop: threading.Event = None) -> Profile:
+        """Sample for `duration` seconds, blocking the calling Thread, which
+            must not be the Event Loop.
+        """
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A Profile is already being taken.")
+        try:
+            stop = stop or threading.Event()
+            me = threading.get_ident()
+            profile = Profile(self.interval)
+            start = time.perf_counter()
+            deadline = start + duration
+            names = {t.ident: t.name for t in threading.enumerate()}
+
+            while not stop.is_set():
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                self.sample(profile, names, me)
+                if profile.samples % 100 == 0:
+                    # Pick up Threads started since the last look.
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stop.wait(max(self.interval - (time.perf_counter() - now), 0))
+
+            profile.elapsed = time.perf_counter() - start
+            return profile
+        finally:
+            self.lock.release()
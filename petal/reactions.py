@@ -0,0 +1,157 @@
+"""Reaction Dispatch module for Petal.
+
+Rather than every Menu registering its own `wait_for("reaction_add")`, whose
+    Predicate would have to be run against every Reaction anywhere, the Client
+    owns one Router. Raw Reaction Events are looked up by Message ID, and given
+    only to the Listeners which are watching that Message.
+"""
+
+from asyncio import get_event_loop, wait_for, Queue, TimeoutError
+from typing import Collection, Dict, List, Optional, Set, Tuple
+
+import discord
+
+
+# An Event as seen by a Listener: Whether the Reaction was added (rather than
+#   removed), the Emoji as a String, and the ID of the User.
+Event = Tuple[bool, str, int]
+
+
+class ReactionListener:
+    """Receive the Reactions on one Message, optionally only from certain Users
+        and with certain Emoji. The Users currently reacting with each Emoji are
+        tracked as Events arrive, so that the current state of a Menu never
+        needs to be fetched.
+    """
+
+    def __init__(
+        self,
+        router: "ReactionRouter",
+        message_id: int,
+        users: Collection[int] = None,
+        emoji: Collection[str] = None,
+    ):
+        self.router: ReactionRouter = router
+        self.message_id: int = message_id
+        self.users: Optional[Set[int]] = set(users) if users is not None else None
+        self.emoji: Optional[Set[str]] = (
+            {str(e) for e in emoji} if emoji is not None else None
+        )
+
+        self.events: Queue = Queue()
+        self.selected: Dict[str, Set[int]] = {}
+
+    def __enter__(self) -> "ReactionListener":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        """Stop receiving Events."""
+        self.router.remove(self)
+
+    def feed(self, added: bool, emoji: str, user_id: int):
+        if self.emoji is not None and emoji not in self.emoji:
+            return
+        if self.users is not None and user_id not in self.users:
+            return
+
+        if added:
+            self.selected.setdefault(emoji, set()).add(user_id)
+        else:
+            self.selected.get(emoji, set()).discard(user_id)
+        self.events.put_nowait((added, emoji, user_id))
+
+    def reset(self, emoji: str = None):
+        """Forget Reactions which were removed all at once."""
+        if emoji is None:
+            self.selected.clear()
+        else:
+            self.selected.pop(emoji, None)
+
+    async def next(self, timeout: float = 30) -> Optional[Event]:
+        """Return the next Event, added or removed, in the order they arrived.
+            Return None if none arrives within `timeout` seconds.
+        """
+        if timeout <= 0:
+            return None
+        try:
+            return await wait_for(self.events.get(), timeout)
+        except TimeoutError:
+            return None
+
+    async def wait(
+        self, timeout: float = 30, emoji: Collection[str] = None
+    ) -> Optional[Event]:
+        """Wait for a Reaction to be added, optionally only one of the given
+            Emoji. Return None if none arrives within `timeout` seconds.
+        """
+        wanted = {str(e) for e in emoji} if emoji is not None else None
+        loop = get_event_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            event = await self.next(deadline - loop.time())
+            if event is None:
+                return None
+            elif event[0] and (wanted is None or event[1] in wanted):
+                return event
+
+    def chosen(self, order: Collection[str], user_id: int = None) -> List[str]:
+        """Return the Emoji currently reacted, in the order given, either by
+            anyone or by a specific User.
+        """
+        return [
+            str(e)
+            for e in order
+            if (
+                user_id in self.selected.get(str(e), ())
+                if user_id is not None
+                else self.selected.get(str(e))
+            )
+        ]
+
+    def count(self, emoji: str) -> int:
+        """Return how many Users are currently reacting with an Emoji."""
+        return len(self.selected.get(str(emoji), ()))
+
+
+class ReactionRouter:
+    """Deliver Raw Reaction Events to the Listeners watching their Message."""
+
+    def __init__(self, client):
+        self.client = client
+        self.listeners: Dict[int, List[ReactionListener]] = {}
+
+    def listen(
+        self,
+        message: discord.Message,
+        users: Collection[int] = None,
+        emoji: Collection[str] = None,
+    ) -> ReactionListener:
+        """Begin watching a Message. The Listener should be closed when it is
+            no longer needed; It works as a Context Manager to that end.
+        """
+        listener = ReactionListener(self, message.id, users, emoji)
+        self.listeners.setdefault(message.id, []).append(listener)
+        return listener
+
+    def remove(self, listener: ReactionListener):
+        group = self.listeners.get(listener.message_id)
+        if group and listener in group:
+            group.remove(listener)
+            if not group:
+                del self.listeners[listener.message_id]
+
+    def dispatch(self, payload: discord.RawReactionActionEvent, added: bool):
+        group = self.listeners.get(payload.message_id)
+        if not group or payload.user_id == self.client.user.id:
+            return
+        emoji = str(payload.emoji)
+        for listener in group:
+            listener.feed(added, emoji, payload.user_id)
+
+    def dispatch_clear(self, message_id: int, emoji: str = None):
+        for listener in self.listeners.get(message_id, ()):
+            listener.reset(emoji)
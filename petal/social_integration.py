@@ -2,15 +2,16 @@
     the CommandRouter and Social Media APIs.
 
 It exists solely to be subclassed by CommandRouter to keep the code clean.
+
+The SDKs for these Services are slow to import, and some check their keys over
+    the network, so none of them are touched until `start_integrations` is
+    called, once connected to Discord. Until then, every Integration is off.
 """
 
+import asyncio
 from datetime import datetime as dt
 
 import discord
-import facebook
-import praw
-import pytumblr
-import twitter
 
 from petal.grasslands import Giraffe, Octopus, Peacock
 
@@ -20,7 +21,32 @@ class Integrated:
         self.client = client
         self.config = client.config
         self.log = Peacock()
-
+        self.integrated: bool = False
+
+        self.osu = None
+        self.imgur = None
+        self.reddit = None
+        self.twit = None
+        self.fb = None
+        self.tumblr = None
+
+    async def start_integrations(self):
+        """Set up the Integrations in an Executor, so that the Event Loop keeps
+            running while they import and check their keys. Only the first
+            call does anything.
+        """
+        if self.integrated:
+            return
+        self.integrated = True
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self.integrate)
+        except Exception as e:
+            self.log.err(f"Could not set up Integrations: {type(e).__name__}: {e}")
+
+    def integrate(self):
+        """Set up the client of every Service with keys in the Config. This
+            blocks, and should not be run on the Event Loop.
+        """
         key_osu = self.config.get("osu")
         if key_osu:
             self.osu = Octopus(key_osu)
@@ -37,6 +63,8 @@ class Integrated:
 
         reddit = self.config.get("reddit")
         if reddit:
+            import praw
+
             self.reddit = praw.Reddit(
                 client_id=reddit["clientID"],
                 client_secret=reddit["clientSecret"],
@@ -61,6 +89,8 @@ class Integrated:
         tweet = self.config.get("twitter")
         # Twitter support disabled till api fix
         if tweet and False:
+            import twitter
+
             self.twit = twitter.Api(
                 consumer_key=tweet["consumerKey"],
                 consumer_secret=tweet["consumerSecret"],
@@ -81,6 +111,8 @@ class Integrated:
 
         fb = self.config.get("facebook")
         if fb:
+            import facebook
+
             self.fb = facebook.GraphAPI(
                 access_token=fb["graphAPIAccessToken"], version=fb["version"]
             )
@@ -90,6 +122,8 @@ class Integrated:
 
         tumblr = self.config.get("tumblr")
         if tumblr:
+            import pytumblr
+
             self.tumblr = pytumblr.TumblrRestClient(
                 tumblr["consumerKey"],
                 tumblr["consumerSecret"],
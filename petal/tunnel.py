@@ -3,20 +3,45 @@
 Manage bridges between Messageables, such as two DMs, or a DM and a Channel.
 """
 
-from asyncio import ensure_future as create_task, CancelledError, Task, TimeoutError
-from typing import List, Optional, Set
+from asyncio import (
+    ensure_future as create_task,
+    gather,
+    get_event_loop,
+    sleep,
+    CancelledError,
+    Future,
+    Queue,
+    Semaphore,
+    Task,
+    TimeoutError,
+)
+from collections import Counter, deque
+from io import BytesIO
+from typing import Deque, Dict, List, Optional, Set, Tuple
 
+import aiohttp
 import discord
 
 from petal.exceptions import TunnelSetupError
+from petal.metrics import TUNNEL_RELAYS, TUNNEL_SECONDS
 from petal.types import TunnelABC
 
 
-def mkembed(src: discord.Message):
-    """Build a Discord Embed representing the passed Message."""
+# Attachments larger than this are linked rather than uploaded, unless the
+#   Config says otherwise. Eight MiB is the most a Bot may upload anywhere.
+ATTACH_LIMIT: int = 8 * 1024 * 1024
+
+
+def mkembed(src: discord.Message, skipped: List[discord.Attachment] = ()):
+    """Build a Discord Embed representing the passed Message. Attachments which
+        are not being uploaded alongside it are linked in the Description.
+    """
+    description = "\n".join(
+        [src.content] + [f"[{a.filename}]({a.url})" for a in skipped]
+    ).strip()
     em = discord.Embed(
         colour=src.author.colour,
-        description=src.content,
+        description=description,
         timestamp=src.created_at,
         title=f"Message from `#{src.channel.name}`"
         if hasattr(src.channel, "name")
@@ -25,14 +50,77 @@ def mkembed(src: discord.Message):
     return {"embed": em}
 
 
+def coalesce(first: dict, second: dict) -> Optional[dict]:
+    """Try to combine two queued Messages into one. Plain text is joined, as
+        are consecutive Embeds relayed from the same person in the same place.
+        Return None if they cannot be combined.
+    """
+    if (
+        first.get("file")
+        or second.get("file")
+        or first.get("attachments")
+        or second.get("attachments")
+    ):
+        return None
+
+    em_1, em_2 = first.get("embed"), second.get("embed")
+    if em_1 is None and em_2 is None:
+        content = f"{first.get('content')}\n{second.get('content')}"
+        return {"content": content} if len(content) <= 2000 else None
+
+    elif (
+        em_1 is not None
+        and em_2 is not None
+        and not first.get("content")
+        and not second.get("content")
+        and not em_1.fields
+        and not em_2.fields
+        and em_1.title == em_2.title
+        and em_1.author.name == em_2.author.name
+    ):
+        description = f"{em_1.description}\n{em_2.description}"
+        if len(description) <= 2048:
+            em = em_1.copy()
+            em.description = description
+            return {"embed": em}
+
+    return None
+
+
 class Tunnel(TunnelABC):
+    # Attempts to make at sending one Message to one Gate, when the failures
+    #   look like they might go away on their own.
+    retries: int = 3
+    # Deliveries in a row which may run out of retries before a Gate is
+    #   considered dead and dropped.
+    strikes_max: int = 3
+
+    __slots__ = (
+        "anon",
+        "client",
+        "gates",
+        "timeout",
+        "active",
+        "connected",
+        "inbox",
+        "last_active",
+        "origin",
+        "waiting",
+        "fanout",
+        "outboxes",
+        "senders",
+        "strikes",
+        "stats",
+    )
+
     def __init__(
         self,
         client,
         origin: discord.TextChannel,
         *gates: int,
         anonymous: bool = False,
-        timeout: int = 600
+        timeout: int = 600,
+        fanout: int = 5
     ):
         self.anon: bool = anonymous
         self.client = client
@@ -41,12 +129,22 @@ class Tunnel(TunnelABC):
 
         self.active: bool = False
         self.connected: List[discord.TextChannel] = []
+        self.inbox: Queue = Queue()
+        self.last_active: float = get_event_loop().time()
         # self.names_c = {}  # Channel aliases
         # self.names_u = {}  # User aliases
 
         self.origin: discord.TextChannel = origin
         self.waiting: Optional[Task] = None
 
+        # Every Gate has its own queue of outgoing Messages, drained by its own
+        #   Task, so that a slow Gate does not hold up the others.
+        self.fanout: Semaphore = Semaphore(fanout)
+        self.outboxes: Dict[int, Deque[Tuple[dict, Future]]] = {}
+        self.senders: Dict[int, Task] = {}
+        self.strikes: Dict[int, int] = {}
+        self.stats: Counter = Counter()
+
     async def activate(self):
         """Resolve all Channel IDs into usable Channel Objects, and store them
             in memory in a List.
@@ -67,6 +165,7 @@ class Tunnel(TunnelABC):
                         )
                     else:
                         self.connected.append(channel)
+                        self.client.tunnel_routes[channel.id] = self
                 else:
                     await self.origin.send(
                         f"Failed to connect to `{channel.id}`: Channel is"
@@ -78,10 +177,13 @@ class Tunnel(TunnelABC):
                 )
         if len(self.connected) < 2:
             await self.broadcast("Failed to establish Tunnel.")
+            for gate in self.connected:
+                self.unroute(gate)
             self.connected.clear()
             raise TunnelSetupError()
         else:
             self.active = True
+            self.last_active = get_event_loop().time()
             tunnel_coro = create_task(self.run_tunnel())
             await self.broadcast(
                 f"Messaging Tunnel established. This Channel is now connected"
@@ -96,32 +198,179 @@ class Tunnel(TunnelABC):
         file=None,
         exclude: List[int] = None,
     ):
-        """Post a Message with the supplied values to all connected Channels."""
+        """Post a Message with the supplied values to all connected Channels,
+            and wait until it has been delivered or given up on.
+        """
+        pending = self.enqueue(content, embed, file, exclude)
+        if pending:
+            await gather(*pending)
+
+    def enqueue(
+        self,
+        content: str = None,
+        embed: discord.Embed = None,
+        file=None,
+        exclude: List[int] = None,
+        attachments: List[Tuple[str, bytes, bool]] = None,
+    ) -> List[Future]:
+        """Queue a Message for every connected Channel not excluded. Return
+            Futures which resolve to whether each copy was delivered.
+
+        Attachments are given as Tuples of filename, data and spoiler flag. The
+            data is shared by every Gate; Each upload reads it through its own
+            Buffer.
+        """
         exclude = exclude or []
-        to_drop = []
-        if content or embed or file:
+        pending = []
+        if content or embed or file or attachments:
+            kw = {"content": content, "embed": embed, "file": file}
+            if attachments:
+                kw["attachments"] = attachments
             for gate in self.connected:
                 if gate.id not in exclude:
-                    try:
-                        await gate.send(content=content, embed=embed, file=file)
-                    except:
-                        to_drop.append(gate)
-            for gate in to_drop:
-                await self.drop(gate)
+                    fut = get_event_loop().create_future()
+                    self.outboxes.setdefault(gate.id, deque()).append((kw, fut))
+                    if gate.id not in self.senders:
+                        self.senders[gate.id] = create_task(self.deliver(gate))
+                    pending.append(fut)
+        return pending
+
+    async def deliver(self, gate):
+        """Send everything queued for one Gate, in order. Messages which pile
+            up while a send is held back by rate limiting are combined, where
+            possible, and sent together.
+        """
+        outbox = self.outboxes[gate.id]
+        waiting = []
+        try:
+            while outbox:
+                kw, fut = outbox.popleft()
+                waiting = [fut]
+                while outbox:
+                    merged = coalesce(kw, outbox[0][0])
+                    if merged is None:
+                        break
+                    kw = merged
+                    waiting.append(outbox.popleft()[1])
+                    self.stats["coalesced"] += 1
+
+                if gate in self.connected:
+                    delivered = await self.send_to(gate, kw)
+                else:
+                    delivered = False
+
+                for fut in waiting:
+                    if not fut.done():
+                        fut.set_result(delivered)
+        finally:
+            # Left early, by an unexpected error or by cancellation. Nothing
+            #   else will send what is left, so report it as undelivered, or
+            #   whoever is waiting on it would wait forever.
+            waiting.extend(fut for _, fut in outbox)
+            outbox.clear()
+            for fut in waiting:
+                if not fut.done():
+                    fut.set_result(False)
+            del self.senders[gate.id]
+            del self.outboxes[gate.id]
+
+    async def send_to(self, gate, kw: dict) -> bool:
+        """Send one Message to one Gate, retrying transient failures. A Gate
+            which refuses outright, or which keeps failing, is dropped.
+        """
+        retries = 0 if kw.get("file") else self.retries
+        for attempt in range(retries + 1):
+            if attempt:
+                self.stats["retried"] += 1
+                await sleep(2 ** (attempt - 1))
+            try:
+                async with self.fanout:
+                    with TUNNEL_SECONDS.time():
+                        await gate.send(**self.upload(kw))
+            except (discord.Forbidden, discord.NotFound):
+                self.stats["permanent"] += 1
+                break
+            except discord.HTTPException as e:
+                if e.status < 500 and e.status != 429:
+                    self.stats["permanent"] += 1
+                    break
+            except (aiohttp.ClientError, OSError, TimeoutError):
+                continue
+            else:
+                self.stats["sent"] += 1
+                TUNNEL_RELAYS.labels("sent").inc()
+                self.strikes.pop(gate.id, None)
+                return True
+        else:
+            # Ran out of retries. The Gate may yet recover.
+            self.stats["transient"] += 1
+            TUNNEL_RELAYS.labels("failed").inc()
+            self.strikes[gate.id] = self.strikes.get(gate.id, 0) + 1
+            if self.strikes[gate.id] < self.strikes_max:
+                return False
+
+        self.stats["dropped"] += 1
+        TUNNEL_RELAYS.labels("dropped").inc()
+        create_task(self.drop(gate))
+        return False
+
+    @staticmethod
+    def upload(kw: dict) -> dict:
+        """Give a queued Message fresh Files to upload. Attachment data is not
+            copied; Each BytesIO reads the same bytes.
+        """
+        attachments = kw.get("attachments")
+        if not attachments:
+            return kw
+        kw = {k: v for k, v in kw.items() if k != "attachments"}
+        kw["files"] = [
+            discord.File(BytesIO(data), filename=name, spoiler=spoiler)
+            for name, data, spoiler in attachments
+        ]
+        return kw
+
+    async def fetch(self, msg: discord.Message):
+        """Download the Attachments of a Message, each exactly once, for relay
+            to every Gate. Return them with a List of those which are too big
+            to upload, and should be linked instead.
+        """
+        limit = self.client.config.get("tunnelAttachmentLimit", ATTACH_LIMIT)
+        fetched: List[Tuple[str, bytes, bool]] = []
+        skipped: List[discord.Attachment] = []
+        total = 0
+
+        for a in msg.attachments[:10]:
+            if total + a.size > limit:
+                skipped.append(a)
+                continue
+            try:
+                data = await a.read()
+            except (discord.HTTPException, aiohttp.ClientError, TimeoutError):
+                skipped.append(a)
+            else:
+                total += len(data)
+                fetched.append((a.filename, data, a.is_spoiler()))
+                self.stats["attached"] += 1
+
+        return fetched, skipped + msg.attachments[10:]
 
     async def close(self):
         """Remove all connected Gateways, and remove self from the Tunnels field
             in the Client. If the interface has been used correctly, this will
             cause the Garbage Collector to delete the Tunnel fully.
         """
-        for gate in self.connected:
+        for gate in list(self.connected):
             await self.drop(gate)
         self.client.remove_tunnel(self)
 
     async def drop(self, gate):
         """Remove a connected Channel from the connected Channels."""
+        if gate not in self.connected:
+            self.unroute(gate)
+            return
         while gate in self.connected:
             self.connected.remove(gate)
+        self.unroute(gate)
         if self.active:
             await self.broadcast("One endpoint has disconnected.")
         if len(self.connected) < 2:
@@ -135,9 +384,38 @@ class Tunnel(TunnelABC):
         if self.waiting:
             self.waiting.cancel()
 
+    def post(self, msg: discord.Message):
+        """Queue a Message sent in a connected Channel to be forwarded. Called
+            by the Client for every Message in a Channel routed to this Tunnel.
+        """
+        if (
+            self.active
+            and msg.author.id != self.client.user.id
+            and not msg.content.startswith(self.client.config.prefix)
+        ):
+            self.last_active = get_event_loop().time()
+            self.inbox.put_nowait(msg)
+
     async def receive(self, msg: discord.Message):
-        """Forward a received Message to all connected Channels."""
-        await self.broadcast(exclude=[msg.channel.id], **mkembed(msg))
+        """Forward a received Message to all connected Channels. This does not
+            wait for delivery, so that a burst of Messages can be queued up and
+            combined while a Gate is rate limited. It does wait for Attachments
+            to be downloaded, so that Messages stay in order.
+        """
+        if msg.attachments:
+            attachments, skipped = await self.fetch(msg)
+        else:
+            attachments, skipped = [], []
+        self.enqueue(
+            exclude=[msg.channel.id],
+            attachments=attachments,
+            **mkembed(msg, skipped),
+        )
+
+    def unroute(self, gate):
+        """Stop the Client routing Messages from a Channel to this Tunnel."""
+        if self.client.tunnel_routes.get(gate.id) is self:
+            del self.client.tunnel_routes[gate.id]
 
     async def run_tunnel(self):
         """Begin Tunnel operation loop."""
@@ -145,26 +423,13 @@ class Tunnel(TunnelABC):
             if len(self.connected) < 2:
                 await self.kill("Connection closed: No active endpoints.")
                 continue
-            self.waiting = create_task(
-                self.client.wait_for(
-                    "message",
-                    check=(
-                        lambda m: m.channel in self.connected
-                        and m.author.id != self.client.user.id
-                        and not m.content.startswith(self.client.config.prefix)
-                    ),
-                    timeout=self.timeout,
-                )
-            )
+            self.waiting = create_task(self.inbox.get())
             try:
                 msg = await self.waiting
             except CancelledError:
                 # Tunnel was killed.
                 if self.active:
                     await self.broadcast("Connection closed: Coroutine cancelled.")
-            except TimeoutError:
-                # Tunnel timed out.
-                await self.kill("Connection closed due to inactivity.")
             else:
                 await self.receive(msg)
             finally:
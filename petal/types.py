@@ -31,6 +31,8 @@ Printer = NewType(
 
 
 class TunnelABC(object):
+    __slots__ = ()
+
     @abstractmethod
     async def activate(self) -> Future:
         ...
@@ -57,6 +59,10 @@ class TunnelABC(object):
     async def kill(self, final: str = "") -> None:
         ...
 
+    @abstractmethod
+    def post(self, msg: discord.Message) -> None:
+        ...
+
     @abstractmethod
     async def receive(self, msg: discord.Message) -> None:
         ...
@@ -74,11 +80,16 @@ class PetalClientABC(discord.Client):
         "dev_mode",
         "logLock",
         "loop_tasks",
+        "metrics_runner",
+        "msgindex",
         "potential_typo",
+        "reactions",
         "session_id",
         "startup",
         "tempBanFlag",
+        "tunnel_routes",
         "tunnels",
+        "watchdog",
     )
 
     @property
@@ -117,6 +128,10 @@ class PetalClientABC(discord.Client):
     async def ban_loop(self) -> None:
         ...
 
+    @abstractmethod
+    async def tunnel_loop(self) -> None:
+        ...
+
     @abstractmethod
     async def close_tunnels_to(self, channel: int) -> None:
         ...
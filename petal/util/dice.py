@@ -21,6 +21,8 @@ def randint(low: int, high: int) -> int:
 class DieRoll:
     """Represents the outcome of a set of Dice being rolled."""
 
+    __slots__ = ("res", "add_each", "add_sum", "src")
+
     def __init__(
         self, results: Tuple[int], add_each: int = 0, add_sum: int = 0, src=None
     ):
@@ -39,6 +41,8 @@ class DieRoll:
 
 
 class Dice:
+    __slots__ = ("low", "high", "quantity", "add_each", "add_sum", "_str")
+
     def __init__(
         self,
         size: int,
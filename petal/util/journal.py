@@ -0,0 +1,199 @@
+"""Module dedicated to Journaled storage of the Minecraft PlayerDB.
+
+Instead of one JSON Array which is rewritten in full on every change, the
+    PlayerDB is kept as a Snapshot, in the same format as the JSON file, plus a
+    Log of changes made since that Snapshot. Saving a change appends one line to
+    the Log; Once the Log grows longer than the Snapshot, the two are compacted
+    into a new Snapshot.
+
+Log lines are JSON Objects, either `{"put": <entry>}` or `{"del": <uuid>}`.
+    Replaying a line twice has no further effect, so a crash at any point of a
+    compaction leaves a PlayerDB which replays correctly.
+"""
+
+from collections import OrderedDict
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+from ..grasslands import Peacock
+
+__all__ = ["Journal", "write_atomic"]
+
+log = Peacock()
+
+
+def write_atomic(path: str, data, **kw):
+    """Dump JSON into a temporary file beside `path`, and then move it into
+        place, so that a reader never sees a partially written file.
+    """
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp, "w") as fh:
+            json.dump(data, fh, **kw)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def clone(data):
+    """Copy JSON data. Much cheaper than `deepcopy`, which has to allow for
+        arbitrary objects and cycles.
+    """
+    if isinstance(data, dict):
+        return OrderedDict((k, clone(v)) for k, v in data.items())
+    elif isinstance(data, list):
+        return [clone(v) for v in data]
+    else:
+        return data
+
+
+class Journal:
+    """A PlayerDB stored as `<path>.snap` and `<path>.log`. If neither exists
+        yet, but a PlayerDB in the old format exists at `path`, it is imported
+        as the first Snapshot.
+    """
+
+    def __init__(self, path: str, key: str = "uuid", compact_min: int = 64):
+        self.path: str = path
+        self.path_snap: str = path + ".snap"
+        self.path_log: str = path + ".log"
+        self.key: str = key
+        self.compact_min: int = compact_min
+
+        self.records: Dict[str, OrderedDict] = OrderedDict()
+        self.logged: int = 0
+        self.stamp: Optional[Tuple] = None
+
+    def stat(self) -> Optional[Tuple]:
+        """Return the modification times and sizes of the Snapshot and Log, or
+            None if there is no PlayerDB at all.
+        """
+        out = []
+        for path in (self.path_snap, self.path_log):
+            try:
+                st = os.stat(path)
+            except OSError:
+                out.append(None)
+            else:
+                out.append((st.st_mtime_ns, st.st_size))
+        return None if out == [None, None] else tuple(out)
+
+    def replay(self):
+        """Rebuild the records from the Snapshot and the Log on disk."""
+        records = OrderedDict()
+        if os.path.exists(self.path_snap):
+            with open(self.path_snap) as fh:
+                snapshot = json.load(fh, object_pairs_hook=OrderedDict)
+        elif not os.path.exists(self.path_log) and os.path.exists(self.path):
+            # Nothing journaled yet; Start from the old single file.
+            log.f("journal", "Importing PlayerDB from " + self.path)
+            with open(self.path) as fh:
+                snapshot = json.load(fh, object_pairs_hook=OrderedDict)
+            write_atomic(self.path_snap, snapshot, indent=2)
+        else:
+            snapshot = []
+
+        for entry in snapshot:
+            records[entry[self.key]] = entry
+
+        logged = 0
+        good = 0
+        torn = False
+        try:
+            with open(self.path_log, "rb") as fh:
+                for line in fh:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("Unterminated record")
+                        change = json.loads(line, object_pairs_hook=OrderedDict)
+                    except ValueError:
+                        # A crash interrupted this append. Nothing after it
+                        #   can have been written, so cut it off here.
+                        log.warn("Discarding torn PlayerDB journal record.")
+                        torn = True
+                        break
+                    if "put" in change:
+                        records[change["put"][self.key]] = change["put"]
+                    else:
+                        records.pop(change["del"], None)
+                    logged += 1
+                    good += len(line)
+            if torn:
+                with open(self.path_log, "r+b") as fh:
+                    fh.truncate(good)
+        except FileNotFoundError:
+            pass
+
+        self.records = records
+        self.logged = logged
+        self.stamp = self.stat()
+
+    def load(self) -> List[OrderedDict]:
+        """Return a copy of the PlayerDB, replaying it only if the files have
+            been changed by something else since we last touched them.
+        """
+        if self.stamp is None or self.stamp != self.stat():
+            self.replay()
+        return [clone(entry) for entry in self.records.values()]
+
+    def save(self, entries: List[dict]):
+        """Append a record for every entry which differs from what is stored,
+            and one for every stored entry which is no longer present.
+        """
+        if self.stamp is None or self.stamp != self.stat():
+            self.replay()
+
+        wanted = OrderedDict((entry[self.key], entry) for entry in entries)
+        lines = [json.dumps({"del": key}) for key in self.records if key not in wanted]
+        lines.extend(
+            json.dumps({"put": entry})
+            for key, entry in wanted.items()
+            if self.records.get(key) != entry
+        )
+
+        if lines:
+            try:
+                with open(self.path_log, "a") as fh:
+                    fh.write("\n".join(lines) + "\n")
+                    fh.flush()
+                    os.fsync(fh.fileno())
+            except OSError:
+                # Whatever made it to the disk will be found by the next replay.
+                self.stamp = None
+                raise
+            self.logged += len(lines)
+
+        for key in [key for key in self.records if key not in wanted]:
+            del self.records[key]
+        for key, entry in wanted.items():
+            if self.records.get(key) != entry:
+                self.records[key] = clone(entry)
+
+        if list(self.records) != list(wanted):
+            # The order of entries changed, which the Log cannot express.
+            self.records = OrderedDict((key, self.records[key]) for key in wanted)
+            self.compact()
+        elif self.logged >= max(self.compact_min, len(self.records)):
+            self.compact()
+        else:
+            self.stamp = self.stat()
+
+    def compact(self):
+        """Fold the Log into a new Snapshot, and empty the Log."""
+        write_atomic(self.path_snap, list(self.records.values()), indent=2)
+        with open(self.path_log, "w") as fh:
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.logged = 0
+        self.stamp = self.stat()
+
+    def export(self, path: str = None):
+        """Write the PlayerDB out as a single JSON Array, in the old format."""
+        write_atomic(path or self.path, self.load(), indent=2)
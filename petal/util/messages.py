@@ -1,7 +1,23 @@
 """Module dedicated to utilities concerning Discord Messages."""
 
+import asyncio
+from collections import deque, OrderedDict
 from dataclasses import dataclass
-from typing import Any, AsyncIterator, Callable, Generator, List, TypeVar
+from datetime import datetime
+import heapq
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 import discord
 
@@ -13,10 +29,27 @@ T = TypeVar("T")
 
 @dataclass
 class Pair:
+    __slots__ = ("iterator", "last")
+
     iterator: AsyncIterator
     last: T
 
 
+class _Desc:
+    """Invert the ordering of a Key, for use in a Min-Heap."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other: "_Desc") -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: "_Desc") -> bool:
+        return other.value < self.value
+
+
 async def aitermux(
     *iters: AsyncIterator[T],
     key: Callable[[T], Any],
@@ -27,19 +60,19 @@ async def aitermux(
     """Return a Generator to "multiplex" Asynchronous Iterators, with their
         outputs sorted by some Key Function.
 
+    The Iterators are kept in a Heap by their most recent Yields, so picking
+        the next value costs O(log n) rather than O(n).
+
     The only caveat with this is that each Iterator must yield at least one
         value before the Generator can yield any at all.
     """
     limited: bool = limit > 0
+    wrap: Callable[[Any], Any] = _Desc if reverse else (lambda k: k)
 
-    # To make the Multiplexer transparent, we must wrap the Key Function so that
-    #   it will operate on a Pair containing a value, not the value itself.
-    def key_true(pair: Pair) -> Any:
-        return key(pair.last)
-
-    # Associate Iterators with their most recent Yields.
-    lasts: List[Pair] = []
-    for ITER in iters:
+    # Associate Iterators with their most recent Yields. The sequence number
+    #   breaks ties, so that neither Pairs nor values are ever compared.
+    heap: List[Tuple[Any, int, Pair]] = []
+    for seq, ITER in enumerate(iters):
         try:
             # Get the first Value from each Iterator.
             p = await ITER.__anext__()
@@ -47,13 +80,13 @@ async def aitermux(
             continue
         else:
             # Store it in a Dataclass next to the Iterator from whence it came.
-            lasts.append(Pair(ITER, p))
+            heap.append((wrap(key(p)), seq, Pair(ITER, p)))
+    heapq.heapify(heap)
 
-    # Evaluate Reversal outside the Loop.
-    cmp: Callable[..., T] = max if reverse else min
-    while lasts and (not limited or limit > 0):
-        next_: Pair = cmp(lasts, key=key_true)
+    while heap and (not limited or limit > 0):
+        _, seq, next_ = heap[0]
         yield next_.last
+        limit -= 1
 
         try:
             next_.last = await next_.iterator.__anext__()
@@ -63,31 +96,264 @@ async def aitermux(
                 break
             else:
                 # Everything must go.
-                lasts.remove(next_)
+                heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (wrap(key(next_.last)), seq, next_))
+
+
+def _snowflake(point, high: bool) -> Optional[int]:
+    """Reduce a Message, Object or Datetime to a Snowflake ID."""
+    if point is None:
+        return None
+    elif isinstance(point, datetime):
+        return discord.utils.time_snowflake(point, high=high)
+    else:
+        return point.id
+
+
+class ChannelScan:
+    """Read the History of one Channel a Page at a time, keeping track of how
+        far it has been read. Its Frontier is the ID of the next Message it
+        will yield, or a bound on it, if the next Page has not arrived yet.
+    """
+
+    def __init__(
+        self,
+        channel: discord.TextChannel,
+        gate: asyncio.Semaphore,
+        start: int,
+        stop: Optional[int],
+        oldest_first: bool,
+        page: int = 100,
+    ):
+        self.channel: discord.TextChannel = channel
+        self.gate: asyncio.Semaphore = gate
+        self.cursor: int = start
+        self.stop: Optional[int] = stop
+        self.oldest_first: bool = oldest_first
+        self.page: int = page
+
+        self.buffer: Deque[discord.Message] = deque()
+        self.exhausted: bool = False
+        self.task: Optional[asyncio.Future] = None
+
+    @property
+    def frontier(self) -> int:
+        if self.buffer:
+            return self.buffer[0].id
+        elif self.oldest_first:
+            return self.cursor + 1
         else:
-            limit -= 1
+            return self.cursor - 1
+
+    def prefetch(self):
+        """Begin fetching the next Page, if it is needed and not coming."""
+        if self.task is None and not self.exhausted:
+            self.task = asyncio.ensure_future(self._fetch())
+
+    async def _fetch(self) -> List[discord.Message]:
+        async with self.gate:
+            if self.oldest_first:
+                return await self.channel.history(
+                    limit=self.page,
+                    after=discord.Object(self.cursor),
+                    oldest_first=True,
+                ).flatten()
+            else:
+                return await self.channel.history(
+                    limit=self.page, before=discord.Object(self.cursor)
+                ).flatten()
+
+    async def fill(self):
+        """Wait for the next Page, and take it into the Buffer."""
+        self.prefetch()
+        try:
+            got: List[discord.Message] = await self.task
+        except discord.HTTPException:
+            got = []
+        finally:
+            self.task = None
+
+        if len(got) < self.page:
+            self.exhausted = True
+        if got:
+            self.cursor = got[-1].id
+        for msg in got:
+            if self.stop is not None and (
+                msg.id >= self.stop if self.oldest_first else msg.id <= self.stop
+            ):
+                self.exhausted = True
+                break
+            self.buffer.append(msg)
 
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
 
-def member_message_history(
+
+async def member_message_history(
     member: discord.Member,
     *,
     limit: int = 0,
     before=None,
     after=None,
-    around=None,
-    oldest_first: bool = None,
+    oldest_first: bool = False,
+    concurrency: int = 4,
+    prefetch: bool = True,
 ) -> AsyncIterator[discord.Message]:
-    iters: Generator[Generator[discord.Message]] = (
-        (
-            msg
-            async for msg in channel.history(
-                before=before, after=after, around=around, oldest_first=oldest_first
+    """Yield the Messages sent by a Member in every Channel of their Guild which
+        Petal can read, newest first (or oldest first), as one sorted stream.
+
+    Channels are kept in a Heap by their Frontiers, and only the Channel at the
+        top is read from. Before anything is fetched, the Frontier of a Channel
+        is the ID of its last Message, so a Channel whose newest Message is
+        older than the `limit`th result is never fetched at all. Up to
+        `concurrency` Pages are fetched at a time; With `prefetch`, the next
+        Page of each Channel near the top of the Heap is requested before it
+        is needed.
+
+    Discord offers no way to ask a Channel for only the Messages of one
+        Author, so every Message read is still checked here.
+    """
+    guild: discord.Guild = member.guild
+    gate = asyncio.Semaphore(concurrency)
+    lo: Optional[int] = _snowflake(after, high=True)
+    hi: Optional[int] = _snowflake(before, high=False)
+
+    scans: List[ChannelScan] = []
+    for channel in guild.text_channels:
+        if not channel.permissions_for(guild.me).read_message_history:
+            continue
+        if oldest_first:
+            start = max(lo or 0, channel.id)
+            scan = ChannelScan(channel, gate, start, hi, True)
+        else:
+            start = (channel.last_message_id or (1 << 64) - 2) + 1
+            if hi is not None:
+                start = min(start, hi)
+            scan = ChannelScan(channel, gate, start, lo, False)
+        scans.append(scan)
+
+    wrap: Callable[[int], Any] = (lambda k: k) if oldest_first else _Desc
+    heap: List[Tuple[Any, int, ChannelScan]] = [
+        (wrap(scan.frontier), seq, scan) for seq, scan in enumerate(scans)
+    ]
+    heapq.heapify(heap)
+    if prefetch:
+        for _, _, scan in heapq.nsmallest(concurrency, heap):
+            scan.prefetch()
+
+    found = 0
+    try:
+        while heap and (limit <= 0 or found < limit):
+            _, seq, scan = heap[0]
+            if scan.buffer:
+                msg = scan.buffer.popleft()
+                if msg.author.id == member.id:
+                    found += 1
+                    yield msg
+            elif scan.exhausted:
+                heapq.heappop(heap)
+                continue
+            else:
+                await scan.fill()
+                if prefetch:
+                    # Whatever is near the top now is likely to be read next.
+                    for _, _, other in heapq.nsmallest(concurrency, heap):
+                        if other is not scan and not other.buffer:
+                            other.prefetch()
+
+            if not scan.buffer and not scan.exhausted and prefetch:
+                scan.prefetch()
+            heapq.heapreplace(heap, (wrap(scan.frontier), seq, scan))
+    finally:
+        for scan in scans:
+            scan.cancel()
+
+
+class MessageCache:
+    """Remember Messages fetched over REST for a short time, so that a Message
+        which is asked for repeatedly, such as by `{p}quote`, needs only one
+        request. Messages still held in the Client Cache are preferred, since
+        those are kept current by the Gateway.
+    """
+
+    def __init__(self, size: int = 256, ttl: float = 300):
+        self.size: int = size
+        self.ttl: float = ttl
+        self.entries: Dict[int, Tuple[float, discord.Message]] = OrderedDict()
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def get(self, client, message_id: int) -> Optional[discord.Message]:
+        found = discord.utils.get(client.cached_messages, id=message_id)
+        if found is not None:
+            return found
+
+        entry = self.entries.get(message_id)
+        if entry is None:
+            return None
+        elif time.monotonic() - entry[0] > self.ttl:
+            del self.entries[message_id]
+            return None
+        else:
+            self.entries.move_to_end(message_id)
+            return entry[1]
+
+    def put(self, message: discord.Message):
+        self.entries[message.id] = (time.monotonic(), message)
+        self.entries.move_to_end(message.id)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def fetch(
+        self,
+        client,
+        channel: discord.TextChannel,
+        message_id: int,
+        gate: asyncio.Semaphore = None,
+    ) -> discord.Message:
+        """Return a Message from the Cache, or else fetch it. Simultaneous
+            requests for the same Message share one fetch.
+        """
+        found = self.get(client, message_id)
+        if found is not None:
+            return found
+
+        if message_id not in self.pending:
+            self.pending[message_id] = asyncio.ensure_future(
+                self._fetch(channel, message_id, gate)
             )
-            if msg.author == member
-        )
-        for channel in member.guild.text_channels
-    )
-    return aitermux(*iters, key=(lambda o: o.created_at), limit=limit, reverse=True)
+        return await asyncio.shield(self.pending[message_id])
+
+    async def _fetch(
+        self, channel: discord.TextChannel, message_id: int, gate: asyncio.Semaphore
+    ) -> discord.Message:
+        try:
+            if gate:
+                async with gate:
+                    message = await channel.fetch_message(message_id)
+            else:
+                message = await channel.fetch_message(message_id)
+            self.put(message)
+            return message
+        finally:
+            del self.pending[message_id]
+
+    def fetch_all(
+        self,
+        client,
+        targets: Sequence[Tuple[discord.TextChannel, int]],
+        concurrency: int = 5,
+    ) -> List[asyncio.Future]:
+        """Begin fetching several Messages at once, at most `concurrency` at a
+            time. Return Futures in the same order as the targets, so that the
+            results can be used in order, each as soon as it is ready.
+        """
+        gate = asyncio.Semaphore(concurrency)
+        return [
+            asyncio.ensure_future(self.fetch(client, channel, message_id, gate))
+            for channel, message_id in targets
+        ]
 
 
 async def read_messages(
@@ -16,12 +16,12 @@ ERROR CODES:
 from collections import OrderedDict
 import json
 from pathlib import Path
-from typing import Any, Dict, List, NewType, Type, Union
+from typing import Any, Dict, List, NewType, Optional, Type, Union
 from uuid import UUID
 
-import requests
-
+from . import mojang
 from .embeds import minecraft_card, minecraft_suspension
+from .journal import Journal
 from ..exceptions import WhitelistError
 from ..grasslands import Peacock
 
@@ -86,17 +86,11 @@ def find(data: type_db, *params: str) -> List[type_entry_db]:
     return out
 
 
-def id_from_name(uname_raw: str):
+async def id_from_name(uname_raw: str):
     """Given a Minecraft Username, get its UUID."""
-    uname_low: str = uname_raw.lower()
-    response = requests.get(
-        "https://api.mojang.com/users/profiles/minecraft/{}".format(uname_low)
-    )
+    response = await mojang.resolver.id_from_name(uname_raw)
     log.f("WLME_RESP", str(response))
-    if response.status_code == 200:
-        return {"code": response.status_code, "udat": response.json()}
-    else:
-        return {"code": response.status_code}
+    return response
 
 
 class Interface:
@@ -104,6 +98,7 @@ class Interface:
         self.client = client
         self.config = client.config
         self.ctx = None
+        self._journal: Optional[Journal] = None
 
     def __enter__(self) -> type_db:
         if self.ctx is not None:
@@ -137,7 +132,37 @@ class Interface:
     def path_op(self) -> Path:
         return Path(self.cget("minecraftOP", "ops.json"))
 
+    @property
+    def journal(self) -> Optional[Journal]:
+        """The Journal holding the PlayerDB, if it is configured to use one."""
+        if not self.cget("minecraftJournal", False):
+            return None
+        if self._journal is None or self._journal.path != str(self.path_db):
+            self._journal = Journal(str(self.path_db))
+        return self._journal
+
+    def db_to_journal(self) -> Journal:
+        """Convert a PlayerDB in the plain JSON format into a Journal."""
+        journal = Journal(str(self.path_db))
+        journal.save(self.db_read_json())
+        journal.compact()
+        return journal
+
+    def db_to_json(self, path: Path = None):
+        """Convert a Journaled PlayerDB back into the plain JSON format."""
+        Journal(str(self.path_db)).export(str(path or self.path_db))
+
     def db_read(self) -> type_db:
+        journal = self.journal
+        if journal is None:
+            return self.db_read_json()
+        try:
+            return journal.load()
+        except OSError as e:
+            log.err("OSError on DB read: " + str(e))
+            raise WhitelistError("Cannot read PlayerDB journal.") from e
+
+    def db_read_json(self) -> type_db:
         try:
             with self.path_db.open("r") as file_db:
                 data: type_db = json.load(file_db, object_pairs_hook=OrderedDict)
@@ -150,6 +175,15 @@ class Interface:
         return data
 
     def db_write(self, data):
+        journal = self.journal
+        if journal is not None:
+            try:
+                journal.save(data)
+            except OSError as e:
+                log.err("OSError on DB save: " + str(e))
+                raise WhitelistError("Cannot write PlayerDB journal.") from e
+            return
+
         try:
             with self.path_db.open("w") as file_db:
                 # Save all the things.
@@ -160,7 +194,7 @@ class Interface:
             log.err("OSError on DB save: " + str(e))
             raise WhitelistError("Cannot write PlayerDB file.") from e
 
-    def whitelist_rebuild(self, refreshall=False, refreshnet=False) -> int:
+    def whitelist_rebuild(self, refreshall=False) -> int:
         """Export the local database into the whitelist file itself. If Mojang
             ever changes the format of the server whitelist file, this is the
             function that will need to be updated.
@@ -168,13 +202,13 @@ class Interface:
         try:
             # Stage 0: Load the full database as ordered dicts, and the
             #   whitelist as dicts.
-            with self.path_db.open("r") as file_db, self.path_wl.open("r") as file_wl:
-                data = json.load(file_db, object_pairs_hook=OrderedDict)
+            with self.path_wl.open("r") as file_wl:
                 if self.cget("minecraftStrictWL", False):
                     data_wl = []
                 else:
                     data_wl = json.load(file_wl)
-        except OSError:
+            data = self.db_read()
+        except (OSError, WhitelistError):
             # File does not exist: Pointless to continue.
             return 0
         data_op = []  # Op list is always strict.
@@ -188,25 +222,8 @@ class Interface:
                 entry_new = PLAYERDEFAULT.copy()
                 entry_new.update(applicant)
 
-                if refreshnet:
-                    # Stage 3, optional: Rebuild username history.
-                    name_history = requests.get(
-                        "https://api.mojang.com/user/profiles/{}/names".format(
-                            applicant["uuid"].replace("-", "")
-                        )
-                    )
-
-                    if name_history.status_code == 200:
-                        # Spy on their dark and shadowy past.
-                        entry_new.update(altname=[])
-                        for name in name_history.json():
-                            entry_new["altname"].append(name["name"])
-                            # Ensure the name is up to date.
-                            entry_new["name"] = name["name"]
-
                 data_db.append(entry_new)
-            with self.path_db.open("w") as file_db:
-                json.dump(data_db, file_db, indent=2)
+            self.db_write(data_db)
             data = data_db
 
         for applicant in data:
@@ -0,0 +1,285 @@
+"""Module dedicated to asynchronous access to the Mojang API.
+
+Meant for jobs which touch many players at once. Requests are spread across a
+    bounded number of workers, and their start times are spaced out by a shared
+    Pacer, which also stalls every worker when Mojang reports a rate limit.
+
+Username lookups go through the shared Resolver, which answers from a cache
+    where it can, and otherwise gathers lookups made around the same time into
+    one request to the bulk profiles endpoint.
+"""
+
+import asyncio
+from re import compile
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from ..grasslands import Peacock
+
+__all__ = [
+    "API_MOJANG",
+    "Pacer",
+    "Resolver",
+    "name_histories",
+    "name_history",
+    "resolver",
+]
+
+log = Peacock()
+
+
+API_MOJANG: str = "https://api.mojang.com"
+
+# One invalid name makes the bulk endpoint reject the whole batch.
+valid_name = compile(r"^[0-9a-z_]{1,16}$")
+
+
+class Pacer:
+    """Hand out request slots no closer together than `interval` seconds."""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval: float = interval
+        self.lock: asyncio.Lock = asyncio.Lock()
+        self.next_at: float = 0.0
+
+    async def wait(self):
+        async with self.lock:
+            now = asyncio.get_event_loop().time()
+            if self.next_at > now:
+                await asyncio.sleep(self.next_at - now)
+                now = self.next_at
+            self.next_at = now + self.interval
+
+    def backoff(self, delay: float):
+        """Hold back every request until `delay` seconds from now."""
+        self.next_at = max(self.next_at, asyncio.get_event_loop().time() + delay)
+
+
+def retry_after(resp: aiohttp.ClientResponse, attempt: int) -> float:
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return 2.0 ** attempt
+
+
+async def name_history(
+    session: aiohttp.ClientSession,
+    uuid: str,
+    pacer: Pacer,
+    *,
+    api: str = API_MOJANG,
+    retries: int = 3,
+) -> Optional[List[str]]:
+    """Return every name a Minecraft account has used, oldest first, or None
+        if Mojang could not tell us.
+    """
+    url = "{}/user/profiles/{}/names".format(api, uuid.replace("-", ""))
+
+    for attempt in range(retries + 1):
+        await pacer.wait()
+        try:
+            async with session.get(url) as resp:
+                if resp.status == 200:
+                    return [entry["name"] for entry in await resp.json()]
+                elif resp.status == 429:
+                    pacer.backoff(retry_after(resp, attempt))
+                elif resp.status >= 500:
+                    pacer.backoff(2.0 ** attempt)
+                else:
+                    return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.f("mojang", "Name history for {} failed: {}".format(uuid, e))
+            pacer.backoff(2.0 ** attempt)
+        except (KeyError, TypeError, ValueError) as e:
+            log.f("mojang", "Name history for {} was unreadable: {}".format(uuid, e))
+            return None
+
+    return None
+
+
+async def name_histories(
+    uuids: Sequence[str],
+    *,
+    api: str = API_MOJANG,
+    concurrency: int = 4,
+    interval: float = 0.2,
+) -> AsyncIterator[Tuple[str, Optional[List[str]]]]:
+    """Fetch the name histories of many accounts, with at most `concurrency`
+        requests in flight. Yield each UUID with its result as soon as it is
+        available, in no particular order.
+    """
+    pacer = Pacer(interval)
+    gate = asyncio.Semaphore(concurrency)
+
+    async with aiohttp.ClientSession() as session:
+
+        async def one(uuid: str) -> Tuple[str, Optional[List[str]]]:
+            async with gate:
+                return uuid, await name_history(session, uuid, pacer, api=api)
+
+        pending = [asyncio.ensure_future(one(uuid)) for uuid in uuids]
+        try:
+            for next_ in asyncio.as_completed(pending):
+                yield await next_
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+class Resolver:
+    """Resolve Minecraft usernames into profiles, and profiles into username
+        histories, remembering answers for `ttl` seconds. Names which belong to
+        no account are remembered for `ttl_missing` seconds.
+
+    Names requested within `window` seconds of each other are looked up in
+        batches of up to `batch`, and a name which is already being looked up
+        is not requested again; Every caller waits on the same answer.
+    """
+
+    def __init__(
+        self,
+        api: str = API_MOJANG,
+        *,
+        ttl: float = 3600,
+        ttl_missing: float = 300,
+        window: float = 0.1,
+        batch: int = 10,
+    ):
+        self.api: str = api
+        self.ttl: float = ttl
+        self.ttl_missing: float = ttl_missing
+        self.window: float = window
+        self.batch: int = batch
+
+        # Lowercase name -> (expiry, profile); Profile is None for free names.
+        self.names: Dict[str, Tuple[float, Optional[dict]]] = {}
+        # Undashed UUID -> (expiry, names)
+        self.histories: Dict[str, Tuple[float, List[str]]] = {}
+
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.queue: List[str] = []
+        self.flusher: Optional[asyncio.Future] = None
+        self.pacer: Optional[Pacer] = None
+
+    @staticmethod
+    def answer(profile: Optional[dict]) -> dict:
+        """Express a profile the way `mcutil.id_from_name` always has."""
+        if profile:
+            return {"code": 200, "udat": {"id": profile["id"], "name": profile["name"]}}
+        else:
+            return {"code": 204}
+
+    def prune(self):
+        """Forget answers which have been stale for as long as they were fresh.
+            Until then, they are still served while Mojang is unavailable.
+        """
+        limit = time.monotonic() - self.ttl
+        for cache in (self.names, self.histories):
+            for key in [k for k, (expiry, _) in cache.items() if expiry <= limit]:
+                del cache[key]
+
+    async def id_from_name(self, name: str) -> dict:
+        key = name.lower()
+        if not valid_name.match(key):
+            return self.answer(None)
+
+        hit = self.names.get(key)
+        if hit and hit[0] > time.monotonic():
+            return self.answer(hit[1])
+
+        fut = self.pending.get(key)
+        if fut is None:
+            fut = self.pending[key] = asyncio.get_event_loop().create_future()
+            self.queue.append(key)
+            if self.flusher is None:
+                self.flusher = asyncio.ensure_future(self.flush())
+
+        return await asyncio.shield(fut)
+
+    async def flush(self):
+        """Wait for more names to arrive, then look up everything queued."""
+        if self.pacer is None:
+            self.pacer = Pacer()
+        try:
+            await asyncio.sleep(self.window)
+            while self.queue:
+                chunk, self.queue = self.queue[: self.batch], self.queue[self.batch :]
+                await self.lookup(chunk)
+            self.prune()
+        finally:
+            self.flusher = None
+            # Never leave anyone waiting on a Flush which has died.
+            chunk, self.queue = self.queue, []
+            self.settle(chunk, None, 503)
+
+    async def lookup(self, chunk: List[str]):
+        found: Optional[Dict[str, dict]] = None
+        status = 503
+
+        try:
+            await self.pacer.wait()
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    self.api + "/profiles/minecraft", json=chunk
+                ) as resp:
+                    status = resp.status
+                    if resp.status == 200:
+                        found = {p["name"].lower(): p for p in await resp.json()}
+                    elif resp.status == 429:
+                        self.pacer.backoff(retry_after(resp, 0))
+        except Exception as e:
+            # A Response we cannot read is no better than no Response at all.
+            found = None
+            status = 503
+            log.f("mojang", "Profile lookup failed: {}".format(e))
+        finally:
+            self.settle(chunk, found, status)
+
+    def settle(self, chunk: List[str], found: Optional[Dict[str, dict]], status: int):
+        """Answer everyone waiting on the names in a chunk. If `found` is None,
+            the lookup failed, and stale answers are given where we have them.
+        """
+        now = time.monotonic()
+        for key in chunk:
+            fut = self.pending.pop(key, None)
+            if found is not None:
+                profile = found.get(key)
+                expiry = now + (self.ttl if profile else self.ttl_missing)
+                self.names[key] = (expiry, profile)
+                result = self.answer(profile)
+            elif key in self.names:
+                # Mojang is unavailable, but we knew this name once. That is
+                #   better than nothing.
+                result = self.answer(self.names[key][1])
+            else:
+                result = {"code": status}
+
+            if fut is not None and not fut.done():
+                fut.set_result(result)
+
+    async def history(self, uuid: str) -> Optional[List[str]]:
+        """Return every name a Minecraft account has used, oldest first."""
+        key = uuid.replace("-", "").lower()
+        hit = self.histories.get(key)
+        if hit and hit[0] > time.monotonic():
+            return list(hit[1])
+        if self.pacer is None:
+            self.pacer = Pacer()
+
+        async with aiohttp.ClientSession() as session:
+            names = await name_history(session, key, self.pacer, api=self.api)
+
+        if names:
+            self.histories[key] = (time.monotonic() + self.ttl, names)
+            return list(names)
+        elif hit:
+            return list(hit[1])
+        else:
+            return None
+
+
+# Shared by everything in Petal which resolves usernames, so that lookups are
+#   batched and cached together no matter where they come from.
+resolver: Resolver = Resolver()
@@ -0,0 +1,364 @@
+"""Module dedicated to a local index of Discord Messages.
+
+Messages seen by Petal are recorded in an SQLite database, with an FTS5 table
+    over their contents, so that recent history and searches can be answered
+    without asking Discord. Rows are buffered in memory and written in batches.
+    All database work happens on one worker thread, so the Event Loop never
+    waits on the disk.
+
+The index is opt-in: It is only used if `msgIndex/path` is set in the Config.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import sqlite3
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import discord
+
+from ..grasslands import Peacock
+
+__all__ = ["IndexedMessage", "MessageIndex"]
+
+log = Peacock()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    guild INTEGER,
+    channel INTEGER NOT NULL,
+    author INTEGER NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    attachments INTEGER NOT NULL DEFAULT 0,
+    edited INTEGER NOT NULL DEFAULT 0,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_author ON messages (author, id);
+CREATE INDEX IF NOT EXISTS messages_channel ON messages (channel, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    content, content='messages', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF content ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    channel INTEGER PRIMARY KEY,
+    oldest INTEGER,
+    done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# (id, guild, channel, author, content, attachments)
+Row = Tuple[int, Optional[int], int, int, str, int]
+
+
+class IndexedMessage:
+    """A Message as remembered by the Index."""
+
+    __slots__ = ("id", "guild", "channel", "author", "content", "attachments")
+
+    def __init__(self, id_, guild, channel, author, content, attachments):
+        self.id: int = id_
+        self.guild: Optional[int] = guild
+        self.channel: int = channel
+        self.author: int = author
+        self.content: str = content
+        self.attachments: int = attachments
+
+    @property
+    def created_at(self) -> datetime:
+        return discord.utils.snowflake_time(self.id)
+
+
+def row(msg: discord.Message) -> Row:
+    return (
+        msg.id,
+        msg.guild.id if msg.guild else None,
+        msg.channel.id,
+        msg.author.id,
+        msg.content,
+        len(msg.attachments),
+    )
+
+
+class MessageIndex:
+    def __init__(
+        self,
+        path: str,
+        *,
+        batch: int = 200,
+        interval: float = 2,
+        retain_days: int = 90,
+        max_rows: int = 0,
+    ):
+        self.path: str = path
+        self.batch: int = batch
+        self.interval: float = interval
+        self.retain_days: int = retain_days
+        self.max_rows: int = max_rows
+
+        # One thread owns the connection, so SQLite is only ever used from it.
+        self.worker: ThreadPoolExecutor = ThreadPoolExecutor(1, "msgindex")
+        self.db: Optional[sqlite3.Connection] = None
+
+        # Writes waiting for the next batch, in order.
+        self.pending: List[Tuple[str, tuple]] = []
+        self.flusher: Optional[asyncio.Future] = None
+        self.pruned: float = 0.0
+
+    @classmethod
+    def from_config(cls, config) -> Optional["MessageIndex"]:
+        # Read the section directly; It is optional, and so are its Fields, so
+        #   their absence is not worth an error in the Log.
+        section = config.doc.get("msgIndex") or {}
+        path = section.get("path")
+        if not path:
+            return None
+        return cls(
+            path,
+            batch=section.get("batch", 200),
+            interval=section.get("interval", 2),
+            retain_days=section.get("retainDays", 90),
+            max_rows=section.get("maxRows", 0),
+        )
+
+    async def run(self, func: Callable, *a):
+        return await asyncio.get_event_loop().run_in_executor(self.worker, func, *a)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db is None:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+        return self.db
+
+    # ========---
+    # Writing
+    # ========---
+
+    def _queue(self, sql: str, params: tuple):
+        self.pending.append((sql, params))
+        if len(self.pending) >= self.batch:
+            asyncio.ensure_future(self.flush())
+        elif self.flusher is None:
+            self.flusher = asyncio.ensure_future(self._flush_later())
+
+    def add(self, msg: discord.Message):
+        self._queue(
+            "INSERT OR IGNORE INTO messages"
+            " (id, guild, channel, author, content, attachments)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            row(msg),
+        )
+
+    def edit(self, message_id: int, content: str):
+        self._queue(
+            "UPDATE messages SET content = ?, edited = 1 WHERE id = ?",
+            (content, message_id),
+        )
+
+    def delete(self, message_id: int):
+        self._queue("UPDATE messages SET deleted = 1 WHERE id = ?", (message_id,))
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+        finally:
+            self.flusher = None
+
+    def _write(self, ops: List[Tuple[str, tuple]]):
+        db = self._connect()
+        with db:
+            # Consecutive statements of the same kind go in together.
+            i = 0
+            while i < len(ops):
+                sql = ops[i][0]
+                j = i
+                while j < len(ops) and ops[j][0] == sql:
+                    j += 1
+                db.executemany(sql, [params for _, params in ops[i:j]])
+                i = j
+
+        if time.time() - self.pruned > 3600:
+            self._prune()
+
+    def _prune(self):
+        db = self._connect()
+        with db:
+            if self.retain_days > 0:
+                cutoff = discord.utils.time_snowflake(
+                    datetime.utcnow() - timedelta(days=self.retain_days)
+                )
+                db.execute("DELETE FROM messages WHERE id < ?", (cutoff,))
+            if self.max_rows > 0:
+                db.execute(
+                    "DELETE FROM messages WHERE id < (SELECT id FROM messages"
+                    " ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.max_rows - 1,),
+                )
+        self.pruned = time.time()
+
+    async def flush(self):
+        """Write out everything waiting."""
+        ops, self.pending = self.pending, []
+        if ops:
+            try:
+                await self.run(self._write, ops)
+            except sqlite3.Error as e:
+                log.err(f"Message Index write failed: {e}")
+
+    # ========---
+    # Reading
+    # ========---
+
+    def _select(self, sql: str, params: tuple) -> List[IndexedMessage]:
+        cur = self._connect().execute(sql, params)
+        return [IndexedMessage(*r) for r in cur.fetchall()]
+
+    async def query(self, sql: str, params: tuple = ()) -> List[IndexedMessage]:
+        # Anything still waiting must be visible to the query.
+        await self.flush()
+        return await self.run(self._select, sql, params)
+
+    async def get(self, message_id: int) -> Optional[IndexedMessage]:
+        found = await self.query(
+            "SELECT id, guild, channel, author, content, attachments"
+            " FROM messages WHERE id = ?",
+            (message_id,),
+        )
+        return found[0] if found else None
+
+    async def by_member(
+        self, author: int, limit: int = 10, guild: int = None
+    ) -> List[IndexedMessage]:
+        """Return the last `limit` Messages by someone, newest first."""
+        return await self.query(
+            "SELECT id, guild, channel, author, content, attachments"
+            " FROM messages WHERE author = ? AND NOT deleted"
+            + (" AND guild = ?" if guild is not None else "")
+            + " ORDER BY id DESC LIMIT ?",
+            (author, guild, limit) if guild is not None else (author, limit),
+        )
+
+    async def in_channel(
+        self, channel: int, after: int = 0, before: int = (1 << 63) - 1, limit: int = 100
+    ) -> List[IndexedMessage]:
+        """Return Messages in a Channel strictly between two IDs, oldest first."""
+        return await self.query(
+            "SELECT id, guild, channel, author, content, attachments"
+            " FROM messages WHERE channel = ? AND id > ? AND id < ?"
+            " AND NOT deleted ORDER BY id LIMIT ?",
+            (channel, after, before, limit),
+        )
+
+    async def search(
+        self, text: str, limit: int = 10, author: int = None, guild: int = None
+    ) -> List[IndexedMessage]:
+        """Return the newest Messages matching a full-text search."""
+        # Quote every term, so that user input is never parsed as FTS syntax.
+        terms = " ".join('"{}"'.format(t.replace('"', '""')) for t in text.split())
+        if not terms:
+            return []
+        sql = (
+            "SELECT m.id, m.guild, m.channel, m.author, m.content, m.attachments"
+            " FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid"
+            " WHERE messages_fts MATCH ? AND NOT m.deleted"
+        )
+        params = [terms]
+        if author is not None:
+            sql += " AND m.author = ?"
+            params.append(author)
+        if guild is not None:
+            sql += " AND m.guild = ?"
+            params.append(guild)
+        sql += " ORDER BY m.id DESC LIMIT ?"
+        params.append(limit)
+        return await self.query(sql, tuple(params))
+
+    # ========---
+    # Backfilling
+    # ========---
+
+    def _checkpoint(self, channel: int) -> Tuple[Optional[int], bool]:
+        r = (
+            self._connect()
+            .execute("SELECT oldest, done FROM checkpoints WHERE channel = ?", (channel,))
+            .fetchone()
+        )
+        return (r[0], bool(r[1])) if r else (None, False)
+
+    def _backfill_page(self, channel: int, rows: List[Row], oldest: int, done: bool):
+        db = self._connect()
+        with db:
+            db.executemany(
+                "INSERT OR IGNORE INTO messages"
+                " (id, guild, channel, author, content, attachments)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO checkpoints (channel, oldest, done)"
+                " VALUES (?, ?, ?)",
+                (channel, oldest, int(done)),
+            )
+
+    async def backfill(
+        self,
+        channel: discord.TextChannel,
+        *,
+        limit: int = 0,
+        progress: Callable[[int], Awaitable] = None,
+    ) -> int:
+        """Import a Channel History into the Index, newest first. Every Page is
+            written together with a Checkpoint, so an interrupted import picks
+            up where it stopped. Return the number of Messages read.
+        """
+        oldest, done = await self.run(self._checkpoint, channel.id)
+        if done:
+            return 0
+        if self.retain_days > 0:
+            floor = discord.utils.time_snowflake(
+                datetime.utcnow() - timedelta(days=self.retain_days)
+            )
+        else:
+            floor = 0
+
+        count = 0
+        while not limit or count < limit:
+            page = await channel.history(
+                limit=100, before=discord.Object(oldest) if oldest else None
+            ).flatten()
+            rows = [row(m) for m in page if m.id >= floor]
+            finished = len(page) < 100 or len(rows) < len(page)
+            if page:
+                oldest = page[-1].id
+            await self.run(self._backfill_page, channel.id, rows, oldest or 0, finished)
+
+            count += len(page)
+            if progress:
+                await progress(count)
+            if finished:
+                break
+        return count
+
+    async def close(self):
+        await self.flush()
+        if self.db is not None:
+            await self.run(self.db.close)
+            self.db = None
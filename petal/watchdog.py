@@ -0,0 +1,155 @@
+"""Event Loop Watchdog module for Petal.
+
+A Coroutine wakes up every `interval` seconds and notes how late it was; That
+    lateness is the Lag of the Event Loop. Meanwhile, a Thread checks how long
+    it has been since the Coroutine last woke up. If that is longer than the
+    `threshold`, something is blocking the Loop, and the Thread takes the Stack
+    of the Loop Thread to find out what. Stalls are grouped by the innermost
+    Petal function on the Stack, so that the worst offenders can be listed.
+
+Both sides sleep nearly all of the time, so the Watchdog can be left running.
+"""
+
+import asyncio
+from collections import OrderedDict
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+from .grasslands import Peacock
+from .metrics import counter, histogram
+
+__all__ = ["Site", "Watchdog"]
+
+log = Peacock()
+
+LOOP_LAG = histogram(
+    "petal_loop_lag_seconds",
+    "How late the Event Loop was to wake a sleeping Coroutine.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_STALLS = counter("petal_loop_stalls", "Times the Event Loop was blocked.")
+
+# Frames from outside this directory are Library code; The Site of a Stall is
+#   the innermost Frame from inside it.
+PETAL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Site:
+    """A place in the code where the Event Loop has been blocked."""
+
+    __slots__ = ("where", "count", "total", "worst", "stack")
+
+    def __init__(self, where: str, stack: List[str]):
+        self.where: str = where
+        self.count: int = 0
+        self.total: float = 0.0
+        self.worst: float = 0.0
+        self.stack: List[str] = stack
+
+    def add(self, duration: float, stack: List[str]):
+        self.count += 1
+        self.total += duration
+        if duration >= self.worst:
+            self.worst = duration
+            self.stack = stack
+
+
+def describe(stack: traceback.StackSummary) -> Tuple[str, List[str]]:
+    """Return the Site of a Stack, and the Stack as short lines."""
+    lines = [f"{f.filename}:{f.lineno} in {f.name}" for f in stack]
+    for f in reversed(stack):
+        if os.path.abspath(f.filename).startswith(PETAL_DIR):
+            rel = os.path.relpath(f.filename, os.path.dirname(PETAL_DIR))
+            return f"{rel}:{f.lineno} ({f.name})", lines
+    f = stack[-1]
+    return f"{f.filename}:{f.lineno} ({f.name})", lines
+
+
+class Watchdog:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, keep: int = 50):
+        self.threshold: float = threshold
+        self.interval: float = interval
+        self.keep: int = keep
+
+        self.sites: Dict[str, Site] = OrderedDict()
+        self.beat: float = time.monotonic()
+        self.loop_thread: Optional[int] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    @classmethod
+    def from_config(cls, config) -> Optional["Watchdog"]:
+        # Read the section directly; Without it, the defaults are used, and
+        #   that is not worth an error in the Log.
+        section = config.doc.get("watchdog") or {}
+        threshold = section.get("threshold", 0.25)
+        if not threshold:
+            return None
+        return cls(threshold, section.get("interval", 0.1))
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Begin watching a Loop. Must be called from within the Loop."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.loop_thread = threading.get_ident()
+        self.beat = time.monotonic()
+        self.stopped.clear()
+        loop.create_task(self.heartbeat())
+        self.thread = threading.Thread(target=self.watch, name="Watchdog", daemon=True)
+        self.thread.start()
+        log.ready(f"Watchdog running; Stalls over {self.threshold}s will be reported.")
+
+    def stop(self):
+        self.stopped.set()
+
+    async def heartbeat(self):
+        loop = asyncio.get_event_loop()
+        while not self.stopped.is_set():
+            before = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(loop.time() - before - self.interval, 0))
+            self.beat = time.monotonic()
+
+    def watch(self):
+        stack: Optional[traceback.StackSummary] = None
+        began = 0.0
+
+        while not self.stopped.wait(self.interval / 2):
+            stalled = time.monotonic() - self.beat - self.interval
+            if stalled > self.threshold:
+                if stack is None:
+                    # Catch the Loop in the act. The first look is the one
+                    #   that matters; Later ones usually find the same place.
+                    frame = sys._current_frames().get(self.loop_thread)
+                    if frame is None:
+                        continue
+                    stack = traceback.extract_stack(frame)
+                    began = self.beat
+                    del frame
+            elif stack is not None:
+                self.record(self.beat - began - self.interval, stack)
+                stack = None
+
+    def record(self, duration: float, stack: traceback.StackSummary):
+        where, lines = describe(stack)
+        LOOP_STALLS.inc()
+        site = self.sites.get(where)
+        if site is None:
+            while len(self.sites) >= self.keep:
+                # Forget the Site which has cost the least.
+                least = min(list(self.sites.values()), key=lambda s: s.total)
+                del self.sites[least.where]
+            site = self.sites[where] = Site(where, lines)
+        site.add(duration, lines)
+        log.warn("Event Loop blocked for {:.3f}s at {}", duration, where)
+
+    def top(self, n: int = 10) -> List[Site]:
+        sites = list(self.sites.values())
+        return sorted(sites, key=lambda s: s.total, reverse=True)[:n]
+
+    def reset(self):
+        self.sites.clear()